@@ -1,28 +1,189 @@
 import os
 import json
+import time
+import threading
 from dotenv import load_dotenv
-import google.generativeai as genai
+from content_cache import ContentCache, make_cache_key
+from personalization import BASE_PROFILE, apply_rewrite, personalize, rewrite_prompt
+from providers import ProviderError, make_provider
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, call_with_retries
+from singleflight import SingleFlight
+from stream_parser import ARRAY_SECTIONS, ModuleStreamParser, iter_sections
+from telemetry import Counter, Histogram, get_logger, span
 
 load_dotenv()
 
-# Configure Gemini API
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("❌ GEMINI_API_KEY not found in .env file")
-
-genai.configure(api_key=api_key)
-
-# List available models (for debugging)
-print("\n" + "="*60)
-print("🔍 AVAILABLE GEMINI MODELS")
-print("="*60)
-try:
-    for model in genai.list_models():
-        if 'generateContent' in model.supported_generation_methods:
-            print(f"✓ {model.name}")
-except Exception as e:
-    print(f"❌ Error listing models: {e}")
-print("="*60 + "\n")
+log = get_logger("trainer")
+
+MODEL_NAME = "gemini-2.5-flash"
+
+# Generated modules depend only on the rendered prompt, so identical
+# (topic, role, industry) requests are served from here instead of Gemini
+content_cache = ContentCache(
+    path=os.getenv(
+        "CONTENT_CACHE_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "content_cache.db"),
+    ) or None,
+    max_entries=int(os.getenv("CONTENT_CACHE_SIZE", "256")),
+    memory_ttl=int(os.getenv("CONTENT_CACHE_TTL", "3600")),
+    disk_ttl=int(os.getenv("CONTENT_CACHE_DISK_TTL", str(30 * 86400))),
+)
+
+# Concurrent requests for the same prompt share one Gemini call
+inflight_requests = SingleFlight()
+
+# Offline mode never contacts Gemini and serves fallback content only
+OFFLINE_MODE = os.getenv("CYBERBRIDGE_OFFLINE", "false").lower() in ("1", "true", "yes")
+
+# How modules are tailored to a user:
+#   off      - one full generation per (topic, role, industry)
+#   template - one base module per topic, personalized from curated tables
+#   llm      - like template, but a small model rewrites the introduction
+#              and examples (template personalization if that fails)
+PERSONALIZATION_MODE = os.getenv("PERSONALIZATION_MODE", "off").lower()
+if PERSONALIZATION_MODE not in ("off", "template", "llm"):
+    raise ValueError(
+        f"Unknown PERSONALIZATION_MODE '{PERSONALIZATION_MODE}' (expected 'off', 'template' or 'llm')"
+    )
+REWRITE_MODEL_NAME = os.getenv("PERSONALIZATION_MODEL", "gemini-2.5-flash-lite")
+REWRITE_TIMEOUT = float(os.getenv("PERSONALIZATION_TIMEOUT", "5"))
+
+# Shared Gemini clients, configured lazily on first use so importing this
+# module never touches the network
+_models = {}
+_model_unavailable = False
+_model_lock = threading.Lock()
+
+def get_model(model_name=MODEL_NAME):
+    """
+    Return the shared Gemini model, configuring the client on first use
+
+    Returns None in offline mode or when GEMINI_API_KEY is missing, in which
+    case callers fall back to built-in content.
+    """
+    global _model_unavailable
+
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+    if OFFLINE_MODE or _model_unavailable:
+        return None
+
+    with _model_lock:
+        if model_name not in _models and not _model_unavailable:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                log.warning("gemini_not_configured", extra={"reason": "GEMINI_API_KEY is not set"})
+                _model_unavailable = True
+                return None
+
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            _models[model_name] = genai.GenerativeModel(model_name)
+    return _models.get(model_name)
+
+# Per-attempt and per-request time limits, and retries after a transient error
+GENERATION_TIMEOUT = float(os.getenv("GENERATION_TIMEOUT", "25"))
+GENERATION_DEADLINE = float(os.getenv("GENERATION_DEADLINE", "40"))
+GENERATION_RETRIES = int(os.getenv("GENERATION_RETRIES", "1"))
+
+# A curriculum answer is several modules long, so it gets longer limits
+CURRICULUM_TIMEOUT = float(os.getenv("CURRICULUM_TIMEOUT", "60"))
+CURRICULUM_DEADLINE = float(os.getenv("CURRICULUM_DEADLINE", "90"))
+MAX_CURRICULUM_TOPICS = int(os.getenv("MAX_CURRICULUM_TOPICS", "6"))
+
+# Stop calling the provider while most recent calls fail; requests get
+# cached or fallback content immediately instead of waiting for timeouts
+provider_breaker = CircuitBreaker(
+    "content_provider",
+    failure_threshold=float(os.getenv("BREAKER_FAILURE_RATE", "0.5")),
+    min_calls=int(os.getenv("BREAKER_MIN_CALLS", "5")),
+    window=int(os.getenv("BREAKER_WINDOW", "20")),
+    open_seconds=float(os.getenv("BREAKER_OPEN_SECONDS", "30")),
+)
+
+# Rewrites use a different model, so they get their own breaker
+rewrite_breaker = CircuitBreaker(
+    "personalization",
+    failure_threshold=float(os.getenv("BREAKER_FAILURE_RATE", "0.5")),
+    min_calls=int(os.getenv("BREAKER_MIN_CALLS", "5")),
+    window=int(os.getenv("BREAKER_WINDOW", "20")),
+    open_seconds=float(os.getenv("BREAKER_OPEN_SECONDS", "30")),
+)
+
+generation_latency = Histogram(
+    "cyberbridge_generation_seconds", "Content provider call latency by outcome"
+)
+
+# Where each training module's content came from: ai, cache or fallback;
+# fallback / total is the fallback rate
+training_content = Counter(
+    "cyberbridge_training_content_total", "Training modules served by content source"
+)
+
+_provider = None
+_rewrite_provider = None
+
+def get_provider():
+    """
+    Return the content provider selected by CYBERBRIDGE_PROVIDER
+
+    Returns None in offline mode, or when Gemini is selected but not
+    configured.
+    """
+    global _provider
+
+    if OFFLINE_MODE:
+        return None
+    if _provider is None:
+        with _model_lock:
+            if _provider is None:
+                _provider = make_provider(get_model)
+    return _provider if _provider.available else None
+
+def get_rewrite_provider():
+    """Provider for personalization rewrites (PERSONALIZATION_MODEL), or None"""
+    global _rewrite_provider
+
+    if OFFLINE_MODE:
+        return None
+    if _rewrite_provider is None:
+        with _model_lock:
+            if _rewrite_provider is None:
+                _rewrite_provider = make_provider(lambda: get_model(REWRITE_MODEL_NAME))
+    return _rewrite_provider if _rewrite_provider.available else None
+
+def _observe(provider, outcome, seconds):
+    generation_latency.observe(seconds, provider=provider.name, outcome=outcome)
+
+def provider_status():
+    """Breaker state and latency histograms for the admin endpoint"""
+    return {
+        "provider": os.getenv("CYBERBRIDGE_PROVIDER", "gemini").lower(),
+        "offline": OFFLINE_MODE,
+        "timeouts": {
+            "attempt_seconds": GENERATION_TIMEOUT,
+            "deadline_seconds": GENERATION_DEADLINE,
+            "retries": GENERATION_RETRIES,
+        },
+        "personalization": PERSONALIZATION_MODE,
+        "breaker": provider_breaker.stats(),
+        "rewrite_breaker": rewrite_breaker.stats(),
+        "latency": generation_latency.snapshot(),
+    }
+
+def list_available_models():
+    """Return the names of Gemini models that support generateContent"""
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("❌ GEMINI_API_KEY not found in .env file")
+
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return [
+        model.name for model in genai.list_models()
+        if "generateContent" in model.supported_generation_methods
+    ]
 
 def create_training_prompt(topic, user_profile):
     """Create a prompt for Gemini to generate training content"""
@@ -79,60 +240,447 @@ def generate_training_module(topic, user_profile):
     Returns:
         Dict with training content or None if error
     """
-    
+
+    if PERSONALIZATION_MODE == "off":
+        return _generate_module(topic, user_profile)
+
+    base = _generate_module(topic, BASE_PROFILE)
+    if base is None:
+        return None
+    return personalize_module(base, topic, user_profile)
+
+def _generate_module(topic, user_profile):
+    """Cached, coalesced generation of one module for exactly this profile"""
+
+    with span("prompt_build"):
+        prompt = create_training_prompt(topic, user_profile)
+        cache_key = make_cache_key(prompt, MODEL_NAME)
+
+    with span("cache_lookup"):
+        cached = content_cache.get(cache_key)
+    if cached is not None:
+        log.debug("content_cache_hit", extra={"topic": topic, "role": user_profile["role"]})
+        training_content.inc(source="cache")
+        return cached
+
+    content = inflight_requests.do(
+        cache_key, _generate_uncached, topic, user_profile, prompt, cache_key
+    )
+    if content is not None:
+        training_content.inc(source="ai")
+    return content
+
+def is_module_cached(topic, user_profile):
+    """True when generate_training_module would not need a full generation"""
+    if PERSONALIZATION_MODE != "off":
+        user_profile = BASE_PROFILE
     prompt = create_training_prompt(topic, user_profile)
-    
+    return content_cache.contains(make_cache_key(prompt, MODEL_NAME))
+
+def _generate_uncached(topic, user_profile, prompt, cache_key):
+    """Call Gemini for a prompt no other request is currently generating"""
+
+    # A previous leader for this key may have filled the cache while we queued
+    cached = content_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    provider = get_provider()
+    if provider is None:
+        return None
+
+    context = {"topic": topic, "role": user_profile["role"], "provider": provider.name}
+    text = ""
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        
-        print(f"\n{'='*60}")
-        print(f"🤖 GENERATING AI CONTENT")
-        print(f"{'='*60}")
-        print(f"Topic: {topic}")
-        print(f"Role: {user_profile['role']}")
-        print(f"Industry: {user_profile['industry']}")
-        print(f"Calling Gemini API...")
-        
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-        
-        print(f"✓ API Response received ({len(text)} chars)")
-        
-        # Remove markdown code blocks if present
-        if text.startswith("```"):
-            print(f"  Removing markdown code blocks...")
-            text = text.replace("```json", "").replace("```", "").strip()
-        
-        # Try to parse JSON
-        print(f"  Parsing JSON...")
-        content = json.loads(text)
-        
-        print(f"✅ SUCCESS: Generated '{content.get('title', topic)}'")
-        print(f"   - Key concepts: {len(content.get('key_concepts', []))} items")
-        print(f"   - Examples: {len(content.get('real_world_examples', []))} items")
-        print(f"   - Best practices: {len(content.get('best_practices', []))} items")
-        print(f"   - Quiz questions: {len(content.get('quiz', []))} questions")
-        print(f"{'='*60}\n")
+        with span("provider_call"):
+            text = call_with_retries(
+                lambda timeout: provider.generate(prompt, timeout),
+                provider_breaker,
+                attempt_timeout=GENERATION_TIMEOUT,
+                deadline=GENERATION_DEADLINE,
+                retries=GENERATION_RETRIES,
+                retry_on=(ProviderError, DeadlineExceeded),
+                on_attempt=lambda outcome, seconds: _observe(provider, outcome, seconds),
+            ).strip()
+
+        with span("json_parse"):
+            # Remove markdown code blocks if present
+            if text.startswith("```"):
+                text = text.replace("```json", "").replace("```", "").strip()
+            content = json.loads(text)
+
+        if not is_valid_module(content):
+            # Never cache a module without every section and an answerable quiz
+            log.warning("content_invalid_module", extra={**context, "response_head": text[:300]})
+            return None
+
+        log.info("content_generated", extra={
+            **context,
+            "chars": len(text),
+            "key_concepts": len(content.get("key_concepts", [])),
+            "quiz_questions": len(content.get("quiz", [])),
+        })
+        content_cache.set(cache_key, content, topic=topic)
         return content
-        
+
     except json.JSONDecodeError as e:
-        print(f"\n{'='*60}")
-        print(f"❌ JSON PARSING ERROR")
-        print(f"{'='*60}")
-        print(f"Error: {e}")
-        print(f"Raw response (first 300 chars):")
-        print(f"{text[:300]}")
-        print(f"{'='*60}\n")
+        log.warning("content_invalid_json", extra={**context, "error": str(e), "response_head": text[:300]})
+        return None
+    except CircuitOpenError:
+        log.info("content_skipped_circuit_open", extra=context)
+        return None
+    except Exception as e:
+        log.warning("content_generation_failed", extra={
+            **context, "error_type": type(e).__name__, "error": str(e),
+        })
+        return None
+
+def personalize_module(base, topic, user_profile):
+    """Tailor a base module to user_profile according to PERSONALIZATION_MODE"""
+    with span("personalize"):
+        if PERSONALIZATION_MODE == "llm":
+            content = _rewrite_module(base, topic, user_profile)
+            if content is not None:
+                return content
+        return personalize(base, topic, user_profile)
+
+def _rewrite_module(base, topic, user_profile):
+    """Have the small model rewrite the introduction and examples; None on failure"""
+    prompt = rewrite_prompt(base, topic, user_profile)
+    cache_key = make_cache_key(prompt, REWRITE_MODEL_NAME)
+    cached = content_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    provider = get_rewrite_provider()
+    if provider is None:
+        return None
+    try:
+        text = call_with_retries(
+            lambda timeout: provider.generate(prompt, timeout),
+            rewrite_breaker,
+            attempt_timeout=REWRITE_TIMEOUT,
+            deadline=REWRITE_TIMEOUT,
+            retries=0,
+            on_attempt=lambda outcome, seconds: generation_latency.observe(
+                seconds, provider=f"{provider.name}-rewrite", outcome=outcome
+            ),
+        )
+        content = apply_rewrite(base, text)
+    except CircuitOpenError:
         return None
     except Exception as e:
-        print(f"\n{'='*60}")
-        print(f"❌ GEMINI API ERROR")
-        print(f"{'='*60}")
-        print(f"Error type: {type(e).__name__}")
-        print(f"Error message: {e}")
-        print(f"{'='*60}\n")
+        log.warning("personalization_rewrite_failed", extra={
+            "topic": topic, "role": user_profile["role"], "error_type": type(e).__name__, "error": str(e),
+        })
         return None
 
+    content_cache.set(cache_key, content, topic=topic)
+    return content
+
+def stream_training_module(topic, user_profile):
+    """
+    Stream AI training content section by section
+
+    Args:
+        topic: Training topic (e.g., "Phishing Awareness")
+        user_profile: Dict with 'role', 'industry', 'tech_level'
+
+    Yields:
+        ("section", event) for each completed section (see ModuleStreamParser),
+        then ("complete", {"content": dict, "source": "cache" | "ai"}) or
+        ("failed", error message). Sections may already have been yielded
+        before a failure.
+    """
+
+    if PERSONALIZATION_MODE != "off":
+        # Personalizing a base module takes milliseconds, so only a missing
+        # base module is worth streaming, and that happens once per topic
+        source = "cache" if is_module_cached(topic, user_profile) else "ai"
+        content = generate_training_module(topic, user_profile)
+        if content is None:
+            yield "failed", "Content provider did not return a base module"
+            return
+        for event in iter_sections(content):
+            yield "section", event
+        yield "complete", {"content": content, "source": source}
+        return
+
+    prompt = create_training_prompt(topic, user_profile)
+    cache_key = make_cache_key(prompt, MODEL_NAME)
+
+    cached = content_cache.get(cache_key)
+    if cached is not None:
+        training_content.inc(source="cache")
+        for event in iter_sections(cached):
+            yield "section", event
+        yield "complete", {"content": cached, "source": "cache"}
+        return
+
+    provider = get_provider()
+    if provider is None:
+        yield "failed", "Content provider is not configured"
+        return
+    if not provider_breaker.allow():
+        yield "failed", "Content provider circuit is open"
+        return
+
+    parser = ModuleStreamParser()
+    started = time.monotonic()
+    outcome = None
+    context = {"topic": topic, "role": user_profile["role"], "provider": provider.name}
+    try:
+        log.info("content_stream_started", extra=context)
+
+        for text in provider.stream(prompt, GENERATION_TIMEOUT):
+            if time.monotonic() - started > GENERATION_DEADLINE:
+                raise DeadlineExceeded(f"stream took longer than {GENERATION_DEADLINE}s")
+            for event in parser.feed(text):
+                yield "section", event
+
+        content = parser.result()
+        outcome = "ok" if is_valid_module(content) else "invalid_module"
+    except ValueError as e:
+        # The provider answered; the model just wrote bad JSON
+        outcome = "invalid_json"
+        log.warning("content_invalid_json", extra={**context, "error": str(e)})
+        yield "failed", f"Invalid JSON from model: {e}"
+        return
+    except Exception as e:
+        outcome = "error"
+        log.warning("content_stream_failed", extra={
+            **context, "error_type": type(e).__name__, "error": str(e),
+        })
+        yield "failed", f"{type(e).__name__}: {e}"
+        return
+    finally:
+        if outcome == "error":
+            provider_breaker.record_failure()
+        elif outcome is None:
+            provider_breaker.record_cancelled()
+        else:
+            provider_breaker.record_success()
+        if outcome is not None:
+            _observe(provider, outcome, time.monotonic() - started)
+
+    if outcome == "invalid_module":
+        log.warning("content_invalid_module", extra=context)
+        yield "failed", "Model returned a module with missing sections or no answerable quiz"
+        return
+
+    content_cache.set(cache_key, content, topic=topic)
+    training_content.inc(source="ai")
+    yield "complete", {"content": content, "source": "ai"}
+
+def create_curriculum_prompt(topics, user_profile):
+    """Create one prompt asking Gemini for a training module per topic"""
+
+    topic_lines = "\n".join(f"- {topic}" for topic in topics)
+    return f"""
+You are an expert cybersecurity trainer creating a short curriculum of training modules.
+
+Create one training module for each topic below and return them in JSON format with this structure:
+
+{{
+  "modules": [
+    {{
+      "topic": "string - the topic exactly as listed below",
+      "title": "string - module title",
+      "introduction": "string - 2-3 sentences explaining why this matters for their role",
+      "key_concepts": [
+        {{"concept": "string - concept name", "explanation": "string - clear explanation"}}
+      ],
+      "real_world_examples": [
+        "string - realistic example"
+      ],
+      "best_practices": [
+        "string - actionable best practice"
+      ],
+      "quiz": [
+        {{"question": "string - quiz question", "options": ["option A", "option B", "option C"], "correct": "option A"}}
+      ]
+    }}
+  ]
+}}
+
+Topics:
+{topic_lines}
+
+User Role: {user_profile['role']}
+Industry: {user_profile['industry']}
+Technical Level: beginner
+
+Requirements for every module:
+- Make it relevant to their {user_profile['industry']} industry
+- Use real examples from their role ({user_profile['role']})
+- Keep it practical and actionable
+- Include 3-4 key concepts
+- Include 2-3 real world examples
+- Include 4-5 best practices
+- Include 3-5 quiz questions with clear correct answers; "correct" must be one of the options
+- Do not repeat the same examples or questions across modules
+- Use professional but accessible language
+
+IMPORTANT: Return ONLY the JSON. No extra text, no markdown, no explanations. Just the JSON object.
+"""
+
+def is_valid_module(content):
+    """True when module content has every section and an answerable quiz"""
+    if not isinstance(content, dict):
+        return False
+    if not all(isinstance(content.get(key), str) and content[key].strip() for key in ("title", "introduction")):
+        return False
+    if not all(isinstance(content.get(key), list) for key in ARRAY_SECTIONS):
+        return False
+    if not all(
+        isinstance(item, dict) and item.get("concept") and item.get("explanation")
+        for item in content["key_concepts"]
+    ):
+        return False
+    quiz = content["quiz"]
+    return bool(quiz) and all(
+        isinstance(question, dict)
+        and question.get("question")
+        and isinstance(question.get("options"), list)
+        and question.get("correct") in question["options"]
+        for question in quiz
+    )
+
+def split_curriculum(data, topics):
+    """
+    Map each requested topic to its module from a curriculum answer
+
+    Modules are matched by their "topic" field; when the model left that
+    out, they are matched by position. Modules that fail validation, and
+    topics with no module, map to None.
+    """
+    modules = data.get("modules") if isinstance(data, dict) else None
+    if not isinstance(modules, list):
+        return {topic: None for topic in topics}
+
+    by_topic = {}
+    for module in modules:
+        if isinstance(module, dict) and isinstance(module.get("topic"), str):
+            by_topic.setdefault(module["topic"].strip().lower(), module)
+
+    result = {}
+    for position, topic in enumerate(topics):
+        module = by_topic.get(topic.lower())
+        if module is None and not by_topic and position < len(modules):
+            module = modules[position]
+        if module is not None:
+            module = {key: value for key, value in module.items() if key != "topic"}
+        result[topic] = module if is_valid_module(module) else None
+    return result
+
+def generate_curriculum(topics, user_profile):
+    """
+    Generate content for several topics with at most one Gemini call
+
+    Topics already in the cache are served from it; the rest are requested
+    together in one curriculum prompt, and each module that comes back valid
+    is cached under the same key a single-module request would use.
+
+    Args:
+        topics: Training topics, without duplicates
+        user_profile: Dict with 'role', 'industry', 'tech_level'
+
+    Returns:
+        Dict of topic -> (content, source), where source is "cache" or "ai";
+        content is None (and source None) for topics that need fallback content
+    """
+
+    if PERSONALIZATION_MODE == "off":
+        return _generate_curriculum(topics, user_profile)
+
+    return {
+        topic: (personalize_module(base, topic, user_profile) if base is not None else None, source)
+        for topic, (base, source) in _generate_curriculum(topics, BASE_PROFILE).items()
+    }
+
+def _generate_curriculum(topics, user_profile):
+    """Cached generation of several modules for exactly this profile"""
+
+    with span("prompt_build"):
+        keys = {
+            topic: make_cache_key(create_training_prompt(topic, user_profile), MODEL_NAME)
+            for topic in topics
+        }
+
+    result = {}
+    with span("cache_lookup"):
+        for topic in topics:
+            cached = content_cache.get(keys[topic])
+            if cached is not None:
+                training_content.inc(source="cache")
+                result[topic] = (cached, "cache")
+
+    missing = [topic for topic in topics if topic not in result]
+    if len(missing) == 1:
+        # The single-module prompt is shorter and shares its cache entry
+        content = _generate_module(missing[0], user_profile)
+        result[missing[0]] = (content, "ai" if content is not None else None)
+        missing = []
+
+    if missing:
+        prompt = create_curriculum_prompt(missing, user_profile)
+        generated = inflight_requests.do(
+            make_cache_key(prompt, MODEL_NAME),
+            _generate_curriculum_uncached, missing, user_profile, prompt, keys,
+        )
+        for topic in missing:
+            content = generated.get(topic)
+            if content is not None:
+                training_content.inc(source="ai")
+            result[topic] = (content, "ai" if content is not None else None)
+
+    return {topic: result[topic] for topic in topics}
+
+def _generate_curriculum_uncached(topics, user_profile, prompt, keys):
+    """Call Gemini for a curriculum no other request is currently generating"""
+
+    provider = get_provider()
+    if provider is None:
+        return {}
+
+    context = {"topics": topics, "role": user_profile["role"], "provider": provider.name}
+    text = ""
+    try:
+        with span("provider_call"):
+            text = call_with_retries(
+                lambda timeout: provider.generate(prompt, timeout),
+                provider_breaker,
+                attempt_timeout=CURRICULUM_TIMEOUT,
+                deadline=CURRICULUM_DEADLINE,
+                retries=GENERATION_RETRIES,
+                retry_on=(ProviderError, DeadlineExceeded),
+                on_attempt=lambda outcome, seconds: _observe(provider, outcome, seconds),
+            ).strip()
+
+        with span("json_parse"):
+            if text.startswith("```"):
+                text = text.replace("```json", "").replace("```", "").strip()
+            modules = split_curriculum(json.loads(text), topics)
+
+    except json.JSONDecodeError as e:
+        log.warning("curriculum_invalid_json", extra={**context, "error": str(e), "response_head": text[:300]})
+        return {}
+    except CircuitOpenError:
+        log.info("content_skipped_circuit_open", extra=context)
+        return {}
+    except Exception as e:
+        log.warning("curriculum_generation_failed", extra={
+            **context, "error_type": type(e).__name__, "error": str(e),
+        })
+        return {}
+
+    for topic, content in modules.items():
+        if content is not None:
+            content_cache.set(keys[topic], content, topic=topic)
+    rejected = [topic for topic, content in modules.items() if content is None]
+    log.info("curriculum_generated", extra={**context, "chars": len(text), "rejected": rejected})
+    return modules
+
 def get_fallback_content(topic):
     """Fallback content if AI generation fails"""
     
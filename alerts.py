@@ -0,0 +1,137 @@
+"""
+Dashboard alerts derived from a user's training sessions
+
+Each rule reads the facts gathered by build_facts() from the session rows
+the dashboard has already loaded, and returns zero or more alerts, so
+evaluating them costs no queries. Results are cached per user version:
+User.data_version changes whenever one of the user's sessions does, and
+the date is part of the key because the overdue and stale rules move with
+time.
+"""
+
+import os
+from datetime import datetime
+from content_cache import LRUCache
+
+LOW_SCORE = 70  # Completed modules scoring below this get a retake warning
+STALE_AFTER_DAYS = 7  # Sessions in progress this long get a reminder
+DUE_AFTER_DAYS = 14  # Every catalogue module should be completed this long after registering
+MAX_ALERTS = 5
+
+_alert_cache = LRUCache(max_entries=int(os.getenv("ALERT_CACHE_SIZE", "10000")))
+
+
+def build_facts(sessions, catalog, registered_at, now=None):
+    """
+    Summarize session rows for the rules
+
+    Args:
+        sessions: Rows with id, module_name, completion_status, quiz_score
+            and started_at
+        catalog: Module names every user is expected to complete
+        registered_at: When the user registered
+        now: Current time (default: utcnow)
+    """
+    now = now or datetime.utcnow()
+
+    # The most recent session of each module decides its state
+    latest = {}
+    for row in sessions:
+        current = latest.get(row.module_name)
+        if current is None or row.id > current.id:
+            latest[row.module_name] = row
+
+    completed = [name for name, row in latest.items() if row.completion_status == "completed"]
+    return {
+        "now": now,
+        "catalog": list(catalog),
+        "latest": latest,
+        "completed": completed,
+        "catalog_completed": [name for name in catalog if name in completed],
+        "overdue": registered_at is not None and (now - registered_at).days >= DUE_AFTER_DAYS,
+    }
+
+
+def low_scores(facts):
+    return [
+        {
+            "type": "warning",
+            "message": f"⚠️ {name} score is {row.quiz_score:.0f}%, below {LOW_SCORE}%. Retake it to improve.",
+        }
+        for name, row in facts["latest"].items()
+        if row.completion_status == "completed" and row.quiz_score is not None and row.quiz_score < LOW_SCORE
+    ]
+
+
+def stale_sessions(facts):
+    alerts = []
+    for name, row in facts["latest"].items():
+        if row.completion_status != "in_progress" or row.started_at is None:
+            continue
+        days = (facts["now"] - row.started_at).days
+        if days >= STALE_AFTER_DAYS:
+            alerts.append({
+                "type": "info",
+                "message": f"⏳ {name} has been in progress for {days} days. Finish it to record your score.",
+            })
+    return alerts
+
+
+def overdue_modules(facts):
+    if not facts["overdue"]:
+        return []
+    missing = [name for name in facts["catalog"] if name not in facts["completed"]]
+    if not missing:
+        return []
+    return [{
+        "type": "warning",
+        "message": f"📅 Overdue: {', '.join(missing)} should have been completed within {DUE_AFTER_DAYS} days.",
+    }]
+
+
+def next_module(facts):
+    if facts["overdue"]:
+        return []
+    for name in facts["catalog"]:
+        row = facts["latest"].get(name)
+        if row is None or row.completion_status == "not_started":
+            return [{"type": "info", "message": f"📚 Start {name} this week."}]
+    return []
+
+
+def progress(facts):
+    done, total = len(facts["catalog_completed"]), len(facts["catalog"])
+    if total and done == total:
+        return [{"type": "success", "message": f"🏆 All {total} modules completed. Great work!"}]
+    if done:
+        return [{"type": "success", "message": f"🎉 Great job completing {done} out of {total} modules!"}]
+    return []
+
+
+# Evaluated in order; earlier rules win when there are more than MAX_ALERTS
+RULES = (low_scores, overdue_modules, stale_sessions, next_module, progress)
+
+
+def evaluate(facts):
+    """Run every rule and return at most MAX_ALERTS alerts, tagged with their rule"""
+    alerts = []
+    for rule in RULES:
+        alerts.extend(dict(alert, rule=rule.__name__) for alert in rule(facts))
+    return alerts[:MAX_ALERTS]
+
+
+def user_alerts(version, sessions, catalog, registered_at, now=None):
+    """
+    Alerts for one user, cached until version changes
+
+    Args:
+        version: Hashable that changes whenever the user's sessions do,
+            e.g. (user_id, created_at, data_version)
+    """
+    now = now or datetime.utcnow()
+    key = (version, now.date())
+    alerts = _alert_cache.get(key)
+    if alerts is None:
+        alerts = evaluate(build_facts(sessions, catalog, registered_at, now))
+        _alert_cache.set(key, alerts)
+    return alerts
@@ -1,138 +1,429 @@
-from flask import Flask, render_template, jsonify, request
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-import os
-from dotenv import load_dotenv
+from flask import Blueprint, Flask, Response, current_app, render_template, jsonify, request, stream_with_context
+from datetime import date, datetime, timedelta
+from functools import wraps
+import hmac
+import time
+import click
 import json
-from ai_trainer import generate_training_module, get_fallback_content
-
-load_dotenv()
-
-app = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///cyberbridge.db"
-app.config["SECRET_KEY"] = "dev-key-change-this"
-
-db = SQLAlchemy(app)
-
-# ===== MODELS =====
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    organization = db.Column(db.String(200))
-    industry = db.Column(db.String(100))
-    role = db.Column(db.String(100))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    risk_score = db.Column(db.Float, default=0.0)
-
-class TrainingSession(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    module_name = db.Column(db.String(200))
-    content = db.Column(db.Text)  # JSON string
-    completion_status = db.Column(db.String(50), default="not_started")
-    quiz_score = db.Column(db.Float)
-    started_at = db.Column(db.DateTime)
-    completed_at = db.Column(db.DateTime)
+from ai_trainer import (
+    MAX_CURRICULUM_TOPICS,
+    generate_curriculum,
+    generate_training_module,
+    get_fallback_content,
+    content_cache,
+    inflight_requests,
+    is_module_cached,
+    list_available_models,
+    provider_breaker,
+    provider_status,
+    stream_training_module,
+    training_content,
+)
+from config import settings_from_env
+from jobs import JobQueue, QueueFullError
+from group_commit import GroupCommitWriter
+from storage import configure_storage, immediate_transactions, install_sqlite_hooks, storage_status
+from bulk_import import import_users, iter_rows
+from models import db, User, TrainingSession, bump_data_version, normalize_email
+from content_store import load_public_session_json, store_document
+from documents import DocumentCaches, serialize_content
+from json_provider import dumps_bytes, make_json_provider, raw_json_response
+from http_cache import conditional_stats, make_etag, not_modified, with_etag
+from migrations import upgrade_database
+from question_bank import MAX_QUIZ_QUESTIONS, assemble_quiz, backfill_question_bank, grade_banked_answers
+from shared_cache import SharedCache
+from session_history import DEFAULT_PAGE_SIZE, list_sessions, parse_filters
+from timeline import completion_timeline
+from rollups import (
+    org_dashboard,
+    rebuild_rollups,
+    record_session_completed,
+    record_session_started,
+    record_user_created,
+)
+from pregen import load_matrix, pregenerate
+from risk import recompute_risk_scores, update_user_risk
+from alerts import user_alerts
+from grading import get_answer_key, grade_answers, public_content, public_section
+from stream_parser import iter_sections
+from telemetry import (
+    REQUEST_BUCKETS,
+    Histogram,
+    configure_logging,
+    finish_trace,
+    get_logger,
+    register_collector,
+    render_prometheus,
+    span,
+    start_trace,
+)
+
+configure_logging()
+
+log = get_logger("app")
+
+# Routes, request hooks and CLI commands; create_app() attaches them to an app
+bp = Blueprint("cyberbridge", __name__, cli_group=None)
+
+http_latency = Histogram(
+    "cyberbridge_http_request_seconds", "HTTP request latency", REQUEST_BUCKETS
+)
+
+# ===== APP FACTORY =====
+
+def create_app(config=None):
+    """
+    Build the Flask app: settings_from_env() plus config overrides
+
+    Nothing here opens a database connection, a socket or a thread. Engines
+    connect, and the job queue, group-commit writer, log writer and cache
+    connections start, on first use in the process that uses them. A
+    server can therefore import and build the app once and then fork its
+    workers (gunicorn --preload, see wsgi.py).
+    """
+    app = Flask(__name__)
+    app.config.update(settings_from_env())
+    app.config.update(config or {})
+
+    app.json = make_json_provider(app)
+    sqlite_tuned = configure_storage(app)
+    db.init_app(app)
+    if sqlite_tuned:
+        with app.app_context():
+            install_sqlite_hooks(db.engine)
+
+    # Background content generation for asynchronous /api/training/start
+    app.extensions["training_jobs"] = JobQueue(
+        workers=app.config["TRAINING_WORKERS"],
+        max_depth=app.config["TRAINING_QUEUE_DEPTH"],
+    )
+
+    # Quiz results from concurrent requests committed together, see group_commit.py
+    app.extensions["completion_writer"] = None
+    if app.config["GROUP_COMMIT"]:
+        if not sqlite_tuned:
+            raise ValueError("GROUP_COMMIT needs STORAGE_MODE=production and a SQLite DATABASE_URL")
+        app.extensions["completion_writer"] = GroupCommitWriter(
+            app,
+            db,
+            interval=app.config["GROUP_COMMIT_INTERVAL_MS"] / 1000,
+            max_batch=app.config["GROUP_COMMIT_MAX_BATCH"],
+        )
+
+    # Dashboard payloads shared by every worker process, see shared_cache.py
+    app.extensions["shared_cache"] = None
+    if app.config["SHARED_CACHE_PATH"]:
+        app.extensions["shared_cache"] = SharedCache(
+            app.config["SHARED_CACHE_PATH"], ttl=app.config["SHARED_CACHE_TTL"]
+        )
+
+    # Decoded documents and answer keys, keyed by this app's database row ids
+    app.extensions["document_caches"] = DocumentCaches(
+        documents=app.config["DOCUMENT_CACHE_SIZE"],
+        answer_keys=app.config["ANSWER_KEY_CACHE_SIZE"],
+    )
+
+    app.register_blueprint(bp)
+    return app
+
+def view_name():
+    """Endpoint without the blueprint prefix, so metric labels stay the view function names"""
+    return (request.endpoint or "unmatched").rpartition(".")[2]
+
+@bp.before_app_request
+def begin_request_trace():
+    request.started_at = time.perf_counter()
+    start_trace()
+
+@bp.after_app_request
+def record_request(response):
+    started = getattr(request, "started_at", None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = view_name()
+    http_latency.observe(elapsed, method=request.method, endpoint=endpoint, status=response.status_code)
+    log.info("request", extra={
+        "method": request.method,
+        "path": request.path,
+        "endpoint": endpoint,
+        "status": response.status_code,
+        "ms": round(elapsed * 1000, 3),
+        "spans": finish_trace(),
+    })
+    return response
+
+def admin_required(view):
+    """Require an X-Admin-Token header matching ADMIN_TOKEN; refuse everyone when it is unset"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get("ADMIN_TOKEN")
+        if not token:
+            return jsonify({"error": "Admin endpoints are disabled; set ADMIN_TOKEN"}), 403
+        if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+            return jsonify({"error": "Admin token required"}), 403
+        return view(*args, **kwargs)
+    return wrapper
 
 # ===== ROUTES =====
-@app.route("/")
+@bp.route("/")
 def index():
     return render_template("risk-profile.html")
 
-@app.route("/dashboard")
+@bp.route("/dashboard")
 def dashboard():
     return render_template("dashboard.html")
 
-@app.route("/training")
+@bp.route("/training")
 def training_page():
     return render_template("training.html")
 
-@app.route("/api/user/register", methods=["POST"])
+@bp.route("/api/user/register", methods=["POST"])
 def register_user():
     data = request.json
     user = User(
-        email=data["email"],
+        email=normalize_email(data["email"]),
         organization=data.get("organization", "Demo Org"),
         industry=data.get("industry", "General"),
         role=data.get("role", "Employee"),
     )
     db.session.add(user)
+    record_user_created(user)
     db.session.commit()
     return jsonify({"user_id": user.id, "message": "User created"}), 201
 
+@bp.route("/api/users/bulk", methods=["POST"])
+@admin_required
+def bulk_import_users():
+    """
+    Stream-import users from a CSV or JSONL request body
+
+    Query params: format=csv|jsonl (default from Content-Type),
+    on_duplicate=skip|update, batch_size
+    """
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = "jsonl" if "json" in (request.content_type or "") else "csv"
+    if fmt not in ("csv", "jsonl"):
+        return jsonify({"error": "format must be csv or jsonl"}), 400
+
+    try:
+        report = import_users(
+            iter_rows(request.stream, fmt),
+            batch_size=max(request.args.get("batch_size", 500, type=int), 1),
+            on_duplicate=request.args.get("on_duplicate", "skip"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(report)
+
 # ===== DASHBOARD ENDPOINTS =====
 
-@app.route("/api/dashboard/metrics/<int:user_id>", methods=["GET"])
-def dashboard_metrics(user_id):
-    """Return dashboard KPIs and training progress"""
-    user = User.query.get_or_404(user_id)
-    sessions = TrainingSession.query.filter_by(user_id=user_id).all()
+def dashboard_version(user_id):
+    """(created_at, data_version) of a user, or None if there is no such user"""
+    return db.session.execute(
+        db.select(User.created_at, User.data_version).where(User.id == user_id)
+    ).one_or_none()
+
+def dashboard_etag(kind, user_id, version):
+    # The 7-day timeline moves with the date, so today is part of the version
+    return make_etag(kind, user_id, *version, datetime.utcnow().date())
+
+def load_dashboard_sessions(user_id):
+    """Only the lightweight session columns, never the module content"""
+    return db.session.execute(
+        db.select(
+            TrainingSession.id,
+            TrainingSession.module_name,
+            TrainingSession.completion_status,
+            TrainingSession.quiz_score,
+            TrainingSession.started_at,
+        ).where(TrainingSession.user_id == user_id)
+    ).all()
 
+def dashboard_summary(user, sessions):
+    """KPIs, 7-day timeline and module list, computed from the loaded session rows"""
     completed = sum(1 for s in sessions if s.completion_status == "completed")
-    total = len(sessions) if len(sessions) > 0 else 4  # Default 4 modules
-    avg_quiz = (
-        sum((s.quiz_score or 0) for s in sessions) / completed 
-        if completed > 0 else 0
-    )
+    score_sum = sum(s.quiz_score or 0 for s in sessions)
 
-    timeline = [
-        {"date": "Day 1", "completed": 0},
-        {"date": "Day 2", "completed": 1},
-        {"date": "Day 3", "completed": 2},
-        {"date": "Day 4", "completed": completed},
-    ]
+    total = len(sessions) if sessions else 4  # Default 4 modules
+    avg_quiz = score_sum / completed if completed > 0 else 0
 
-    return jsonify(
-        {
-            "user": {
-                "email": user.email,
-                "organization": user.organization,
-                "role": user.role,
-                "industry": user.industry,
-            },
-            "kpis": {
-                "training_completion": {
-                    "completed": completed,
-                    "total": total,
-                    "percentage": (completed / total * 100) if total > 0 else 0,
-                },
-                "average_quiz_score": round(avg_quiz, 1),
-                "risk_score": user.risk_score,
+    timeline = completion_timeline(
+        ("user", user.id), "day", start=datetime.utcnow().date() - timedelta(days=6)
+    )["buckets"]
+
+    return {
+        "user": {
+            "email": user.email,
+            "organization": user.organization,
+            "role": user.role,
+            "industry": user.industry,
+        },
+        "kpis": {
+            "training_completion": {
+                "completed": completed,
+                "total": total,
+                "percentage": (completed / total * 100) if total > 0 else 0,
             },
-            "completion_timeline": timeline,
-            "modules": [
-                {
-                    "id": s.id,
-                    "name": s.module_name,
-                    "status": s.completion_status,
-                    "score": s.quiz_score,
-                }
-                for s in sessions
-            ],
-        }
-    )
+            "average_quiz_score": round(avg_quiz, 1),
+            "risk_score": user.risk_score,
+        },
+        "completion_timeline": timeline,
+        "modules": [
+            {
+                "id": s.id,
+                "name": s.module_name,
+                "status": s.completion_status,
+                "score": s.quiz_score,
+            }
+            for s in sessions
+        ],
+    }
+
+def dashboard_alerts_for(user, version, sessions):
+    return user_alerts((user.id, *version), sessions, TRAINING_MODULES, user.created_at)
+
+def shared_json_response(etag, build):
+    """
+    JSON response for build(), reused by every worker for the same ETag
+
+    The ETag covers everything the payload depends on, so an entry found in
+    the shared cache is current and build() is skipped.
+    """
+    cache = current_app.extensions["shared_cache"]
+    key = f"json:{etag}"
+    body = cache.get(key) if cache else None
+    if body is None:
+        body = dumps_bytes(current_app, build())
+        if cache:
+            cache.set(key, body)
+    return current_app.response_class(body, mimetype=current_app.json.mimetype)
+
+@bp.route("/api/dashboard/<int:user_id>", methods=["GET"])
+def dashboard_bundle(user_id):
+    """Return KPIs, modules, timeline and alerts in one response"""
+    version = dashboard_version(user_id)
+    if version is None:
+        return jsonify({"error": "User not found"}), 404
+
+    etag = dashboard_etag("dashboard", user_id, version)
+    cached = not_modified(current_app, etag, "private, no-cache")
+    if cached is not None:
+        return cached
+
+    def build():
+        user = db.session.get(User, user_id)
+        sessions = load_dashboard_sessions(user_id)
+        payload = dashboard_summary(user, sessions)
+        payload["alerts"] = dashboard_alerts_for(user, version, sessions)
+        payload["catalog"] = TRAINING_MODULES
+        return payload
+
+    return with_etag(shared_json_response(etag, build), etag, "private, no-cache")
+
+@bp.route("/api/dashboard/metrics/<int:user_id>", methods=["GET"])
+def dashboard_metrics(user_id):
+    """Return dashboard KPIs and training progress"""
+    version = dashboard_version(user_id)
+    if version is None:
+        return jsonify({"error": "User not found"}), 404
 
-@app.route("/api/dashboard/alerts", methods=["GET"])
+    etag = dashboard_etag("metrics", user_id, version)
+    cached = not_modified(current_app, etag, "private, no-cache")
+    if cached is not None:
+        return cached
+
+    def build():
+        return dashboard_summary(db.session.get(User, user_id), load_dashboard_sessions(user_id))
+
+    return with_etag(shared_json_response(etag, build), etag, "private, no-cache")
+
+@bp.route("/api/org/dashboard", methods=["GET"])
+def organization_dashboard():
+    """Return KPIs for ?organization= and/or ?industry= from the rollup tables"""
+    return jsonify(org_dashboard(
+        organization=request.args.get("organization"),
+        industry=request.args.get("industry"),
+    ))
+
+@bp.route("/api/timeline", methods=["GET"])
+def timeline():
+    """
+    Completions over time for ?user_id= or ?organization= / ?industry=
+
+    Optional ?granularity=day|week|month and ?start= / ?end= (YYYY-MM-DD)
+    """
+    user_id = request.args.get("user_id", type=int)
+    organization = request.args.get("organization")
+    industry = request.args.get("industry")
+    if user_id:
+        scope = ("user", user_id)
+    elif organization or industry:
+        scope = ("org", organization, industry)
+    else:
+        return jsonify({"error": "user_id, organization or industry is required"}), 400
+
+    try:
+        start = date.fromisoformat(request.args["start"]) if "start" in request.args else None
+        end = date.fromisoformat(request.args["end"]) if "end" in request.args else None
+        result = completion_timeline(
+            scope, request.args.get("granularity", "day"), start=start, end=end
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify(result)
+    # A range that ended before the current bucket can never change
+    visibility = "private" if scope[0] == "user" else "public"
+    max_age = 86400 if result["closed"] else 60
+    response.headers["Cache-Control"] = f"{visibility}, max-age={max_age}"
+    return response
+
+@bp.route("/api/dashboard/alerts", methods=["GET"])
 def dashboard_alerts():
-    """Return security alerts for dashboard"""
-    return jsonify(
-        {
-            "alerts": [
-                {
-                    "type": "info",
-                    "message": "📚 Complete Phishing Awareness module this week.",
-                },
-                {
-                    "type": "warning",
-                    "message": "⚠️ Password Security score is below 70%.",
-                },
-                {
-                    "type": "success",
-                    "message": "🎉 Great job completing 3 out of 4 modules!",
-                },
-            ]
-        }
-    )
+    """Return security alerts for a user's dashboard"""
+    user_id = request.args.get("user_id", type=int)
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+
+    version = dashboard_version(user_id)
+    if version is None:
+        return jsonify({"error": "User not found"}), 404
+
+    etag = dashboard_etag("alerts", user_id, version)
+    cached = not_modified(current_app, etag, "private, no-cache")
+    if cached is not None:
+        return cached
+
+    user = db.session.get(User, user_id)
+    alerts = dashboard_alerts_for(user, version, load_dashboard_sessions(user_id))
+    return with_etag(jsonify({"alerts": alerts}), etag, "private, no-cache")
+
+def session_page(**scope):
+    """One page of list_sessions() for the filters, ?cursor= and ?limit= in the query string"""
+    try:
+        page = list_sessions(
+            **scope,
+            **parse_filters(request.args),
+            cursor=request.args.get("cursor"),
+            limit=request.args.get("limit", DEFAULT_PAGE_SIZE, type=int),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(page)
+
+@bp.route("/api/users/<int:user_id>/sessions", methods=["GET"])
+def user_session_history(user_id):
+    """
+    A user's sessions, newest first, one page at a time
+
+    Optional ?module=, ?status=, ?start= / ?end= (YYYY-MM-DD, on started_at),
+    ?limit= and ?cursor= (next_cursor of the previous page)
+    """
+    if dashboard_version(user_id) is None:
+        return jsonify({"error": "User not found"}), 404
+    return session_page(user_id=user_id)
 
 # ===== TRAINING ENDPOINTS =====
 
@@ -143,90 +434,597 @@ TRAINING_MODULES = [
     "Data Protection Basics",
 ]
 
-@app.route("/api/training/modules", methods=["GET"])
+TRAINING_MODULES_ETAG = make_etag("modules", *TRAINING_MODULES)
+
+@bp.route("/api/training/modules", methods=["GET"])
 def list_training_modules():
     """List available training modules"""
-    return jsonify({"modules": TRAINING_MODULES})
+    cache_control = "public, max-age=3600"
+    cached = not_modified(current_app, TRAINING_MODULES_ETAG, cache_control)
+    if cached is not None:
+        return cached
+    return with_etag(jsonify({"modules": TRAINING_MODULES}), TRAINING_MODULES_ETAG, cache_control)
+
+def build_user_profile(user):
+    """Personalization inputs for content generation"""
+    return {
+        "role": user.role or "Employee",
+        "industry": user.industry or "General",
+        "tech_level": "beginner",
+    }
+
+def store_module(module_name, content, user_profile=None):
+    """Store module content, banking its quiz under the profile's role and industry (none for fallback content)"""
+    profile = user_profile or {}
+    return store_document(content, topic=module_name, role=profile.get("role"), industry=profile.get("industry"))
+
+def generate_session_content(app, session_id, module_name, user_profile):
+    """Background job: generate content for a session created in 'generating' state"""
+    content = generate_training_module(module_name, user_profile)
+    if content is None:
+        user_profile = None
+        content = get_fallback_content(module_name)
+        training_content.inc(source="fallback")
+        log.warning("training_fallback", extra={"topic": module_name, "session_id": session_id})
 
-@app.route("/api/training/start", methods=["POST"])
+    # No request here to tell storage.py this transaction writes
+    with app.app_context(), immediate_transactions():
+        session = db.session.get(TrainingSession, session_id)
+        if session is None:
+            return
+        if content:
+            session.document_id = store_module(module_name, content, user_profile)
+            session.completion_status = "in_progress"
+        else:
+            session.completion_status = "failed"
+        bump_data_version(session.user_id)
+        db.session.commit()
+
+    if not content:
+        raise RuntimeError(f"No training content available for {module_name}")
+
+UNFINISHED_STATUSES = ("pending", "generating")
+
+def fail_stale_generations(older_than=None):
+    """
+    Mark sessions left 'generating' or 'pending' for over older_than seconds as failed
+
+    Their job died with the process running it (a restart or a crash), or
+    their stream was never opened, and no other process will finish them.
+    older_than defaults to TRAINING_STALE_AFTER: younger sessions may still
+    belong to another server, e.g. the old workers during a gunicorn USR2
+    upgrade. Returns how many sessions were reset.
+    """
+    if older_than is None:
+        older_than = current_app.config["TRAINING_STALE_AFTER"]
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    stuck = db.session.execute(
+        db.select(TrainingSession.id, TrainingSession.user_id).where(
+            TrainingSession.completion_status.in_(UNFINISHED_STATUSES), TrainingSession.started_at <= cutoff
+        )
+    ).all()
+    if not stuck:
+        return 0
+    db.session.execute(
+        db.update(TrainingSession)
+        .where(
+            TrainingSession.id.in_([row.id for row in stuck]),
+            TrainingSession.completion_status.in_(UNFINISHED_STATUSES),
+        )
+        .values(completion_status="failed")
+        .execution_options(synchronize_session=False)
+    )
+    bump_data_version(*{row.user_id for row in stuck})
+    db.session.commit()
+    log.warning("stale_generations_failed", extra={"sessions": len(stuck), "older_than": older_than})
+    return len(stuck)
+
+@bp.route("/api/training/start", methods=["POST"])
 def start_training():
     """Start a training session with AI-generated content"""
     data = request.json
     user_id = data["user_id"]
     module_name = data["module_name"]
+    run_async = data.get("async", current_app.config["TRAINING_ASYNC"])
 
-    print(f"\n{'='*70}")
-    print(f"📚 STARTING TRAINING SESSION")
-    print(f"{'='*70}")
-    print(f"Module: {module_name}")
-    print(f"User ID: {user_id}")
+    if run_async:
+        return start_training_async(user_id, module_name)
 
     # Get user info for personalization
     user = User.query.get_or_404(user_id)
-    print(f"User: {user.email}")
-    print(f"Role: {user.role}")
-    print(f"Industry: {user.industry}")
+    user_profile = build_user_profile(user)
 
-    user_profile = {
-        "role": user.role or "Employee",
-        "industry": user.industry or "General",
-        "tech_level": "beginner",
-    }
+    # Hold no transaction (in production storage mode, the write lock) while generating
+    db.session.rollback()
 
     # Try to generate AI content
-    print(f"\n→ Attempting to generate AI content...")
     content = generate_training_module(module_name, user_profile)
 
     # Use fallback if AI fails
     if content is None:
-        print(f"\n⚠️  AI generation failed, using fallback content for: {module_name}")
-        content = get_fallback_content(module_name)
-        if content:
-            print(f"✓ Fallback content loaded successfully")
-        else:
-            print(f"❌ ERROR: Fallback content not available!")
-            return jsonify({"error": "No training content available"}), 500
+        with span("fallback_select"):
+            content = get_fallback_content(module_name)
+        user_profile = None
+        training_content.inc(source="fallback")
+        log.warning("training_fallback", extra={"topic": module_name, "user_id": user_id})
 
     # Create training session
+    with span("db_commit"):
+        session = TrainingSession(
+            user_id=user_id,
+            module_name=module_name,
+            document_id=store_module(module_name, content, user_profile),
+            completion_status="in_progress",
+            started_at=datetime.utcnow(),
+        )
+        db.session.add(session)
+        record_session_started(user, module_name)
+        bump_data_version(user.id)
+        db.session.commit()
+
+    log.info("training_started", extra={
+        "session_id": session.id,
+        "topic": module_name,
+        "user_id": user_id,
+        "quiz_questions": len(content.get("quiz", [])),
+    })
+
+    return raw_json_response(
+        current_app, {"session_id": session.id}, status=201, content=serialize_content(public_content(content))
+    )
+
+def start_training_async(user_id, module_name):
+    """Create the session in 'generating' state and hand generation to a worker"""
+    user = User.query.get_or_404(user_id)
+
     session = TrainingSession(
         user_id=user_id,
         module_name=module_name,
-        content=json.dumps(content),
-        completion_status="in_progress",
+        completion_status="generating",
         started_at=datetime.utcnow(),
     )
     db.session.add(session)
+    bump_data_version(user.id)
+    db.session.commit()
+
+    try:
+        job = current_app.extensions["training_jobs"].submit(
+            generate_session_content,
+            current_app._get_current_object(),
+            session.id,
+            module_name,
+            build_user_profile(user),
+            session_id=session.id,
+        )
+    except QueueFullError as e:
+        db.session.delete(session)
+        bump_data_version(user.id)
+        db.session.commit()
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
+
+    # Counted only once the job is queued, so a rejected start leaves the rollups alone
+    record_session_started(user, module_name)
     db.session.commit()
 
-    print(f"\n✅ Training session created successfully")
-    print(f"Session ID: {session.id}")
-    print(f"Content title: {content.get('title', module_name)}")
-    print(f"Quiz questions: {len(content.get('quiz', []))}")
-    print(f"{'='*70}\n")
+    return jsonify({
+        "session_id": session.id,
+        "job_id": job.id,
+        "status": "generating",
+        "status_url": f"/api/training/jobs/{job.id}",
+    }), 202
+
+@bp.route("/api/training/curriculum", methods=["POST"])
+def start_curriculum():
+    """
+    Start sessions for several modules at once
+
+    Content for every module the cache cannot serve comes from a single
+    generation call; modules that fail validation get fallback content.
+    All sessions are created in one transaction.
+    """
+    data = request.get_json(silent=True) or {}
+    user_id = data.get("user_id")
+    modules = data.get("modules") or TRAINING_MODULES
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+    if not isinstance(modules, list) or not all(isinstance(module, str) and module for module in modules):
+        return jsonify({"error": "modules must be a list of module names"}), 400
+    modules = list(dict.fromkeys(modules))
+    if len(modules) > MAX_CURRICULUM_TOPICS:
+        return jsonify({"error": f"At most {MAX_CURRICULUM_TOPICS} modules per curriculum"}), 400
+
+    user = User.query.get_or_404(user_id)
+    user_profile = build_user_profile(user)
+
+    # Hold no transaction (in production storage mode, the write lock) while generating
+    db.session.rollback()
+    generated = generate_curriculum(modules, user_profile)
+
+    sessions = []
+    with span("db_commit"):
+        for module_name in modules:
+            content, source = generated[module_name]
+            if content is None:
+                with span("fallback_select"):
+                    content, source = get_fallback_content(module_name), "fallback"
+                training_content.inc(source="fallback")
+                log.warning("training_fallback", extra={"topic": module_name, "user_id": user.id})
+
+            session = TrainingSession(
+                user_id=user.id,
+                module_name=module_name,
+                document_id=store_module(module_name, content, None if source == "fallback" else user_profile),
+                completion_status="in_progress",
+                started_at=datetime.utcnow(),
+            )
+            db.session.add(session)
+            record_session_started(user, module_name)
+            sessions.append((session, source))
+        bump_data_version(user.id)
+        db.session.commit()
+
+    log.info("curriculum_started", extra={
+        "user_id": user.id,
+        "sources": {session.module_name: source for session, source in sessions},
+    })
+
+    return jsonify({
+        "user_id": user.id,
+        "sessions": [
+            {"session_id": session.id, "module_name": session.module_name, "source": source}
+            for session, source in sessions
+        ],
+    }), 201
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@bp.route("/api/training/stream", methods=["POST"])
+def start_streamed_training():
+    """Create a training session whose content is then streamed from its stream_url"""
+    data = request.get_json(silent=True) or {}
+    user_id = data.get("user_id")
+    module_name = data.get("module_name")
+    if not user_id or not module_name:
+        return jsonify({"error": "user_id and module_name are required"}), 400
+
+    user = User.query.get_or_404(user_id)
+    session = TrainingSession(
+        user_id=user.id,
+        module_name=module_name,
+        # The first GET of stream_url claims it, see claim_streamed_session()
+        completion_status="pending",
+        started_at=datetime.utcnow(),
+    )
+    db.session.add(session)
+    record_session_started(user, module_name)
+    bump_data_version(user.id)
+    db.session.commit()
 
     return jsonify({
         "session_id": session.id,
-        "content": content
+        "status": "pending",
+        "stream_url": f"/api/training/stream/{session.id}",
     }), 201
 
-@app.route("/api/training/complete", methods=["POST"])
-def complete_training():
-    """Mark training complete with quiz score"""
-    data = request.json
-    session_id = data["session_id"]
-    quiz_score = data["quiz_score"]
+def claim_streamed_session(session_id, claim=True):
+    """
+    Move a streamed session from 'pending' to 'generating' (or back, claim=False)
+
+    A conditional UPDATE, so of two requests racing for the same session
+    only one gets True and generates its content.
+    """
+    source, target = ("pending", "generating") if claim else ("generating", "pending")
+    # A GET, so storage.py would begin this write deferred
+    with immediate_transactions():
+        claimed = db.session.execute(
+            db.update(TrainingSession)
+            .where(TrainingSession.id == session_id, TrainingSession.completion_status == source)
+            .values(completion_status=target)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+    return claimed == 1
+
+def finish_streamed_session(session_id, module_name, content, source, user_profile):
+    """Save the streamed module to its session; returns False if the session is gone"""
+    # A GET, so storage.py would begin this write deferred
+    with immediate_transactions():
+        session = db.session.get(TrainingSession, session_id)
+        if session is None:
+            db.session.rollback()
+            return False
+        session.document_id = store_module(module_name, content, None if source == "fallback" else user_profile)
+        session.completion_status = "in_progress"
+        bump_data_version(session.user_id)
+        db.session.commit()
+    return True
+
+@bp.route("/api/training/stream/<int:session_id>", methods=["GET"])
+def stream_training(session_id):
+    """
+    Stream a session's module section by section over Server-Sent Events
+
+    The request that claims a pending session generates its content here;
+    one that already has content (e.g. after a reconnect) gets the stored
+    module. A session another request is generating gets 409.
+    """
+    session = TrainingSession.query.get_or_404(session_id)
+    module_name, status = session.module_name, session.completion_status
+    stored = load_public_session_json(session) if status not in ("pending", "generating") else None
+    user_profile = build_user_profile(db.session.get(User, session.user_id))
+    # Hold no read transaction open for the length of the stream
+    db.session.rollback()
+
+    if status == "pending" and not claim_streamed_session(session_id):
+        status = "generating"
+    if status == "generating":
+        return jsonify({"error": "Session is already being generated"}), 409
+    if status != "pending":
+        if stored is None:
+            return jsonify({"error": f"Session is {status} and has no content"}), 409
+
+        def replay():
+            yield sse_event("session", {"session_id": session_id})
+            for section in iter_sections(json.loads(stored)):
+                yield sse_event("section", section)
+            yield sse_event("done", {"session_id": session_id, "source": "stored"})
+
+        return sse_response(replay())
 
+    started = False
+
+    def events():
+        nonlocal started
+        started = True
+        content, source, sent = None, None, False
+        sections = stream_training_module(module_name, user_profile)
+        try:
+            yield sse_event("session", {"session_id": session_id})
+
+            for kind, payload in sections:
+                if kind == "section":
+                    sent = True
+                    yield sse_event("section", public_section(payload))
+                elif kind == "complete":
+                    content, source = payload["content"], payload["source"]
+
+            if content is None:
+                content, source = get_fallback_content(module_name), "fallback"
+                training_content.inc(source="fallback")
+                log.warning("training_fallback", extra={"topic": module_name, "session_id": session_id})
+                if sent:
+                    # Tell the browser to discard the partial AI sections
+                    yield sse_event("reset", {})
+                for section in iter_sections(content):
+                    yield sse_event("section", public_section(section))
+        finally:
+            # Also reached when the client disconnects: finish the module
+            # here so the session still gets its full document
+            if content is None:
+                for kind, payload in sections:
+                    if kind == "complete":
+                        content, source = payload["content"], payload["source"]
+                if content is None:
+                    content, source = get_fallback_content(module_name), "fallback"
+                    training_content.inc(source="fallback")
+                log.info("training_stream_abandoned", extra={"topic": module_name, "session_id": session_id})
+            finish_streamed_session(session_id, module_name, content, source, user_profile)
+
+        yield sse_event("done", {"session_id": session_id, "source": source})
+
+    app = current_app._get_current_object()
+
+    def release_unstarted():
+        # The client left before the stream began: hand the session back
+        # so a new request can claim it
+        if not started:
+            with app.app_context():
+                claim_streamed_session(session_id, claim=False)
+
+    response = sse_response(events())
+    response.call_on_close(release_unstarted)
+    return response
+
+JOB_POLL_INTERVAL = 0.25
+
+@bp.route("/api/training/jobs/<int:job_id>", methods=["GET"])
+def training_job_status(job_id):
+    """
+    Poll a generation job; ?wait=<seconds> long-polls until it finishes
+
+    A job's id is its session's id, and its status is read from the
+    session row, so every worker can answer, not only the one running it.
+    """
+    wait = min(request.args.get("wait", 0, type=float), 30)
+    job = current_app.extensions["training_jobs"].get(str(job_id))
+    if job is not None and wait > 0:
+        job.wait(wait)
+        wait = 0
+
+    deadline = time.monotonic() + wait
+    while True:
+        session = db.session.get(TrainingSession, job_id)
+        if session is None:
+            return jsonify({"error": "Unknown job"}), 404
+        if session.completion_status not in UNFINISHED_STATUSES or time.monotonic() >= deadline:
+            break
+        # End the read transaction so the next look sees other workers' commits
+        db.session.rollback()
+        time.sleep(JOB_POLL_INTERVAL)
+
+    stale_after = current_app.config["TRAINING_STALE_AFTER"]
+    if (session.completion_status == "generating" and job is None
+            and session.started_at < datetime.utcnow() - timedelta(seconds=stale_after)):
+        # A GET, so storage.py would begin this write deferred after the reads above
+        db.session.rollback()
+        with immediate_transactions():
+            fail_stale_generations(stale_after)
+        session = db.session.get(TrainingSession, job_id)
+
+    status = {"generating": job.status if job else "running", "pending": "queued", "failed": "failed"}.get(
+        session.completion_status, "done"
+    )
+    error = None
+    if status == "failed":
+        error = (job.error if job else None) or "Content generation did not finish"
+    result = {"job_id": str(session.id), "session_id": session.id, "status": status, "error": error}
+    if status == "done":
+        return raw_json_response(current_app, result, content=load_public_session_json(session))
+    return jsonify(result)
+
+@bp.route("/api/training/sessions/<int:session_id>", methods=["GET"])
+def get_training_session(session_id):
+    """Return a training session with its content"""
     session = TrainingSession.query.get_or_404(session_id)
+
+    # Content is immutable per document, so these columns version the response
+    etag = make_etag("session", session.id, session.document_id, session.completion_status, session.quiz_score)
+    cached = not_modified(current_app, etag, "private, no-cache")
+    if cached is not None:
+        return cached
+
+    response = raw_json_response(current_app, {
+        "session_id": session.id,
+        "user_id": session.user_id,
+        "module_name": session.module_name,
+        "status": session.completion_status,
+        "score": session.quiz_score,
+    }, content=load_public_session_json(session))
+    return with_etag(response, etag, "private, no-cache")
+
+def record_quiz_result(session, quiz_score):
+    """Mark a session completed with quiz_score; returns the user's new risk score"""
+    user = db.session.get(User, session.user_id)
+
+    # Re-submitting a quiz updates the score but keeps the original completion date
+    completed_at = session.completed_at
+    if session.completion_status != "completed" or completed_at is None:
+        completed_at = datetime.utcnow()
+
+    record_session_completed(
+        user,
+        session.module_name,
+        quiz_score,
+        previous_status=session.completion_status,
+        previous_score=session.quiz_score,
+        completed_at=completed_at,
+    )
     session.completion_status = "completed"
     session.quiz_score = quiz_score
-    session.completed_at = datetime.utcnow()
-    db.session.commit()
+    session.completed_at = completed_at
+    bump_data_version(user.id)
+    return update_user_risk(user.id, len(TRAINING_MODULES))
+
+def _record_quiz_result_by_id(session_id, quiz_score):
+    return record_quiz_result(db.get_or_404(TrainingSession, session_id), quiz_score)
+
+def commit_quiz_result(session_id, quiz_score):
+    """Record a quiz result and commit it (batched with others under GROUP_COMMIT)"""
+    writer = current_app.extensions["completion_writer"]
+    if writer is None:
+        risk_score = _record_quiz_result_by_id(session_id, quiz_score)
+        db.session.commit()
+        return risk_score
+
+    # End this request's transaction so it holds nothing while the writer commits
+    db.session.rollback()
+    return writer.submit(_record_quiz_result_by_id, session_id, quiz_score)
+
+@bp.route("/api/training/complete", methods=["POST"])
+@admin_required
+def complete_training():
+    """
+    Mark training complete with a given quiz score
 
-    return jsonify({"message": "Training completed", "score": quiz_score})
+    Admin only (e.g. for importing results); learners are scored by
+    /api/training/grade, which never trusts a score from the client.
+    """
+    data = request.get_json(silent=True) or {}
+    session_id = data.get("session_id")
+    quiz_score = data.get("quiz_score")
+    if session_id is None:
+        return jsonify({"error": "session_id is required"}), 400
+    if (isinstance(quiz_score, bool) or not isinstance(quiz_score, (int, float))
+            or not 0 <= quiz_score <= 100):
+        return jsonify({"error": "quiz_score must be a number from 0 to 100"}), 400
+
+    risk_score = commit_quiz_result(session_id, quiz_score)
+
+    return jsonify({"message": "Training completed", "score": quiz_score, "risk_score": risk_score})
+
+@bp.route("/api/training/grade", methods=["POST"])
+def grade_training():
+    """Grade submitted quiz answers on the server and complete the session"""
+    data = request.get_json(silent=True) or {}
+    if "session_id" not in data or "answers" not in data:
+        return jsonify({"error": "session_id and answers are required"}), 400
+
+    session = TrainingSession.query.get_or_404(data["session_id"])
+    key = get_answer_key(session)
+    if not key:
+        return jsonify({"error": "This module has no quiz"}), 400
+
+    try:
+        result = grade_answers(key, data["answers"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    risk_score = commit_quiz_result(session.id, result["score"])
+
+    return jsonify({"message": "Training completed", "risk_score": risk_score, **result})
+
+@bp.route("/api/quiz/assemble", methods=["GET"])
+def assemble_quiz_endpoint():
+    """Build a fresh quiz for a module from the question bank, without calling Gemini"""
+    module_name = request.args.get("module_name")
+    count = request.args.get("count", 5, type=int)
+    if not module_name:
+        return jsonify({"error": "module_name is required"}), 400
+    if not 1 <= count <= MAX_QUIZ_QUESTIONS:
+        return jsonify({"error": f"count must be between 1 and {MAX_QUIZ_QUESTIONS}"}), 400
+
+    role = request.args.get("role")
+    industry = request.args.get("industry")
+    user_id = request.args.get("user_id", type=int)
+    if user_id:
+        user_profile = build_user_profile(db.get_or_404(User, user_id))
+        role, industry = user_profile["role"], user_profile["industry"]
+
+    with span("quiz_assemble"):
+        quiz, available = assemble_quiz(
+            module_name, count, role=role, industry=industry, seed=request.args.get("seed")
+        )
+    if not quiz:
+        return jsonify({"error": f"No banked questions for {module_name}"}), 404
+
+    return jsonify({"module_name": module_name, "quiz": quiz, "available": available})
+
+@bp.route("/api/quiz/grade", methods=["POST"])
+def grade_assembled_quiz():
+    """Grade answers to a quiz from /api/quiz/assemble against the question bank"""
+    data = request.get_json(silent=True) or {}
+    module_name = data.get("module_name")
+    if not module_name or "answers" not in data:
+        return jsonify({"error": "module_name and answers are required"}), 400
+
+    try:
+        result = grade_banked_answers(module_name, data["answers"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"module_name": module_name, **result})
 
 # ===== DEMO/SEED ENDPOINT (FOR SYNCFLOW DEMO) =====
 
-@app.route("/api/seed-syncflow-demo", methods=["POST"])
+@bp.route("/api/seed-syncflow-demo", methods=["POST"])
 def seed_syncflow():
     """Populate SyncFlow demo data"""
     try:
@@ -241,7 +1039,6 @@ def seed_syncflow():
             organization="SyncFlow Solutions",
             industry="Professional Services",
             role="IT Manager",
-            risk_score=45
         )
         db.session.add(user)
         db.session.commit()
@@ -258,7 +1055,7 @@ def seed_syncflow():
             session = TrainingSession(
                 user_id=user.id,
                 module_name=module_name,
-                content=json.dumps({
+                document_id=store_document({
                     "title": module_name,
                     "introduction": f"Training module on {module_name}",
                     "key_concepts": [],
@@ -273,6 +1070,9 @@ def seed_syncflow():
             )
             db.session.add(session)
 
+        rebuild_rollups()
+        db.session.flush()
+        update_user_risk(user.id, len(TRAINING_MODULES))
         db.session.commit()
 
         return jsonify({
@@ -282,15 +1082,302 @@ def seed_syncflow():
         }), 201
     except Exception as e:
         db.session.rollback()
-        print(f"Error in seed_syncflow: {str(e)}")
+        log.exception("seed_failed")
         return jsonify({"error": str(e)}), 500
 
-@app.route("/risk-profile")
+# ===== ADMIN ENDPOINTS =====
+
+@bp.route("/api/admin/stats", methods=["GET"])
+@admin_required
+def admin_stats():
+    """Return content generation and job queue statistics"""
+    writer = current_app.extensions["completion_writer"]
+    shared = current_app.extensions["shared_cache"]
+    return jsonify({
+        "content_cache": content_cache.stats(),
+        "shared_cache": shared.stats() if shared else None,
+        "singleflight": inflight_requests.stats(),
+        "training_jobs": current_app.extensions["training_jobs"].stats(),
+        "conditional_requests": conditional_stats.stats(),
+        "provider_breaker": provider_breaker.stats(),
+        "storage": storage_status(db.engine),
+        "group_commit": writer.stats() if writer else None,
+    })
+
+@bp.route("/api/admin/sessions", methods=["GET"])
+@admin_required
+def admin_session_listing():
+    """Sessions across ?organization= (or all organizations), with the same filters and paging as a user's history"""
+    return session_page(organization=request.args.get("organization"))
+
+@bp.route("/api/admin/provider", methods=["GET"])
+@admin_required
+def admin_provider():
+    """Return the content provider's circuit breaker state and latency histograms"""
+    return jsonify(provider_status())
+
+@bp.route("/api/admin/provider/breaker", methods=["POST"])
+@admin_required
+def admin_provider_breaker():
+    """Force the circuit breaker open, or close it with {"state": "closed"}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        provider_breaker.force(data.get("state"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(provider_breaker.stats())
+
+@bp.route("/api/admin/cache/invalidate", methods=["POST"])
+@admin_required
+def invalidate_content_cache():
+    """Drop cached module content for one topic"""
+    data = request.json or {}
+    topic = data.get("topic")
+    if not topic:
+        return jsonify({"error": "topic is required"}), 400
+
+    removed = content_cache.invalidate_topic(topic)
+    return jsonify({"message": "Cache invalidated", "topic": topic, "removed": removed})
+
+# ===== METRICS =====
+
+BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+def collect_runtime_metrics():
+    """Scrape-time view of the caches, single-flight, breaker, job queue and 304 counters"""
+    cache = content_cache.stats()
+    flights = inflight_requests.stats()
+    breaker = provider_breaker.stats()
+    jobs = current_app.extensions["training_jobs"].stats()
+    conditional = conditional_stats.stats()
+    writer = current_app.extensions["completion_writer"]
+    shared = current_app.extensions["shared_cache"]
+    return [
+        ("cyberbridge_content_cache_lookups_total", "counter", "Content cache lookups by result", [
+            ({"result": "memory_hit"}, cache["memory_hits"]),
+            ({"result": "disk_hit"}, cache["disk_hits"]),
+            ({"result": "miss"}, cache["misses"]),
+        ]),
+        ("cyberbridge_content_cache_writes_total", "counter", "Modules written to the content cache",
+         [({}, cache["writes"])]),
+        ("cyberbridge_content_cache_evictions_total", "counter", "Entries evicted from the in-memory tier",
+         [({}, cache["memory"]["evictions"])]),
+        ("cyberbridge_content_cache_entries", "gauge", "Entries in each content cache tier", [
+            ({"tier": "memory"}, cache["memory"]["entries"]),
+        ] + ([({"tier": "disk"}, cache["disk_entries"])] if cache.get("disk_entries") is not None else [])),
+        ("cyberbridge_singleflight_calls_saved_total", "counter",
+         "Generation calls avoided by joining an identical in-flight request", [({}, flights["calls_saved"])]),
+        ("cyberbridge_singleflight_in_flight", "gauge", "Distinct prompts being generated",
+         [({}, flights["in_flight"])]),
+        ("cyberbridge_provider_breaker_state", "gauge", "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+         [({"breaker": breaker["name"]}, BREAKER_STATE_VALUES[breaker["state"]])]),
+        ("cyberbridge_provider_breaker_trips_total", "counter", "Times the circuit breaker opened",
+         [({"breaker": breaker["name"]}, breaker["trips"])]),
+        ("cyberbridge_provider_breaker_rejected_total", "counter", "Calls refused by the open circuit breaker",
+         [({"breaker": breaker["name"]}, breaker["rejected"])]),
+        ("cyberbridge_training_jobs_active", "gauge", "Background generation jobs queued or running",
+         [({}, jobs["active"])]),
+        ("cyberbridge_training_jobs_total", "counter", "Background generation jobs by outcome", [
+            ({"outcome": "completed"}, jobs["completed"]),
+            ({"outcome": "failed"}, jobs["failed"]),
+            ({"outcome": "rejected"}, jobs["rejected"]),
+        ]),
+        ("cyberbridge_conditional_requests_total", "counter", "Conditional GETs by endpoint and result", [
+            sample
+            for endpoint, counts in conditional.items()
+            for sample in (
+                ({"endpoint": endpoint, "result": "not_modified"}, counts["not_modified"]),
+                ({"endpoint": endpoint, "result": "full"}, counts["requests"] - counts["not_modified"]),
+            )
+        ]),
+    ] + (group_commit_metrics(writer.stats()) if writer else []) + (
+        shared_cache_metrics(shared.stats()) if shared else []
+    )
+
+def group_commit_metrics(stats):
+    return [
+        ("cyberbridge_group_commit_batches_total", "counter", "Transactions committed by the group-commit writer",
+         [({}, stats["batches"])]),
+        ("cyberbridge_group_commit_writes_total", "counter", "Writes committed through the group-commit writer",
+         [({}, stats["writes"])]),
+        ("cyberbridge_group_commit_queued", "gauge", "Writes waiting for the next group commit",
+         [({}, stats["queued"])]),
+    ]
+
+def shared_cache_metrics(stats):
+    return [
+        ("cyberbridge_shared_cache_lookups_total", "counter", "Cross-worker cache lookups by result", [
+            ({"result": "hit"}, stats["hits"]),
+            ({"result": "miss"}, stats["misses"]),
+        ]),
+        ("cyberbridge_shared_cache_errors_total", "counter", "Cross-worker cache reads and writes that failed",
+         [({}, stats["errors"])]),
+    ]
+
+register_collector(collect_runtime_metrics)
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Prometheus text exposition of request, generation and cache metrics
+
+    Needs "Authorization: Bearer <METRICS_TOKEN>" when METRICS_TOKEN is set,
+    so scrapers never hold the admin token. Without it the endpoint is open
+    and should only be reachable from an internal network.
+    """
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"error": "Metrics token required"}), 401
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@bp.route("/risk-profile")
 def risk_profile():
     """Risk profile setup page"""
     return render_template("risk-profile.html")
 
+# ===== CLI COMMANDS =====
+
+@bp.cli.command("import-users")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]),
+              help="File format (default: from the file extension)")
+@click.option("--batch-size", default=500, show_default=True, help="Rows per INSERT and commit")
+@click.option("--on-duplicate", type=click.Choice(["skip", "update"]), default="skip", show_default=True)
+@click.option("--errors", "errors_path", type=click.Path(dir_okay=False),
+              help="Write per-row errors as JSON")
+def import_users_command(path, fmt, batch_size, on_duplicate, errors_path):
+    """Bulk-import users from a CSV or JSONL file"""
+    fmt = fmt or ("jsonl" if path.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv")
+    upgrade_database(log=click.echo)
+
+    with open(path, "rb") as f:
+        report = import_users(iter_rows(f, fmt), batch_size=batch_size, on_duplicate=on_duplicate)
+
+    click.echo(f"Processed {report['processed']} rows in {report['elapsed_seconds']}s "
+               f"({report['rows_per_second']} rows/s)")
+    click.echo(f"  inserted {report['inserted']}, updated {report['updated']}, "
+               f"skipped {report['skipped']}, failed {report['failed']}")
+    for item in report["errors"][:20]:
+        click.echo(f"  row {item['row']}: {item['error']} ({item['email']})")
+    if report["failed"] > 20:
+        click.echo(f"  ... {report['failed'] - 20} more errors")
+
+    if errors_path:
+        with open(errors_path, "w", encoding="utf-8") as f:
+            json.dump(report["errors"], f, indent=2)
+        click.echo(f"Errors written to {errors_path}")
+
+@bp.cli.command("recompute-risk")
+@click.option("--organization", help="Only rescore users in this organization")
+def recompute_risk_command(organization):
+    """Recompute User.risk_score from training results"""
+    result = recompute_risk_scores(len(TRAINING_MODULES), organization=organization)
+    db.session.commit()
+    click.echo(f"Scored {result['users']} users, updated {result['updated']} "
+               f"(mean risk {result['mean_score']})")
+    click.echo(f"  load {result['load_seconds']}s, score {result['score_seconds']}s, "
+               f"write {result['write_seconds']}s")
+
+@bp.cli.command("rebuild-rollups")
+@click.option("--check", is_flag=True, help="Only report drift, don't rewrite the rollup tables")
+def rebuild_rollups_command(check):
+    """Recompute organization rollups from users and sessions"""
+    drift = rebuild_rollups(check_only=check)
+    if not check:
+        db.session.commit()
+
+    for line in drift:
+        click.echo(f"  drift: {line}")
+    if not drift:
+        click.echo("✅ Rollups match users and sessions")
+    elif check:
+        click.echo(f"⚠️  {len(drift)} rollup rows drifted (run without --check to repair)")
+    else:
+        click.echo(f"✅ Repaired {len(drift)} drifted rollup rows")
+
+@bp.cli.command("upgrade-db")
+def upgrade_db_command():
+    """Create missing tables and upgrade an existing database in place"""
+    click.echo("Upgrading database...")
+    upgrade_database(log=click.echo)
+    click.echo("✅ Database is up to date")
+
+@bp.cli.command("backfill-questions")
+@click.option("--batch-size", default=200, show_default=True, help="Sessions per batch and commit")
+def backfill_questions_command(batch_size):
+    """Add the quizzes of existing training sessions to the question bank"""
+    upgrade_database(log=click.echo)
+    result = backfill_question_bank(batch_size=batch_size, log=click.echo)
+    click.echo(f"✅ Read {result['documents']} documents from {result['sessions']} sessions, "
+               f"banked {result['added']} new questions")
+
+@bp.cli.command("list-models")
+def list_models_command():
+    """List Gemini models available to this API key"""
+    click.echo("\n" + "="*60)
+    click.echo("🔍 AVAILABLE GEMINI MODELS")
+    click.echo("="*60)
+    try:
+        for name in list_available_models():
+            click.echo(f"✓ {name}")
+    except Exception as e:
+        click.echo(f"❌ Error listing models: {e}")
+    click.echo("="*60 + "\n")
+
+@bp.cli.command("pregen")
+@click.option("--matrix", type=click.Path(exists=True, dir_okay=False),
+              help="JSON or CSV file of role/industry pairs (default: pairs in the User table)")
+@click.option("--module", "modules", multiple=True,
+              help="Module to warm (repeatable, default: all TRAINING_MODULES)")
+@click.option("--parallelism", default=4, show_default=True, help="Concurrent generations")
+@click.option("--rate", default=1.0, show_default=True,
+              help="Max Gemini calls started per second (0 = unlimited)")
+@click.option("--report", type=click.Path(dir_okay=False), help="Write the full report as JSON")
+def pregen_command(matrix, modules, parallelism, rate, report):
+    """Pre-generate module content for every module x role x industry"""
+    if matrix:
+        pairs = load_matrix(matrix)
+    else:
+        db.create_all()
+        pairs = db.session.query(User.role, User.industry).distinct().all()
+
+    modules = list(modules) or TRAINING_MODULES
+    click.echo(f"Warming {len(modules)} modules x {len(pairs)} role/industry pairs "
+               f"(parallelism={parallelism}, rate={rate or 'unlimited'}/s)")
+
+    def progress(result):
+        click.echo(f"  [{result['outcome']:>9}] {result['module']} | {result['role']} | {result['industry']}")
+
+    result = pregenerate(
+        modules,
+        pairs,
+        generate=generate_training_module,
+        is_cached=is_module_cached,
+        parallelism=parallelism,
+        rate=rate,
+        progress=progress,
+    )
+
+    click.echo(f"\nCombinations: {result['combinations']} "
+               f"(generated {result['generated']}, already cached {result['cached']}, "
+               f"fallback {result['fallback']}, failed {result['failed']})")
+    click.echo(f"Elapsed: {result['elapsed_seconds']}s, "
+               f"{result['combinations_per_second']} combinations/s, "
+               f"{result['generations_per_second']} generations/s")
+    for item in result["fallbacks"]:
+        click.echo(f"  fell back: {item['module']} | {item['role']} | {item['industry']}")
+    for item in result["failures"]:
+        click.echo(f"  failed: {item['module']} | {item['role']} | {item['industry']}: {item['error']}")
+
+    if report:
+        with open(report, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        click.echo(f"Report written to {report}")
+
 if __name__ == "__main__":
+    app = create_app()
     with app.app_context():
-        db.create_all()
+        upgrade_database()
+        # Sessions a previous server left generating
+        fail_stale_generations(app.config["TRAINING_STALE_AFTER"])
     app.run(debug=False, port=5000)
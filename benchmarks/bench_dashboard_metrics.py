@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Benchmark /api/dashboard/metrics for users with many training sessions
+
+Seeds a throwaway SQLite database with users whose sessions carry inline
+module content (as databases written before content-addressed storage do),
+then times:
+
+  before  - the original implementation: load every TrainingSession row,
+            content included, and aggregate in Python, without indexes
+  after   - the current endpoint: one aggregate query plus a projection of
+            the lightweight columns, with the training_session indexes
+
+Usage:
+    python benchmarks/bench_dashboard_metrics.py [--users 20] [--sessions 2000] [--requests 50]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label, samples):
+    print(f"{label:>8}: p50 {statistics.median(samples):7.2f} ms | "
+          f"p95 {percentile(samples, 95):7.2f} ms | max {max(samples):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=2000, help="Sessions per user")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cyberbridge-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["CYBERBRIDGE_OFFLINE"] = "1"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from app import create_app, db, User, TrainingSession
+    from ai_trainer import get_fallback_content
+    from sqlalchemy import text
+    from sqlalchemy.orm import undefer
+
+    # Time the dashboard queries themselves, not the cross-worker cache in front of them
+    app = create_app({"SHARED_CACHE_PATH": None})
+
+    with app.app_context():
+        db.create_all()
+        content = json.dumps(get_fallback_content("Phishing Awareness"))
+        statuses = ["completed", "in_progress", "not_started"]
+
+        print(f"Seeding {args.users} users x {args.sessions} sessions...")
+        db.session.execute(db.insert(User), [
+            {"id": u, "email": f"user{u}@bench.example", "organization": "Bench Org",
+             "industry": "General", "role": "Employee"}
+            for u in range(1, args.users + 1)
+        ])
+        rows = []
+        for u in range(1, args.users + 1):
+            for i in range(args.sessions):
+                status = statuses[i % 3]
+                rows.append({
+                    "user_id": u,
+                    "module_name": f"Module {i % 4}",
+                    "content": content,
+                    "completion_status": status,
+                    "quiz_score": 80.0 if status == "completed" else None,
+                })
+        db.session.execute(db.insert(TrainingSession), rows)
+        db.session.commit()
+
+        def legacy_metrics(user_id):
+            sessions = (
+                TrainingSession.query.options(undefer(TrainingSession.content))
+                .filter_by(user_id=user_id).all()
+            )
+            completed = sum(1 for s in sessions if s.completion_status == "completed")
+            total = len(sessions) if len(sessions) > 0 else 4
+            avg_quiz = sum((s.quiz_score or 0) for s in sessions) / completed if completed else 0
+            return json.dumps({
+                "kpis": {"completed": completed, "total": total, "avg": avg_quiz},
+                "modules": [
+                    {"id": s.id, "name": s.module_name, "status": s.completion_status, "score": s.quiz_score}
+                    for s in sessions
+                ],
+            })
+
+        # Before: no indexes, full rows
+        index_names = [index.name for index in TrainingSession.__table__.indexes]
+        for name in index_names:
+            db.session.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        db.session.commit()
+
+        before = []
+        for n in range(args.requests):
+            user_id = n % args.users + 1
+            started = time.perf_counter()
+            legacy_metrics(user_id)
+            before.append((time.perf_counter() - started) * 1000)
+            db.session.expire_all()
+
+        # After: indexes back, current endpoint
+        for index in TrainingSession.__table__.indexes:
+            index.create(db.engine)
+
+        client = app.test_client()
+        after = []
+        for n in range(args.requests):
+            user_id = n % args.users + 1
+            started = time.perf_counter()
+            response = client.get(f"/api/dashboard/metrics/{user_id}")
+            after.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200
+
+    print(f"\n/api/dashboard/metrics with {args.sessions} sessions per user, {args.requests} requests")
+    report("before", before)
+    report("after", after)
+    print(f" speedup: {statistics.median(before) / statistics.median(after):.1f}x (p50)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Benchmark keyset pagination of session listings against OFFSET
+
+Seeds a throwaway SQLite database with --sessions sessions spread over
+--users users in --orgs organizations, then times fetching page 1 and
+page --page (of --limit rows) of:
+
+  user   - one user's history (session_history.list_sessions(user_id=...))
+  org    - one organization's sessions (list_sessions(organization=...)),
+           also with a started_at range
+
+once by following next_cursor (the time of the last hop is reported) and
+once with the equivalent LIMIT/OFFSET query.
+
+Usage:
+    python benchmarks/bench_history.py [--sessions 500000] [--page 1000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=500000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--orgs", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=20, help="Rows per page")
+    parser.add_argument("--page", type=int, default=1000, help="Deep page to time")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cyberbridge-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["CYBERBRIDGE_OFFLINE"] = "1"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from app import create_app, db, User, TrainingSession, TRAINING_MODULES
+    from session_history import list_sessions
+
+    app = create_app()
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+
+    with app.app_context():
+        db.create_all()
+        print(f"Seeding {args.sessions} sessions...")
+        db.session.execute(db.insert(User), [
+            {"id": u, "email": f"user{u}@bench.example", "organization": f"Org {u % args.orgs}",
+             "industry": "General", "role": "Employee"}
+            for u in range(1, args.users + 1)
+        ])
+        db.session.execute(db.insert(TrainingSession), [
+            {"user_id": rng.randint(1, args.users), "module_name": rng.choice(TRAINING_MODULES),
+             "completion_status": "completed", "started_at": now - timedelta(minutes=args.sessions - i)}
+            for i in range(args.sessions)
+        ])
+        db.session.commit()
+
+        def keyset(scope, page):
+            cursor, last = None, 0.0
+            for _ in range(page):
+                started = time.perf_counter()
+                result = list_sessions(**scope, cursor=cursor, limit=args.limit)
+                last = time.perf_counter() - started
+                cursor = result["next_cursor"]
+                if cursor is None:
+                    break
+            return last
+
+        def offset(scope, page):
+            query = db.select(
+                TrainingSession.id, TrainingSession.user_id, TrainingSession.module_name,
+                TrainingSession.completion_status, TrainingSession.quiz_score,
+                TrainingSession.started_at, TrainingSession.completed_at,
+            )
+            if "user_id" in scope:
+                query = query.where(TrainingSession.user_id == scope["user_id"])
+            else:
+                query = query.join(User, User.id == TrainingSession.user_id).where(
+                    User.organization == scope["organization"]
+                )
+            if "start" in scope:
+                query = query.where(TrainingSession.started_at >= scope["start"])
+            started = time.perf_counter()
+            db.session.execute(
+                query.order_by(TrainingSession.id.desc()).limit(args.limit).offset((page - 1) * args.limit)
+            ).all()
+            return time.perf_counter() - started
+
+        # Warm the page cache and statement cache so page 1 is not charged for them
+        for scope in ({"user_id": 1}, {"organization": "Org 1"}):
+            keyset(scope, 1)
+            offset(scope, 1)
+
+        print(f"\n{'listing':>8} {'page':>6} {'keyset ms':>10} {'offset ms':>10}")
+        since = (now - timedelta(days=3650)).date()
+        for name, scope in (("user", {"user_id": 1}), ("org", {"organization": "Org 1"}),
+                            ("org+date", {"organization": "Org 1", "start": since})):
+            for page in (1, args.page):
+                print(f"{name:>8} {page:>6} {keyset(scope, page) * 1000:>10.2f} {offset(scope, page) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Benchmark JSON serialization on the training and dashboard endpoints
+
+Times, in offline mode against a throwaway SQLite database:
+
+  payload   - serializing one module for POST /api/training/start:
+              "before" serializes it for storage and again for the response
+              (stdlib jsonify), "after" serializes it once and splices the
+              stored bytes into the response
+  endpoints - POST /api/training/start, GET /api/dashboard/metrics/<id> and
+              GET /api/training/sessions/<id>, once with the stdlib JSON
+              provider and once with orjson (skipped if not installed)
+
+Usage:
+    python benchmarks/bench_json.py [--requests 300] [--sessions 200]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label, samples):
+    print(f"{label:>36}: p50 {statistics.median(samples):8.3f} ms | p95 {percentile(samples, 95):8.3f} ms")
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--sessions", type=int, default=200, help="Sessions for the metrics user")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cyberbridge-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["CYBERBRIDGE_OFFLINE"] = "1"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["CONTENT_CACHE_PATH"] = ""
+
+    from flask.json.provider import DefaultJSONProvider
+    from app import create_app, db, User, TrainingSession
+    from ai_trainer import get_fallback_content
+    from content_store import store_document
+    from documents import serialize_content
+    from json_provider import OrjsonProvider, orjson, raw_json_response
+    from migrations import upgrade_database
+
+    app = create_app({"SHARED_CACHE_PATH": None})
+    providers = [("stdlib", DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(("orjson", OrjsonProvider(app)))
+
+    with app.app_context():
+        upgrade_database(log=lambda *a: None)
+        user = User(email="bench@bench.example", organization="Bench Org", industry="General", role="Employee")
+        # Sessions created by the start benchmark go to a second user so
+        # the metrics user's history stays the same for every provider
+        starter = User(email="starter@bench.example", organization="Bench Org", industry="General", role="Employee")
+        db.session.add_all([user, starter])
+        db.session.commit()
+        user_id, starter_id = user.id, starter.id
+
+        content = get_fallback_content("Phishing Awareness")
+        document_id = store_document(content)
+        db.session.execute(db.insert(TrainingSession), [
+            {"user_id": user_id, "module_name": f"Module {i % 4}", "document_id": document_id,
+             "completion_status": "completed" if i % 2 else "in_progress",
+             "quiz_score": 80.0 if i % 2 else None}
+            for i in range(args.sessions)
+        ])
+        db.session.commit()
+        session_id = db.session.execute(db.select(TrainingSession.id).limit(1)).scalar_one()
+
+        # Payload: one module, serialized for storage and for the response
+        def before():
+            canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+            canonical.encode("utf-8")
+            app.json = providers[0][1]
+            app.json.response({"session_id": 1, "content": content}).get_data()
+
+        def after():
+            raw = serialize_content(content)
+            raw_json_response(app, {"session_id": 1}, content=raw).get_data()
+
+        with app.test_request_context():
+            print(f"Module payload ({len(serialize_content(content))} bytes), {args.requests} runs")
+            report("before (serialize twice)", timed(before, args.requests))
+            report("after (serialize once)", timed(after, args.requests))
+
+    client = app.test_client()
+    endpoints = [
+        ("POST /api/training/start", lambda: client.post(
+            "/api/training/start", json={"user_id": starter_id, "module_name": "Phishing Awareness"})),
+        ("GET /api/dashboard/metrics", lambda: client.get(f"/api/dashboard/metrics/{user_id}")),
+        ("GET /api/training/sessions", lambda: client.get(f"/api/training/sessions/{session_id}")),
+    ]
+
+    # The start endpoint prints a banner per request
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        results = {}
+        for name, provider in providers:
+            app.json = provider
+            for label, request in endpoints:
+                request()  # warm up
+                results[(label, name)] = timed(request, args.requests)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"\nEndpoints, {args.requests} requests each ({args.sessions} sessions on the metrics user)")
+    for label, _ in endpoints:
+        for name, _ in providers:
+            report(f"{label} [{name}]", results[(label, name)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Benchmark the organization-wide risk score recompute
+
+Seeds a throwaway SQLite database with one organization of --users users,
+each with a few completed and in-progress sessions, then times:
+
+  per-user  - a per-user ORM loop (load the user, load its sessions, score
+              in Python, assign risk_score) over a --sample of users,
+              extrapolated to the whole organization
+  bulk      - risk.recompute_risk_scores(): two aggregate queries, NumPy
+              scoring and one executemany UPDATE, run twice (the second run
+              has nothing to write)
+
+Usage:
+    python benchmarks/bench_risk.py [--users 100000] [--sample 2000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=2000, help="Users scored by the per-user loop")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cyberbridge-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["CYBERBRIDGE_OFFLINE"] = "1"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from app import create_app, db, User, TrainingSession, TRAINING_MODULES
+    from risk import WEIGHTS, STALE_AFTER_DAYS, recompute_risk_scores, role_weight
+
+    app = create_app()
+
+    rng = random.Random(42)
+    roles = ["Employee", "IT Manager", "Finance Analyst", "HR Partner", "Sales", "System Admin"]
+    now = datetime.utcnow()
+
+    with app.app_context():
+        db.create_all()
+
+        print(f"Seeding {args.users} users...")
+        started = time.perf_counter()
+        db.session.execute(db.insert(User), [
+            {"id": u, "email": f"user{u}@bench.example", "organization": "Bench Org",
+             "industry": "General", "role": rng.choice(roles), "risk_score": 0.0}
+            for u in range(1, args.users + 1)
+        ])
+        sessions = []
+        for u in range(1, args.users + 1):
+            for module in rng.sample(TRAINING_MODULES, rng.randint(0, len(TRAINING_MODULES))):
+                done = rng.random() < 0.7
+                sessions.append({
+                    "user_id": u,
+                    "module_name": module,
+                    "completion_status": "completed" if done else "in_progress",
+                    "quiz_score": rng.uniform(40, 100) if done else None,
+                    "completed_at": now - timedelta(days=rng.uniform(0, 365)) if done else None,
+                })
+        db.session.execute(db.insert(TrainingSession), sessions)
+        db.session.commit()
+        print(f"  {len(sessions)} sessions in {time.perf_counter() - started:.1f}s")
+
+        def score_one(user):
+            done = [s for s in TrainingSession.query.filter_by(user_id=user.id).all()
+                    if s.completion_status == "completed"]
+            scores = [s.quiz_score for s in done if s.quiz_score is not None]
+            knowledge = 1 - (sum(scores) / len(scores) if scores else 0) / 100
+            coverage = 1 - min(len({s.module_name for s in done}) / len(TRAINING_MODULES), 1)
+            last = max((s.completed_at for s in done), default=None)
+            days = (now - last).total_seconds() / 86400 if last else STALE_AFTER_DAYS
+            recency = min(max(days / STALE_AFTER_DAYS, 0), 1)
+            base = (WEIGHTS["knowledge"] * knowledge + WEIGHTS["coverage"] * coverage
+                    + WEIGHTS["recency"] * recency)
+            return round(min(base * role_weight(user.role) * 100, 100), 1)
+
+        sample = min(args.sample, args.users)
+        started = time.perf_counter()
+        for user in User.query.filter(User.id <= sample).all():
+            user.risk_score = score_one(user)
+        db.session.commit()
+        loop_seconds = (time.perf_counter() - started) * args.users / sample
+
+        results = []
+        for _ in range(2):
+            started = time.perf_counter()
+            result = recompute_risk_scores(len(TRAINING_MODULES), organization="Bench Org", now=now)
+            db.session.commit()
+            result["total_seconds"] = time.perf_counter() - started
+            results.append(result)
+
+    first, second = results
+    print(f"\nRisk recompute for {args.users} users")
+    print(f"per-user: {loop_seconds:8.2f} s (extrapolated from {sample} users)")
+    print(f"    bulk: {first['total_seconds']:8.2f} s  (load {first['load_seconds']}s, "
+          f"score {first['score_seconds']}s, write {first['write_seconds']}s, "
+          f"{first['updated']} updated)")
+    print(f" re-run : {second['total_seconds']:8.2f} s  ({second['updated']} updated)")
+    print(f" speedup: {loop_seconds / first['total_seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Startup-time benchmark for CyberBridge
+
+Imports the app in fresh interpreters with CYBERBRIDGE_OFFLINE=1 and reports
+how long it takes. Exits non-zero when the median import time exceeds the
+budget, when importing the app pulls in the Gemini SDK (which means
+something went back to configuring the client at import time), or when
+create_app() starts a thread (gunicorn --preload forks after building the
+app, and threads do not survive a fork).
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--budget-ms 1500]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, json, time, threading
+started = time.perf_counter()
+import app
+elapsed = (time.perf_counter() - started) * 1000
+app.create_app()
+print(json.dumps({
+    "import_ms": elapsed,
+    "gemini_sdk_loaded": "google.generativeai" in sys.modules,
+    "threads": threading.active_count(),
+}))
+"""
+
+
+def run_probe():
+    env = dict(os.environ, CYBERBRIDGE_OFFLINE="1")
+    env.pop("GEMINI_API_KEY", None)
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    args = parser.parse_args()
+
+    samples = [run_probe() for _ in range(args.runs)]
+    times = sorted(s["import_ms"] for s in samples)
+    median = statistics.median(times)
+
+    print(f"import app (offline): median {median:.1f} ms, "
+          f"min {times[0]:.1f} ms, max {times[-1]:.1f} ms over {args.runs} runs")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median import time {median:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+    if any(s["gemini_sdk_loaded"] for s in samples):
+        failures.append("importing app loaded google.generativeai (client must be configured lazily)")
+    if any(s["threads"] > 1 for s in samples):
+        failures.append("create_app() started a thread (background workers must start on first use)")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Startup within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+"""
+Benchmark quiz-completion writes per second under each storage mode
+
+Seeds a throwaway SQLite database with in-progress sessions, then has
+--processes worker processes with --threads threads each POST
+/api/training/complete as fast as they can for --duration seconds. Every
+thread completes its own sessions. The same run is repeated for:
+
+  default       - SQLAlchemy's default engine (rollback journal, full sync)
+  production    - STORAGE_MODE=production (WAL, busy timeout, tuned pragmas)
+  group-commit  - production plus GROUP_COMMIT=true, which batches the
+                  completions from each process into one transaction
+
+and writes/s, failed requests (e.g. "database is locked") and latency
+percentiles are reported for each.
+
+Usage:
+    python benchmarks/bench_writes.py [--processes 4] [--threads 8] [--duration 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ADMIN_TOKEN = "bench-writes"
+
+CONFIGS = {
+    "default": {"STORAGE_MODE": "default", "GROUP_COMMIT": "false"},
+    "production": {"STORAGE_MODE": "production", "GROUP_COMMIT": "false"},
+    "group-commit": {"STORAGE_MODE": "production", "GROUP_COMMIT": "true"},
+}
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def set_environment(database, config):
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ["CYBERBRIDGE_OFFLINE"] = "1"
+    os.environ["CONTENT_CACHE_PATH"] = ""
+    # /api/training/complete is admin only; use our own token rather than one from .env
+    os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.update(CONFIGS[config])
+
+
+def seed(database, config, sessions):
+    set_environment(database, config)
+    from app import create_app, db, User, TrainingSession, TRAINING_MODULES
+    from migrations import upgrade_database
+
+    app = create_app()
+
+    with app.app_context():
+        upgrade_database(log=lambda *a: None)
+        users = max(1, sessions // len(TRAINING_MODULES))
+        db.session.execute(db.insert(User), [
+            {"id": u, "email": f"writer{u}@bench.example", "organization": "Bench Org",
+             "industry": "General", "role": "Employee"}
+            for u in range(1, users + 1)
+        ])
+        now = datetime.utcnow()
+        db.session.execute(db.insert(TrainingSession), [
+            {"user_id": 1 + i % users, "module_name": TRAINING_MODULES[i % len(TRAINING_MODULES)],
+             "completion_status": "in_progress", "started_at": now}
+            for i in range(sessions)
+        ])
+        db.session.commit()
+
+
+def worker(database, config, process, args, start, results):
+    import threading
+    set_environment(database, config)
+    from app import create_app
+
+    app = create_app()
+    samples, failures = [], [0]
+    lock = threading.Lock()
+
+    def run(thread):
+        client = app.test_client()
+        slot = process * args.threads + thread
+        slots = args.processes * args.threads
+        session_ids = list(range(1 + slot, args.sessions + 1, slots))
+        latencies, failed, i = [], 0, 0
+        start.wait()
+        stop_at = time.perf_counter() + args.duration
+        while time.perf_counter() < stop_at:
+            session_id = session_ids[i % len(session_ids)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                ok = client.post(
+                    "/api/training/complete",
+                    json={"session_id": session_id, "quiz_score": 50 + i % 50},
+                    headers={"X-Admin-Token": ADMIN_TOKEN},
+                ).status_code == 200
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failed += 1
+        with lock:
+            samples.extend(latencies)
+            failures[0] += failed
+
+    threads = [threading.Thread(target=run, args=(t,)) for t in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((samples, failures[0]))
+
+
+def run_config(config, args):
+    workdir = tempfile.mkdtemp(prefix="cyberbridge-bench-")
+    database = os.path.join(workdir, "bench.db")
+    context = multiprocessing.get_context("spawn")
+
+    seeder = context.Process(target=seed, args=(database, config, args.sessions))
+    seeder.start()
+    seeder.join()
+
+    start, results = context.Event(), context.Queue()
+    processes = [
+        context.Process(target=worker, args=(database, config, p, args, start, results))
+        for p in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(args.startup)  # let every worker import the app
+    start.set()
+
+    samples, failures = [], 0
+    for _ in processes:
+        latencies, failed = results.get()
+        samples.extend(latencies)
+        failures += failed
+    for process in processes:
+        process.join()
+
+    samples.sort()
+    return {
+        "writes": len(samples),
+        "writes_per_second": round(len(samples) / args.duration, 1),
+        "failed": failures,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2) if samples else None,
+        "p99_ms": round(percentile(samples, 99) * 1000, 2) if samples else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="Writer threads per process")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of writes per mode")
+    parser.add_argument("--sessions", type=int, default=4000, help="In-progress sessions to complete")
+    parser.add_argument("--startup", type=float, default=3.0, help="Seconds allowed for workers to import the app")
+    parser.add_argument("--modes", default=",".join(CONFIGS), help="Comma-separated modes to run")
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x {args.threads} threads, {args.duration}s per mode\n")
+    print(f"{'mode':>13} {'writes/s':>10} {'failed':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for config in args.modes.split(","):
+        result = run_config(config, args)
+        print(f"{config:>13} {result['writes_per_second']:>10} {result['failed']:>8} "
+              f"{result['p50_ms'] if result['p50_ms'] is not None else '-':>9} "
+              f"{result['p99_ms'] if result['p99_ms'] is not None else '-':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+#!/usr/bin/env python
+"""
+Load test for the CyberBridge API
+
+Seeds a throwaway SQLite database with synthetic users and sessions, swaps
+Gemini for the local fake provider (see providers.py) with tunable latency,
+and drives the real Flask app with a weighted mix of:
+
+  register  - POST /api/user/register with a new email
+  start     - POST /api/training/start for a seeded user
+  complete  - POST /api/training/complete for a started session
+  metrics   - GET /api/dashboard/metrics/<id> for a seeded user
+
+in one of two modes:
+
+  inprocess - Flask test clients on --concurrency threads (no HTTP)
+  wsgi      - --workers pre-forked werkzeug servers sharing one socket,
+              driven over HTTP by --concurrency client threads
+
+Reports requests per second and p50/p95/p99 latency per endpoint, and can
+save the results as JSON and compare them against an earlier run:
+
+    python benchmarks/load_test.py --mode wsgi --workers 4 --output base.json
+    python benchmarks/load_test.py --mode wsgi --workers 4 --compare base.json
+
+--compare exits with status 1 when any endpoint's p95 latency rose, or its
+throughput fell, by more than --threshold percent.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+import multiprocessing
+from collections import deque
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ("register", "start", "complete", "metrics")
+DEFAULT_MIX = "register=1,start=2,complete=2,metrics=5"
+ADMIN_TOKEN = "load-test"
+
+
+def parse_mix(value):
+    weights = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario '{name}' (expected one of {', '.join(SCENARIOS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+# ===== SEEDING =====
+
+def seed(app, users, sessions_per_user, organizations):
+    """Insert synthetic users and sessions; returns (user_ids, in_progress_session_ids)"""
+    from models import db, User, TrainingSession
+    from ai_trainer import get_fallback_content
+    from content_store import store_document
+    from migrations import upgrade_database
+    from rollups import rebuild_rollups
+    from app import TRAINING_MODULES
+
+    rng = random.Random(7)
+    roles = ["Employee", "IT Manager", "Finance Analyst", "HR Partner", "Sales"]
+    industries = ["Healthcare", "Finance", "Retail", "Professional Services"]
+
+    with app.app_context():
+        upgrade_database(log=lambda *a: None)
+        documents = {module: store_document(get_fallback_content(module)) for module in TRAINING_MODULES}
+        db.session.commit()
+
+        db.session.execute(db.insert(User), [
+            {"id": u, "email": f"seed{u}@load.example", "organization": f"Org {u % organizations}",
+             "industry": rng.choice(industries), "role": rng.choice(roles)}
+            for u in range(1, users + 1)
+        ])
+
+        now = datetime.utcnow()
+        rows = []
+        for u in range(1, users + 1):
+            for i in range(sessions_per_user):
+                module = TRAINING_MODULES[i % len(TRAINING_MODULES)]
+                done = rng.random() < 0.5
+                rows.append({
+                    "user_id": u,
+                    "module_name": module,
+                    "document_id": documents[module],
+                    "completion_status": "completed" if done else "in_progress",
+                    "quiz_score": rng.choice([50.0, 75.0, 100.0]) if done else None,
+                    "started_at": now,
+                    "completed_at": now if done else None,
+                })
+        if rows:
+            db.session.execute(db.insert(TrainingSession), rows)
+        rebuild_rollups()
+        db.session.commit()
+
+        in_progress = db.session.execute(
+            db.select(TrainingSession.id).where(TrainingSession.completion_status == "in_progress")
+        ).scalars().all()
+    return list(range(1, users + 1)), in_progress
+
+
+# ===== CLIENTS =====
+
+class InProcessClient:
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self._client.open(path, method=method, json=body, headers={"X-Admin-Token": ADMIN_TOKEN})
+        return response.status_code, response.get_data()
+
+    def close(self):
+        pass
+
+
+class HTTPClient:
+    def __init__(self, host, port, timeout=60):
+        self._address = (host, port)
+        self._timeout = timeout
+        self._connection = None
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"X-Admin-Token": ADMIN_TOKEN}
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(*self._address, timeout=self._timeout)
+            try:
+                self._connection.request(method, path, body=payload, headers=headers)
+                response = self._connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed a kept-alive connection; reconnect once
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# ===== WORKLOAD =====
+
+class Workload:
+    """Picks the next request and tracks sessions that can be completed"""
+
+    def __init__(self, user_ids, in_progress, mix, run_id, modules):
+        self.user_ids = user_ids
+        self.modules = modules
+        self.scenarios = list(mix)
+        self.weights = [mix[name] for name in self.scenarios]
+        self.run_id = run_id
+        self._pending = deque(in_progress, maxlen=100000)
+        self._lock = threading.Lock()
+        self._registered = 0
+
+    def _next_email(self):
+        with self._lock:
+            self._registered += 1
+            return f"load-{self.run_id}-{self._registered}@load.example"
+
+    def _pending_session(self):
+        with self._lock:
+            return self._pending.popleft() if self._pending else None
+
+    def _started(self, body):
+        try:
+            session_id = json.loads(body)["session_id"]
+        except (ValueError, KeyError, TypeError):
+            return
+        with self._lock:
+            self._pending.append(session_id)
+
+    def next_request(self, rng):
+        """Return (scenario, method, path, body, on_success)"""
+        scenario = rng.choices(self.scenarios, self.weights)[0]
+        if scenario == "complete":
+            session_id = self._pending_session()
+            if session_id is not None:
+                return ("complete", "POST", "/api/training/complete",
+                        {"session_id": session_id, "quiz_score": rng.choice([60, 80, 100])}, None)
+            scenario = "start"
+
+        if scenario == "register":
+            return ("register", "POST", "/api/user/register",
+                    {"email": self._next_email(), "organization": "Load Org", "role": "Employee"}, None)
+        if scenario == "start":
+            return ("start", "POST", "/api/training/start",
+                    {"user_id": rng.choice(self.user_ids), "module_name": rng.choice(self.modules)},
+                    self._started)
+        return ("metrics", "GET", f"/api/dashboard/metrics/{rng.choice(self.user_ids)}", None, None)
+
+
+def drive(make_client, workload, concurrency, duration, warmup):
+    """Run client threads for warmup + duration seconds; returns (samples, measured_seconds)"""
+    samples = []
+    samples_lock = threading.Lock()
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def worker(number):
+        rng = random.Random(number)
+        client = make_client()
+        local = []
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    break
+                scenario, method, path, body, on_success = workload.next_request(rng)
+                request_started = time.perf_counter()
+                try:
+                    status, data = client.request(method, path, body)
+                    ok = status < 400
+                except Exception:
+                    status, data, ok = None, b"", False
+                elapsed = time.perf_counter() - request_started
+                if ok and on_success:
+                    on_success(data)
+                if request_started >= measure_from:
+                    local.append((scenario, elapsed, ok, status))
+        finally:
+            client.close()
+            with samples_lock:
+                samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, duration
+
+
+def summarize(samples, seconds):
+    def stats(entries):
+        latencies = sorted(elapsed * 1000 for _, elapsed, ok, _ in entries if ok)
+        errors = sum(1 for _, _, ok, _ in entries if not ok)
+        statuses = {}
+        for _, _, ok, status in entries:
+            if not ok:
+                key = str(status) if status is not None else "exception"
+                statuses[key] = statuses.get(key, 0) + 1
+        return {
+            "requests": len(entries),
+            "errors": errors,
+            "error_statuses": statuses,
+            "rps": round(len(entries) / seconds, 1) if seconds else None,
+            "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+            "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+            "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+            "max_ms": round(latencies[-1], 2) if latencies else None,
+        }
+
+    endpoints = {}
+    for scenario in SCENARIOS:
+        entries = [sample for sample in samples if sample[0] == scenario]
+        if entries:
+            endpoints[scenario] = stats(entries)
+    return {"overall": stats(samples), "endpoints": endpoints}
+
+
+# ===== WSGI WORKERS =====
+
+def serve(app, sock):
+    """Worker process: serve the app on the inherited listening socket"""
+    import logging
+    from models import db
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    sys.stdout = open(os.devnull, "w")
+    with app.app_context():
+        # Never reuse connections opened by the parent before the fork
+        db.engine.dispose()
+    host, port = sock.getsockname()[:2]
+    make_server(host, port, app, threaded=True, fd=sock.fileno()).serve_forever()
+
+
+def start_workers(app, workers):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(1024)
+
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=serve, args=(app, sock), daemon=True) for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    host, port = sock.getsockname()[:2]
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            status, _ = HTTPClient(host, port, timeout=2).request("GET", "/api/training/modules")
+            if status == 200:
+                break
+        except OSError:
+            time.sleep(0.1)
+    return host, port, processes
+
+
+# ===== COMPARISON =====
+
+def compare(current, baseline, threshold):
+    """Print per-endpoint changes against a baseline run; return the regressions"""
+    regressions = []
+    print(f"\nCompared with {baseline.get('started_at', 'baseline')} (threshold {threshold:.0f}%)")
+    for name, now in current["results"]["endpoints"].items():
+        before = baseline["results"]["endpoints"].get(name)
+        if not before:
+            print(f"  {name:>9}: no baseline")
+            continue
+        changes = []
+        if before["p95_ms"] and now["p95_ms"]:
+            delta = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+            changes.append(f"p95 {before['p95_ms']:.1f} -> {now['p95_ms']:.1f} ms ({delta:+.0f}%)")
+            if delta > threshold:
+                regressions.append(f"{name} p95 +{delta:.0f}%")
+        if before["rps"] and now["rps"] is not None:
+            delta = (now["rps"] - before["rps"]) / before["rps"] * 100
+            changes.append(f"rps {before['rps']:.1f} -> {now['rps']:.1f} ({delta:+.0f}%)")
+            if delta < -threshold:
+                regressions.append(f"{name} rps {delta:.0f}%")
+        print(f"  {name:>9}: " + " | ".join(changes))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "wsgi"], default="inprocess")
+    parser.add_argument("--workers", type=int, default=4, help="Server processes in wsgi mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="Client threads")
+    parser.add_argument("--duration", type=float, default=10, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=2, help="Unmeasured seconds before measuring")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, default=4, help="Seeded sessions per user")
+    parser.add_argument("--organizations", type=int, default=20)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--fake-latency", default="0.2", help="Fake provider seconds per call, or min-max")
+    parser.add_argument("--fake-failure-rate", type=float, default=0.0)
+    parser.add_argument("--cold", action="store_true", help="Disable the content cache so every start calls the provider")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --output")
+    parser.add_argument("--threshold", type=float, default=10, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cyberbridge-load-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    os.environ["CYBERBRIDGE_OFFLINE"] = "0"
+    os.environ["CYBERBRIDGE_PROVIDER"] = "fake"
+    os.environ["FAKE_PROVIDER_LATENCY"] = args.fake_latency
+    os.environ["FAKE_PROVIDER_FAILURE_RATE"] = str(args.fake_failure_rate)
+    os.environ["CONTENT_CACHE_PATH"] = ""
+    # /api/training/complete is admin only; use our own token rather than one from .env
+    os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+    # Per-request log lines would bury the report; LOG_LEVEL=INFO includes them
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if args.cold:
+        os.environ["CONTENT_CACHE_TTL"] = "0"
+
+    from app import create_app, TRAINING_MODULES
+
+    # Workers forked by --mode wsgi share one dashboard cache next to the database
+    app = create_app({"SHARED_CACHE_PATH": os.path.join(workdir, "shared_cache.db")})
+
+    print(f"Seeding {args.users} users x {args.sessions} sessions in {workdir}...")
+    user_ids, in_progress = seed(app, args.users, args.sessions, args.organizations)
+    workload = Workload(user_ids, in_progress, args.mix, run_id=os.getpid(), modules=TRAINING_MODULES)
+
+    processes = []
+    if args.mode == "wsgi":
+        host, port, processes = start_workers(app, args.workers)
+        make_client = lambda: HTTPClient(host, port)
+        target = f"http://{host}:{port} with {args.workers} workers"
+    else:
+        make_client = lambda: InProcessClient(app)
+        target = "in-process test clients"
+
+    print(f"Driving {target}: {args.concurrency} clients, {args.warmup}s warmup + {args.duration}s")
+    started_at = datetime.utcnow().isoformat(timespec="seconds")
+    stdout = sys.stdout
+    if args.mode == "inprocess":
+        # The training endpoints print banners on every request
+        sys.stdout = open(os.devnull, "w")
+    try:
+        samples, seconds = drive(make_client, workload, args.concurrency, args.duration, args.warmup)
+    finally:
+        if sys.stdout is not stdout:
+            sys.stdout.close()
+            sys.stdout = stdout
+        for process in processes:
+            process.terminate()
+
+    results = summarize(samples, seconds)
+    print(f"\n{'endpoint':>9} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in list(results["endpoints"].items()) + [("overall", results["overall"])]:
+        def fmt(value):
+            return f"{value:9.2f}" if value is not None else f"{'-':>9}"
+        print(f"{name:>9} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8.1f} "
+              f"{fmt(row['p50_ms'])} {fmt(row['p95_ms'])} {fmt(row['p99_ms'])}")
+
+    report = {
+        "started_at": started_at,
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "git_commit": git_commit(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
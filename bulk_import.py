@@ -0,0 +1,208 @@
+"""
+Streaming bulk import of users from CSV or JSONL
+
+Rows are read one at a time from a file-like object, validated, and written
+in batches: one SELECT to find emails that already exist, one executemany
+INSERT for the new users and one COMMIT per batch. A batch that hits a
+constraint (e.g. a user registered between the SELECT and the INSERT) is
+retried row by row, so only the conflicting rows are reported as errors.
+"""
+
+import io
+import re
+import csv
+import json
+import time
+from collections import Counter
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+from models import db, User, normalize_email
+from rollups import rebuild_rollups, record_users_created
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# Column limits and defaults match the User model and /api/user/register
+FIELDS = {
+    "email": (120, None),
+    "organization": (200, "Demo Org"),
+    "industry": (100, "General"),
+    "role": (100, "Employee"),
+}
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield (row_number, row_dict, error) from a binary or text stream
+
+    Args:
+        stream: File-like object with CSV (header row required) or JSON lines
+        fmt: "csv" or "jsonl"
+    """
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "expected a JSON object"
+            continue
+        yield number, row, None
+
+
+def validate_row(row):
+    """Return (clean_row, error) with defaults applied and values trimmed"""
+    clean = {}
+    for field, (max_length, default) in FIELDS.items():
+        value = row.get(field)
+        value = str(value).strip() if value is not None else ""
+        if not value:
+            value = default
+        if value is not None and len(value) > max_length:
+            return None, f"{field} is longer than {max_length} characters"
+        clean[field] = value
+
+    if not clean["email"]:
+        return None, "email is required"
+    clean["email"] = normalize_email(clean["email"])
+    if not EMAIL_RE.match(clean["email"]):
+        return None, "email is not valid"
+    return clean, None
+
+
+def import_users(rows, batch_size=500, on_duplicate="skip", max_errors=1000):
+    """
+    Insert users from iter_rows() output in batches
+
+    Args:
+        rows: Iterable of (row_number, row_dict, error)
+        batch_size: Rows per INSERT and COMMIT
+        on_duplicate: "skip" leaves existing users alone, "update" overwrites
+            their organization, industry and role
+        max_errors: Per-row errors kept in the report (all are counted)
+
+    Returns:
+        Report dict with counts, per-row errors and rows per second
+    """
+    if on_duplicate not in ("skip", "update"):
+        raise ValueError("on_duplicate must be 'skip' or 'update'")
+
+    report = {
+        "processed": 0,
+        "inserted": 0,
+        "updated": 0,
+        "skipped": 0,
+        "failed": 0,
+        "errors": [],
+    }
+    moved_users = False
+    started = time.perf_counter()
+
+    def error(number, email, message):
+        report["failed"] += 1
+        if len(report["errors"]) < max_errors:
+            report["errors"].append({"row": number, "email": email, "error": message})
+
+    def write(batch):
+        """Apply one batch in the current transaction; returns (inserted, updated, skipped, moved)"""
+        existing = {
+            row.email: row
+            for row in db.session.execute(
+                db.select(User.id, User.email, User.organization, User.industry)
+                .where(User.email.in_(list(batch)))
+            )
+        }
+
+        new_rows = [row for email, (_, row) in batch.items() if email not in existing]
+        if new_rows:
+            db.session.execute(db.insert(User), new_rows)
+            record_users_created(Counter((r["organization"], r["industry"]) for r in new_rows))
+
+        moved = False
+        duplicates = [(existing[email], row) for email, (_, row) in batch.items() if email in existing]
+        if on_duplicate == "update" and duplicates:
+            table = User.__table__
+            db.session.execute(
+                table.update()
+                .where(table.c.id == bindparam("user_id"))
+                .values(
+                    organization=bindparam("new_organization"),
+                    industry=bindparam("new_industry"),
+                    role=bindparam("new_role"),
+                    data_version=table.c.data_version + 1,
+                ),
+                [
+                    {"user_id": current.id, "new_organization": row["organization"],
+                     "new_industry": row["industry"], "new_role": row["role"]}
+                    for current, row in duplicates
+                ],
+            )
+            moved = any(
+                (current.organization, current.industry) != (row["organization"], row["industry"])
+                for current, row in duplicates
+            )
+            return len(new_rows), len(duplicates), 0, moved
+        return len(new_rows), 0, len(duplicates), moved
+
+    def commit(batch):
+        nonlocal moved_users
+        inserted, updated, skipped, moved = write(batch)
+        db.session.commit()
+        report["inserted"] += inserted
+        report["updated"] += updated
+        report["skipped"] += skipped
+        moved_users = moved_users or moved
+
+    def flush(batch):
+        try:
+            commit(batch)
+        except IntegrityError:
+            db.session.rollback()
+            for email, entry in batch.items():
+                try:
+                    commit({email: entry})
+                except IntegrityError as e:
+                    db.session.rollback()
+                    error(entry[0], email, f"could not be saved: {e.orig}")
+
+    batch = {}
+    for number, raw, problem in rows:
+        report["processed"] += 1
+        row = None
+        if problem is None:
+            row, problem = validate_row(raw)
+        if problem is not None:
+            error(number, (raw or {}).get("email"), problem)
+            continue
+        if row["email"] in batch:
+            error(number, row["email"], f"duplicate of row {batch[row['email']][0]}")
+            continue
+
+        batch[row["email"]] = (number, row)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = {}
+    if batch:
+        flush(batch)
+
+    if moved_users:
+        # Users changed organization or industry; re-attribute their history
+        rebuild_rollups()
+        db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["processed"] / elapsed, 1) if elapsed else None
+    report["errors_truncated"] = report["failed"] > len(report["errors"])
+    return report
@@ -0,0 +1,44 @@
+"""
+Application settings
+
+create_app() starts from settings_from_env() and applies the overrides
+passed to it on top, so scripts and tests can build an app with other
+settings without touching the environment. Settings read by individual
+modules at import (content cache, provider, storage mode, logging) are
+still taken from the environment, see the README.
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _flag(name, default="false"):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def _instance_path(filename):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", filename)
+
+
+def settings_from_env():
+    """Flask config values from environment variables (and .env)"""
+    return {
+        "SQLALCHEMY_DATABASE_URI": os.getenv("DATABASE_URL", "sqlite:///cyberbridge.db"),
+        "SECRET_KEY": os.getenv("SECRET_KEY", "dev-key-change-this"),
+        "ADMIN_TOKEN": os.getenv("ADMIN_TOKEN"),
+        "METRICS_TOKEN": os.getenv("METRICS_TOKEN"),
+        "TRAINING_ASYNC": _flag("TRAINING_ASYNC"),
+        "TRAINING_WORKERS": int(os.getenv("TRAINING_WORKERS", "4")),
+        "TRAINING_QUEUE_DEPTH": int(os.getenv("TRAINING_QUEUE_DEPTH", "32")),
+        "TRAINING_STALE_AFTER": int(os.getenv("TRAINING_STALE_AFTER", "600")),
+        "GROUP_COMMIT": _flag("GROUP_COMMIT"),
+        "GROUP_COMMIT_INTERVAL_MS": float(os.getenv("GROUP_COMMIT_INTERVAL_MS", "5")),
+        "GROUP_COMMIT_MAX_BATCH": int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64")),
+        # Empty disables the cross-worker dashboard cache
+        "SHARED_CACHE_PATH": os.getenv("SHARED_CACHE_PATH", _instance_path("shared_cache.db")) or None,
+        "SHARED_CACHE_TTL": int(os.getenv("SHARED_CACHE_TTL", "3600")),
+        "DOCUMENT_CACHE_SIZE": int(os.getenv("DOCUMENT_CACHE_SIZE", "512")),
+        "ANSWER_KEY_CACHE_SIZE": int(os.getenv("ANSWER_KEY_CACHE_SIZE", "4096")),
+    }
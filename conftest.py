@@ -0,0 +1,56 @@
+"""
+Shared pytest fixtures
+
+Every test gets its own app on a throwaway SQLite database. Settings that
+modules read from the environment at import are pinned here, before any of
+them is imported, so tests never call Gemini or touch the on-disk content
+cache.
+"""
+
+import os
+
+os.environ["CYBERBRIDGE_OFFLINE"] = "1"
+os.environ["CONTENT_CACHE_PATH"] = ""
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pytest
+from app import create_app
+from migrations import upgrade_database
+from models import db, User
+
+ADMIN_TOKEN = "test-admin"
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "SHARED_CACHE_PATH": None,
+        "ADMIN_TOKEN": ADMIN_TOKEN,
+        "TRAINING_ASYNC": False,
+    })
+    with app.app_context():
+        upgrade_database(log=lambda message: None)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers():
+    return {"X-Admin-Token": ADMIN_TOKEN}
+
+
+@pytest.fixture
+def make_user(app):
+    def make(email="alice@example.com", organization="Acme", industry="Finance", role="Employee"):
+        user = User(email=email, organization=organization, industry=industry, role=role)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
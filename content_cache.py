@@ -0,0 +1,304 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from shared_cache import ForkSafeConnections
+from telemetry import get_logger
+
+log = get_logger("content_cache")
+
+
+def make_cache_key(prompt, model_name=""):
+    """Hash a rendered prompt (and the model that answers it) into a cache key"""
+    return hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with a per-entry TTL
+
+    Args:
+        max_entries: Entries kept before the least recently used one is evicted
+        ttl: Default lifetime of an entry in seconds (None = never expires)
+    """
+
+    def __init__(self, max_entries=256, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __contains__(self, key):
+        # Membership checks don't touch recency or the hit/miss counters
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def delete_where(self, predicate):
+        """Drop every entry whose value matches predicate, return how many"""
+        with self._lock:
+            doomed = [k for k, (v, _) in self._entries.items() if predicate(v)]
+            for key in doomed:
+                del self._entries[key]
+            return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class ContentCache:
+    """
+    Two-tier cache for generated training modules
+
+    Lookups go to an in-process LRU first, then to a SQLite file that survives
+    restarts and is shared by every worker process (see shared_cache.py).
+    Disk hits are promoted back into memory. Content is stored as
+    serialized JSON so callers always get their own copy of the document.
+
+    Invalidation has to reach the memory tier of every worker, not just the
+    one that handled the request. The file keeps a generation number per
+    topic (and one for the whole cache, bumped by clear()). Memory entries
+    remember the generations they were cached under, and a memory hit
+    whose topic has moved on since is dropped and looked up on disk again.
+    Checking costs one primary-key read of a tiny table per memory hit.
+
+    Args:
+        path: SQLite file for the persistent tier (None = memory only)
+        max_entries: Size of the in-process LRU
+        memory_ttl: Seconds an entry stays in memory
+        disk_ttl: Seconds an entry stays on disk
+    """
+
+    def __init__(self, path=None, max_entries=256, memory_ttl=3600, disk_ttl=30 * 86400):
+        self.path = path
+        self.disk_ttl = disk_ttl
+        self.memory = LRUCache(max_entries=max_entries, ttl=memory_ttl)
+        self._connections = ForkSafeConnections(path, setup=self._create_table) if path else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.invalidations = 0
+
+    # ----- persistent tier -----
+
+    @staticmethod
+    def _create_table(conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS content_cache ("
+            " key TEXT PRIMARY KEY,"
+            " topic TEXT NOT NULL,"
+            " body TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " expires_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_content_cache_topic ON content_cache (topic)")
+        # topic '' is the generation of the whole cache
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS content_cache_generation ("
+            " topic TEXT PRIMARY KEY,"
+            " generation INTEGER NOT NULL)"
+        )
+
+    def _connect(self):
+        # Autocommit, one connection per thread and process
+        return self._connections.get()
+
+    def _generation(self, topic):
+        rows = self._connect().execute(
+            "SELECT topic, generation FROM content_cache_generation WHERE topic IN ('', ?)", (topic,)
+        ).fetchall()
+        generations = dict(rows)
+        return generations.get("", 0), generations.get(topic, 0)
+
+    def _bump_generation(self, conn, topic):
+        conn.execute(
+            "INSERT INTO content_cache_generation (topic, generation) VALUES (?, 1)"
+            " ON CONFLICT (topic) DO UPDATE SET generation = generation + 1",
+            (topic,),
+        )
+
+    def _current(self, entry):
+        """Whether a memory entry (topic, body, generation) has not been invalidated by any worker"""
+        if not self.path:
+            return True
+        try:
+            return entry[2] == self._generation(entry[0])
+        except sqlite3.Error as e:
+            # Serve what we have rather than fail; the entry still expires with memory_ttl
+            log.warning("content_cache_read_failed", extra={"error": str(e)})
+            return True
+
+    def _disk_get(self, key):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT topic, body, expires_at FROM content_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        topic, body, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            conn.execute("DELETE FROM content_cache WHERE key = ?", (key,))
+            return None
+        return topic, body
+
+    def _disk_set(self, key, topic, body):
+        now = time.time()
+        expires_at = now + self.disk_ttl if self.disk_ttl is not None else None
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO content_cache (key, topic, body, created_at, expires_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (key, topic, body, now, expires_at),
+        )
+
+    # ----- public API -----
+
+    def get(self, key):
+        """Return the cached module dict for key, or None"""
+        entry = self.memory.get(key)
+        if entry is not None:
+            if self._current(entry):
+                self.memory_hits += 1
+                return json.loads(entry[1])
+            self.memory.delete(key)
+
+        if self.path:
+            try:
+                entry = self._disk_get(key)
+                if entry is not None:
+                    entry = (*entry, self._generation(entry[0]))
+            except sqlite3.Error as e:
+                log.warning("content_cache_read_failed", extra={"error": str(e)})
+                entry = None
+            if entry is not None:
+                self.disk_hits += 1
+                self.memory.set(key, entry)
+                return json.loads(entry[1])
+
+        self.misses += 1
+        return None
+
+    def contains(self, key):
+        """Check for key in either tier without affecting the statistics"""
+        if key in self.memory and not self.path:
+            return True
+        if self.path:
+            try:
+                return self._disk_get(key) is not None
+            except sqlite3.Error:
+                return False
+        return False
+
+    def set(self, key, content, topic):
+        """Store a generated module under key, tagged with its topic"""
+        body = json.dumps(content)
+        self.writes += 1
+        generation = None
+        if self.path:
+            try:
+                generation = self._generation(topic)
+                self._disk_set(key, topic, body)
+            except sqlite3.Error as e:
+                # Without a generation the entry is checked against the file again on its next hit
+                log.warning("content_cache_write_failed", extra={"error": str(e)})
+        self.memory.set(key, (topic, body, generation))
+
+    def invalidate_topic(self, topic):
+        """Drop every cached module for one topic from both tiers"""
+        removed = self.memory.delete_where(lambda entry: entry[0] == topic)
+        if self.path:
+            try:
+                conn = self._connect()
+                # Other workers drop their memory copies on their next hit
+                self._bump_generation(conn, topic)
+                cursor = conn.execute("DELETE FROM content_cache WHERE topic = ?", (topic,))
+                removed = max(removed, cursor.rowcount)
+            except sqlite3.Error as e:
+                log.warning("content_cache_invalidate_failed", extra={"topic": topic, "error": str(e)})
+        self.invalidations += 1
+        return removed
+
+    def clear(self):
+        self.memory.clear()
+        if self.path:
+            try:
+                conn = self._connect()
+                self._bump_generation(conn, "")
+                conn.execute("DELETE FROM content_cache")
+            except sqlite3.Error as e:
+                log.warning("content_cache_invalidate_failed", extra={"error": str(e)})
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        stats = {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "invalidations": self.invalidations,
+            "memory": self.memory.stats(),
+            "persistent": bool(self.path),
+        }
+        if self.path:
+            try:
+                stats["disk_entries"] = self._connect().execute(
+                    "SELECT COUNT(*) FROM content_cache"
+                ).fetchone()[0]
+            except sqlite3.Error:
+                stats["disk_entries"] = None
+        return stats
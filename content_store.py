@@ -0,0 +1,69 @@
+import json
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from documents import document_caches, encode_document, load_document_bytes, serialize_content
+from models import db, ModuleDocument
+from grading import encode_answer_key, extract_answer_key, public_content
+from question_bank import add_questions
+
+
+def store_document(content, raw=None, topic=None, role=None, industry=None):
+    """
+    Store module content once, keyed by its hash
+
+    Returns the ModuleDocument id. Adds to the current transaction without
+    committing; identical content written concurrently resolves to one row.
+    raw may pass serialize_content(content) to avoid serializing it twice.
+    When topic is given, the quiz of a newly stored document is added to the
+    question bank, tagged with role and industry (see question_bank.py).
+    """
+    content_hash, encoding, body, size = encode_document(content, raw=raw)
+
+    known_ids = document_caches().ids
+    document_id = known_ids.get(content_hash)
+    if document_id is not None:
+        return document_id
+
+    inserted = db.session.execute(
+        sqlite_insert(ModuleDocument)
+        .values(
+            content_hash=content_hash,
+            encoding=encoding,
+            body=body,
+            size=size,
+            answer_key=encode_answer_key(extract_answer_key(content)),
+        )
+        .on_conflict_do_nothing(index_elements=["content_hash"])
+    ).rowcount
+    document_id = db.session.execute(
+        db.select(ModuleDocument.id).where(ModuleDocument.content_hash == content_hash)
+    ).scalar_one()
+
+    # Only remember ids of rows that already existed; a row inserted by this
+    # transaction could still be rolled back
+    if not inserted:
+        known_ids.set(content_hash, document_id)
+    elif topic:
+        add_questions(content, topic, role, industry, document_id)
+    return document_id
+
+
+def load_public_session_json(session):
+    """
+    Return a session's module content without quiz answers, as JSON bytes, or None
+
+    Use this for anything sent to the browser; answers stay on the server
+    (see grading.py).
+    """
+    if session.document_id is None:
+        # Legacy session with inline content
+        return serialize_content(public_content(json.loads(session.content))) if session.content else None
+
+    public = document_caches().public
+    raw = public.get(session.document_id)
+    if raw is None:
+        full = load_document_bytes(session.document_id)
+        if full is None:
+            return None
+        raw = serialize_content(public_content(json.loads(full)))
+        public.set(session.document_id, raw)
+    return raw
@@ -0,0 +1,118 @@
+"""
+Stored module documents: encoding, decoding and cached reads
+
+A leaf module (it imports only models and the cache), so anything that
+needs a document's JSON can import it at module level. Writing documents
+is content_store.store_document().
+
+Document ids only mean something in one database, so the caches keyed by
+them belong to the app (see DocumentCaches) rather than to the process.
+"""
+
+import os
+import json
+import zlib
+import hashlib
+from flask import current_app
+from content_cache import LRUCache
+from models import db, ModuleDocument
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+# "zlib" (default), "zstd" (needs the zstandard package) or "none"
+COMPRESSION = os.getenv("CONTENT_COMPRESSION", "zlib").lower()
+
+
+class DocumentCaches:
+    """
+    One app's in-process caches of stored documents
+
+    create_app() gives every app its own, empty, in
+    app.extensions["document_caches"]. Documents never change once
+    written, so entries never need invalidating.
+    """
+
+    def __init__(self, documents=512, answer_keys=4096):
+        # content hash -> document id
+        self.ids = LRUCache(max_entries=4096)
+        # document id -> JSON bytes, and the same without quiz answers
+        self.documents = LRUCache(max_entries=documents)
+        self.public = LRUCache(max_entries=documents)
+        # document id -> answer key tuple, see grading.py
+        self.answer_keys = LRUCache(max_entries=answer_keys)
+
+
+def document_caches():
+    """The current app's DocumentCaches"""
+    return current_app.extensions["document_caches"]
+
+
+def canonical_json(content):
+    """Serialize content so equal documents always produce equal bytes"""
+    return json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def serialize_content(content):
+    """Canonical JSON of module content as UTF-8 bytes, ready for storage or a response"""
+    return canonical_json(content).encode("utf-8")
+
+
+def encode_document(content, compression=None, raw=None):
+    """
+    Return (content_hash, encoding, body, size) for a module dict
+
+    raw may pass serialize_content(content) when the caller already has it.
+    """
+    compression = compression or COMPRESSION
+    raw = raw if raw is not None else serialize_content(content)
+    content_hash = hashlib.sha256(raw).hexdigest()
+
+    if compression == "zstd" and zstandard is not None:
+        body = zstandard.ZstdCompressor(level=10).compress(raw)
+    elif compression in ("zlib", "zstd"):
+        compression = "zlib"
+        body = zlib.compress(raw, 6)
+    else:
+        compression = "none"
+        body = raw
+    return content_hash, compression, body, len(raw)
+
+
+def document_bytes(encoding, body):
+    """Return the UTF-8 JSON stored in a ModuleDocument body"""
+    if encoding == "zlib":
+        return zlib.decompress(body)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed documents")
+        return zstandard.ZstdDecompressor().decompress(body)
+    return bytes(body)
+
+
+def decode_document(encoding, body):
+    """Return the JSON text stored in a ModuleDocument body"""
+    return document_bytes(encoding, body).decode("utf-8")
+
+
+def load_document_bytes(document_id):
+    """Return the JSON of a stored document as UTF-8 bytes"""
+    cache = document_caches().documents
+    raw = cache.get(document_id)
+    if raw is None:
+        row = db.session.execute(
+            db.select(ModuleDocument.encoding, ModuleDocument.body).where(ModuleDocument.id == document_id)
+        ).one_or_none()
+        if row is None:
+            return None
+        raw = document_bytes(row.encoding, row.body)
+        cache.set(document_id, raw)
+    return raw
+
+
+def load_document_json(document_id):
+    """Return the JSON text of a stored document"""
+    raw = load_document_bytes(document_id)
+    return raw.decode("utf-8") if raw is not None else None
@@ -0,0 +1,127 @@
+"""
+Server-side quiz grading
+
+When module content is stored, its quiz is reduced to an answer key: the
+index of the correct option for each question, kept as a short JSON list
+on the ModuleDocument row (e.g. "[0,2,1]"). Grading a submission reads only
+that key, cached per app by document id, instead of decoding the whole module.
+
+Content sent to the browser goes through public_content() or
+public_section() first, which drop each question's "correct" value, so
+the answers are only ever known to the server.
+"""
+
+import json
+from documents import document_caches, load_document_json
+from models import db, ModuleDocument
+
+
+def _normalize(text):
+    return " ".join(str(text).split()).casefold()
+
+
+def extract_answer_key(content):
+    """
+    Return the answer key for module content as a list
+
+    Each entry is the index of the correct option, or None when the
+    question's "correct" value matches none of its options.
+    """
+    key = []
+    for question in (content or {}).get("quiz") or []:
+        options = question.get("options") or []
+        correct = question.get("correct")
+        index = None
+        if correct in options:
+            index = options.index(correct)
+        elif correct is not None:
+            normalized = [_normalize(option) for option in options]
+            if _normalize(correct) in normalized:
+                index = normalized.index(_normalize(correct))
+        key.append(index)
+    return key
+
+
+def strip_answer(question):
+    """Quiz question without its "correct" value"""
+    if not isinstance(question, dict):
+        return question
+    return {field: value for field, value in question.items() if field != "correct"}
+
+
+def public_content(content):
+    """Module content as sent to the browser: a copy whose quiz has no answers"""
+    if not isinstance(content, dict) or not isinstance(content.get("quiz"), list):
+        return content
+    return {**content, "quiz": [strip_answer(question) for question in content["quiz"]]}
+
+
+def public_section(event):
+    """A streamed section (see stream_parser.iter_sections) as sent to the browser"""
+    if event.get("section") != "quiz":
+        return event
+    if "index" in event:
+        return {**event, "value": strip_answer(event["value"])}
+    return {**event, "value": public_content({"quiz": event["value"]})["quiz"]}
+
+
+def encode_answer_key(key):
+    return json.dumps(key, separators=(",", ":"))
+
+
+def get_answer_key(session):
+    """Answer key for a TrainingSession, as a tuple"""
+    if session.document_id is None:
+        # Legacy session with inline content
+        return tuple(extract_answer_key(json.loads(session.content))) if session.content else ()
+
+    answer_keys = document_caches().answer_keys
+    key = answer_keys.get(session.document_id)
+    if key is None:
+        stored = db.session.execute(
+            db.select(ModuleDocument.answer_key).where(ModuleDocument.id == session.document_id)
+        ).scalar_one_or_none()
+        if stored is None:
+            # Written before answer keys existed and not yet upgraded
+            key = tuple(extract_answer_key(json.loads(load_document_json(session.document_id) or "{}")))
+        else:
+            key = tuple(json.loads(stored))
+        answer_keys.set(session.document_id, key)
+    return key
+
+
+def grade_answers(key, answers):
+    """
+    Score answers against an answer key
+
+    Args:
+        key: Answer key from get_answer_key()
+        answers: List of selected option indexes, or a dict of question
+            index -> option index; unanswered questions count as wrong
+
+    Returns:
+        Dict with correct, total, score (0-100) and per-question results
+    """
+    if isinstance(answers, dict):
+        selected = {}
+        for question, option in answers.items():
+            try:
+                selected[int(question)] = option
+            except (TypeError, ValueError):
+                raise ValueError(f"question index must be an integer, got {question!r}")
+    elif isinstance(answers, list):
+        selected = dict(enumerate(answers))
+    else:
+        raise ValueError("answers must be a list or an object of question index -> option index")
+
+    results = [
+        expected is not None and type(selected.get(i)) is int and selected[i] == expected
+        for i, expected in enumerate(key)
+    ]
+    correct = sum(results)
+    return {
+        "correct": correct,
+        "total": len(key),
+        "score": round(correct / len(key) * 100) if key else 0,
+        "results": results,
+    }
@@ -0,0 +1,131 @@
+"""
+Group commit: many small write transactions committed as one
+
+Each commit is a write-lock round trip and, outside WAL's synchronous=NORMAL,
+an fsync. GroupCommitWriter runs submitted write functions on one
+background thread. It collects whatever arrives within `interval` seconds
+(up to `max_batch`), runs each function in its own SAVEPOINT, and commits
+the whole batch at once. submit() returns only after that commit, so a
+request still answers only once its write is durable. A function that
+raises rolls back its own savepoint and its caller gets the exception.
+The rest of the batch is unaffected.
+"""
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from storage import immediate_transactions
+
+
+class GroupCommitWriter:
+    """
+    Batch write functions into shared transactions
+
+    Args:
+        app: Flask app whose context (and db.session) the writer uses
+        db: Flask-SQLAlchemy extension
+        interval: Seconds to wait for more writes after the first one
+        max_batch: Writes per transaction at most
+    """
+
+    def __init__(self, app, db, interval=0.005, max_batch=64):
+        self.app = app
+        self.db = db
+        self.interval = interval
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.failed = 0
+        self.largest_batch = 0
+
+    def _ensure_thread(self):
+        # Started on first use, and again in a forked child, so nothing runs before a fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, fn, *args, timeout=None):
+        """
+        Run fn(*args) in the next batch and return its result once committed
+
+        Raises whatever fn raised, or the commit error if the batch failed.
+        """
+        self._ensure_thread()
+        future = Future()
+        self._queue.put((fn, args, future))
+        return future.result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        flush_at = time.monotonic() + self.interval
+        while len(batch) < self.max_batch:
+            remaining = flush_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            with self.app.app_context(), immediate_transactions():
+                self._commit(batch)
+
+    def _commit(self, batch):
+        session = self.db.session
+        done = []
+        for fn, args, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            savepoint = session.begin_nested()
+            try:
+                result = fn(*args)
+                savepoint.commit()
+            except Exception as e:
+                savepoint.rollback()
+                self.failed += 1
+                future.set_exception(e)
+                continue
+            done.append((future, result))
+
+        try:
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            self.failed += len(done)
+            for future, _ in done:
+                future.set_exception(e)
+            return
+        finally:
+            self.batches += 1
+            self.writes += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+        for future, result in done:
+            future.set_result(result)
+
+    def stats(self):
+        return {
+            "interval_ms": self.interval * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "writes": self.writes,
+            "failed": self.failed,
+            "average_batch": round(self.writes / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "queued": self._queue.qsize(),
+        }
@@ -0,0 +1,28 @@
+"""
+gunicorn settings for CyberBridge
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is built once in the master (preload_app) and forked into
+WEB_CONCURRENCY workers, each serving GUNICORN_THREADS threads. Fork
+safety is covered by the app itself: background threads, log writers and
+cache connections start on first use in each worker. The post_fork hook
+below is a second line of defence for database connections.
+"""
+
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(2 * (os.cpu_count() or 1) + 1, 8))))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+preload_app = True
+# Gemini calls may take up to GENERATION_DEADLINE seconds (40 by default)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def post_fork(server, worker):
+    # Drop any pooled connection the master opened, without closing it for the master
+    from models import db
+
+    with worker.app.wsgi().app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,78 @@
+"""
+Conditional GET support (ETag / If-None-Match / 304)
+
+Endpoints derive an ETag from something cheap, such as User.data_version,
+before doing any real work. If the client already has that version,
+not_modified() returns a 304 right away, skipping the queries and the
+serialization. Requests and 304s are counted per endpoint so hit ratios
+can be read from /api/admin/stats.
+"""
+
+import hashlib
+import threading
+from flask import request
+
+
+def make_etag(*parts):
+    """Opaque ETag value (unquoted) for the given version parts"""
+    return hashlib.blake2b("|".join(str(part) for part in parts).encode("utf-8"), digest_size=12).hexdigest()
+
+
+class ConditionalStats:
+    """Thread-safe request / 304 counters per endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, endpoint, hit):
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, [0, 0])
+            counts[0] += 1
+            counts[1] += hit
+
+    def stats(self):
+        with self._lock:
+            snapshot = {name: tuple(counts) for name, counts in self._counts.items()}
+        return {
+            name: {
+                "requests": requests,
+                "not_modified": hits,
+                "hit_ratio": round(hits / requests, 3) if requests else 0.0,
+            }
+            for name, (requests, hits) in sorted(snapshot.items())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+conditional_stats = ConditionalStats()
+
+
+def _apply(response, etag, cache_control):
+    response.set_etag(etag)
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def not_modified(app, etag, cache_control=None):
+    """
+    Return a 304 response when the request's If-None-Match has etag, else None
+
+    Every call is counted for the current endpoint, so call it once per
+    request that supports conditional GETs.
+    """
+    hit = request.if_none_match.contains(etag)
+    # Blueprint prefix dropped so the counters are keyed by view function name
+    conditional_stats.record(request.endpoint.rpartition(".")[2], hit)
+    if not hit:
+        return None
+    return _apply(app.response_class(status=304), etag, cache_control)
+
+
+def with_etag(response, etag, cache_control=None):
+    """Attach the ETag and Cache-Control headers to a full response"""
+    return _apply(response, etag, cache_control)
@@ -0,0 +1,135 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from telemetry import get_logger
+
+log = get_logger("jobs")
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue already holds max_depth jobs"""
+
+
+class TrainingJob:
+    """A unit of background work; its process can wait on it and read its error"""
+
+    def __init__(self, session_id=None):
+        # A session's job is named after it, so any process can look it up in the database
+        self.id = str(session_id) if session_id is not None else uuid.uuid4().hex
+        self.session_id = session_id
+        self.status = "queued"
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or timeout elapses, return finished"""
+        return self._done.wait(timeout)
+
+
+class JobQueue:
+    """
+    Bounded thread pool for slow work such as content generation
+
+    Args:
+        workers: Threads generating content concurrently
+        max_depth: Jobs allowed to be queued or running at once
+        retention: Seconds a finished job stays queryable
+    """
+
+    def __init__(self, workers=4, max_depth=32, retention=600):
+        self.workers = workers
+        self.max_depth = max_depth
+        self.retention = retention
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_depth)
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _get_executor(self):
+        # Threads are started on first use so nothing runs before a fork
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="training-job"
+                    )
+        return self._executor
+
+    def submit(self, fn, *args, session_id=None, **kwargs):
+        """Queue fn(*args, **kwargs) and return its TrainingJob"""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise QueueFullError(f"Job queue is full ({self.max_depth} jobs)")
+
+        job = TrainingJob(session_id=session_id)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            self.submitted += 1
+
+        try:
+            self._get_executor().submit(self._run, job, fn, args, kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        try:
+            fn(*args, **kwargs)
+            job.status = "done"
+            self.completed += 1
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            self.failed += 1
+            log.error("job_failed", exc_info=True, extra={
+                "job_id": job.id, "session_id": job.session_id, "error_type": type(e).__name__,
+            })
+        finally:
+            job.finished_at = time.time()
+            self._slots.release()
+            job._done.set()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if not job.finished)
+        return {
+            "workers": self.workers,
+            "max_depth": self.max_depth,
+            "active": active,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,98 @@
+"""
+JSON provider for the Flask app
+
+Uses orjson when it is installed and the standard library otherwise. The
+JSON_PROVIDER environment variable forces one ("orjson" or "stdlib").
+
+raw_json_response() builds a response around JSON that is already
+serialized, such as stored module content, so those bytes go into the
+response body as they are instead of being parsed and serialized again.
+"""
+
+import os
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is used instead
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding and decoding"""
+
+    # Key order doesn't matter to clients and sorting costs time on every response
+    sort_keys = False
+
+    def _options(self, indent=False):
+        # Datetimes go through default() so they are formatted exactly as
+        # the stdlib provider formats them (HTTP dates)
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj, indent=False):
+        return orjson.dumps(obj, default=self.default, option=self._options(indent))
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Arguments only the stdlib understands (cls, separators, ...)
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent), mimetype=self.mimetype)
+
+
+def make_json_provider(app):
+    """Return the JSON provider selected by JSON_PROVIDER (default: orjson if installed)"""
+    choice = os.getenv("JSON_PROVIDER", "auto").lower()
+    if choice == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson but the orjson package is not installed")
+    if choice != "stdlib" and orjson is not None:
+        return OrjsonProvider(app)
+    return DefaultJSONProvider(app)
+
+
+def dumps_bytes(app, obj):
+    """Serialize obj with the app's provider, as UTF-8 bytes"""
+    if isinstance(app.json, OrjsonProvider):
+        return app.json.dumps_bytes(obj)
+    return app.json.dumps(obj).encode("utf-8")
+
+
+def raw_json_response(app, payload, status=200, **raw_fields):
+    """
+    JSON response for payload plus fields whose values are already JSON
+
+    Args:
+        app: Flask app whose JSON provider serializes payload
+        payload: Dict serialized normally
+        raw_fields: Field name -> JSON text (bytes or str), copied into the
+            body unchanged; None becomes null
+
+    Returns:
+        Response with the merged object as its body
+    """
+    body = dumps_bytes(app, payload)
+    parts = [body[:-1]]
+    separator = b"," if len(payload) else b""
+    for name, raw in raw_fields.items():
+        if raw is None:
+            raw = b"null"
+        elif isinstance(raw, str):
+            raw = raw.encode("utf-8")
+        parts.append(separator + dumps_bytes(app, name) + b":" + raw)
+        separator = b","
+    parts.append(b"}")
+    return app.response_class(b"".join(parts), status=status, mimetype=app.json.mimetype)
@@ -0,0 +1,201 @@
+"""
+Idempotent schema upgrades for existing cyberbridge.db files
+
+db.create_all() only creates missing tables, so columns and indexes added to
+existing tables are applied here. Every step checks before it changes
+anything, so `flask upgrade-db` can be run any number of times.
+"""
+
+import json
+from sqlalchemy import func, inspect, text
+from models import (
+    db, User, TrainingSession, ModuleDocument, OrgStats, OrgDailyCompletions, QuizQuestion, normalize_email,
+)
+from content_store import store_document
+from documents import decode_document
+from grading import encode_answer_key, extract_answer_key
+from rollups import rebuild_rollups
+from question_bank import backfill_question_bank
+
+
+def _columns(table):
+    return {column["name"] for column in inspect(db.engine).get_columns(table)}
+
+
+def add_document_column(log):
+    if "document_id" in _columns("training_session"):
+        return
+    db.session.execute(text(
+        "ALTER TABLE training_session ADD COLUMN document_id INTEGER REFERENCES module_document(id)"
+    ))
+    db.session.commit()
+    log("  + training_session.document_id")
+
+
+def add_data_version_column(log):
+    if "data_version" in _columns("user"):
+        return
+    db.session.execute(text("ALTER TABLE user ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0"))
+    db.session.commit()
+    log("  + user.data_version")
+
+
+def move_content_to_documents(log, batch_size=500):
+    """Replace inline TrainingSession.content JSON with shared ModuleDocument rows"""
+    moved = 0
+    inline_bytes = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(TrainingSession.id, TrainingSession.content)
+            .where(
+                TrainingSession.id > last_id,
+                TrainingSession.document_id.is_(None),
+                TrainingSession.content.is_not(None),
+            )
+            .order_by(TrainingSession.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for session_id, content in rows:
+            try:
+                document_id = store_document(json.loads(content))
+            except ValueError:
+                log(f"  ! session {session_id}: content is not valid JSON, left inline")
+                continue
+            updates.append({"id": session_id, "document_id": document_id, "content": None})
+            inline_bytes += len(content.encode("utf-8"))
+
+        if updates:
+            db.session.execute(db.update(TrainingSession), updates)
+        db.session.commit()
+        moved += len(updates)
+        last_id = rows[-1].id
+
+    if moved:
+        log(f"  + moved content of {moved} sessions ({inline_bytes} bytes inline) into module_document")
+
+
+def add_answer_key_column(log):
+    if "answer_key" in _columns("module_document"):
+        return
+    db.session.execute(text("ALTER TABLE module_document ADD COLUMN answer_key TEXT"))
+    db.session.commit()
+    log("  + module_document.answer_key")
+
+
+def backfill_answer_keys(log, batch_size=200):
+    """Extract answer keys for documents stored before grading moved server-side"""
+    filled = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(ModuleDocument.id, ModuleDocument.encoding, ModuleDocument.body)
+            .where(ModuleDocument.id > last_id, ModuleDocument.answer_key.is_(None))
+            .order_by(ModuleDocument.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        db.session.execute(db.update(ModuleDocument), [
+            {
+                "id": row.id,
+                "answer_key": encode_answer_key(
+                    extract_answer_key(json.loads(decode_document(row.encoding, row.body)))
+                ),
+            }
+            for row in rows
+        ])
+        db.session.commit()
+        filled += len(rows)
+        last_id = rows[-1].id
+
+    if filled:
+        log(f"  + extracted answer keys for {filled} documents")
+
+
+def normalize_user_emails(log):
+    """Lowercase emails stored before registration normalized them (see models.normalize_email)"""
+    users = db.session.execute(
+        db.select(User.id, User.email).where(User.email != func.lower(func.trim(User.email)))
+    ).all()
+    if not users:
+        return
+    normalized = {user_id: normalize_email(email) for user_id, email in users}
+    taken = set(db.session.execute(
+        db.select(User.email).where(User.email.in_(set(normalized.values())))
+    ).scalars())
+    updates = []
+    for user_id, email in users:
+        normalized_email = normalized[user_id]
+        if normalized_email in taken:
+            log(f"  ! user {user_id}: {email} left as is, {normalized_email} already exists")
+            continue
+        taken.add(normalized_email)
+        updates.append({"id": user_id, "email": normalized_email})
+    if updates:
+        db.session.execute(db.update(User), updates)
+        db.session.commit()
+        log(f"  + normalized {len(updates)} user emails")
+
+
+def create_missing_indexes(log):
+    """Create indexes declared on the models that an older database lacks"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                log(f"  + index {index.name}")
+
+
+def backfill_rollups(log):
+    """Populate organization rollups the first time they are created"""
+    def exists(column, *where):
+        return db.session.execute(db.select(column).where(*where).limit(1)).first() is not None
+
+    missing_org_stats = exists(User.id) and not exists(OrgStats.organization)
+    missing_daily = (
+        exists(TrainingSession.id, TrainingSession.completed_at.is_not(None))
+        and not exists(OrgDailyCompletions.day)
+    )
+    if missing_org_stats or missing_daily:
+        rebuild_rollups()
+        db.session.commit()
+        log("  + backfilled organization rollups")
+
+
+def backfill_questions(log):
+    """Fill the question bank from existing sessions the first time it is created"""
+    def exists(column, *where):
+        return db.session.execute(db.select(column).where(*where).limit(1)).first() is not None
+
+    if exists(QuizQuestion.id) or not exists(TrainingSession.id, TrainingSession.document_id.is_not(None)):
+        return
+    result = backfill_question_bank()
+    log(f"  + banked {result['added']} quiz questions from {result['documents']} documents")
+
+
+STEPS = [
+    add_document_column,
+    add_answer_key_column,
+    add_data_version_column,
+    move_content_to_documents,
+    backfill_answer_keys,
+    normalize_user_emails,
+    create_missing_indexes,
+    backfill_rollups,
+    backfill_questions,
+]
+
+
+def upgrade_database(log=print):
+    """Create missing tables and apply every upgrade step"""
+    db.create_all()
+    for step in STEPS:
+        step(log)
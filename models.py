@@ -1,7 +1,13 @@
 from datetime import datetime
-from app import db
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
 
 class User(db.Model):
+    __table_args__ = (
+        db.Index("ix_user_organization", "organization"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     organization = db.Column(db.String(200))
@@ -9,13 +15,104 @@ class User(db.Model):
     role = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     risk_score = db.Column(db.Float, default=0.0)
+    # Bumped whenever anything shown on the user's dashboard changes; used for ETags
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+def normalize_email(email):
+    """Emails are stored trimmed and lowercased, so every path finds the same user"""
+    return str(email).strip().lower()
+
+def bump_data_version(*user_ids):
+    """Mark the users' dashboard data as changed (in the current transaction)"""
+    db.session.execute(
+        db.update(User)
+        .where(User.id.in_(user_ids))
+        .values(data_version=User.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
 
 class TrainingSession(db.Model):
+    __table_args__ = (
+        db.Index("ix_training_session_user_status", "user_id", "completion_status"),
+        db.Index("ix_training_session_user_completed", "user_id", "completed_at"),
+        db.Index("ix_training_session_user_module", "user_id", "module_name"),
+        db.Index("ix_training_session_user_id", "user_id", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     module_name = db.Column(db.String(200))
-    content = db.Column(db.Text)  # JSON string
-    completion_status = db.Column(db.String(50), default="not_started")
+    content = db.deferred(db.Column(db.Text))  # Legacy inline JSON string, see document_id
+    document_id = db.Column(db.Integer, db.ForeignKey("module_document.id"))
+    completion_status = db.Column(db.String(50), default="not_started", index=True)
     quiz_score = db.Column(db.Float)
     started_at = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
+
+class ModuleDocument(db.Model):
+    """Module content stored once and shared by every session that uses it"""
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)  # SHA-256 of canonical JSON
+    encoding = db.Column(db.String(10), nullable=False)  # "none", "zlib" or "zstd"
+    body = db.Column(db.LargeBinary, nullable=False)
+    size = db.Column(db.Integer)  # Uncompressed JSON size in bytes
+    answer_key = db.Column(db.Text)  # JSON list of correct option indexes, see grading.py
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class OrgStats(db.Model):
+    """User counts per organization and industry, maintained by rollups.py"""
+    __tablename__ = "org_stats"
+
+    organization = db.Column(db.String(200), primary_key=True)
+    industry = db.Column(db.String(100), primary_key=True)
+    user_count = db.Column(db.Integer, nullable=False, default=0)
+
+class OrgModuleStats(db.Model):
+    """Per-module session totals per organization and industry, maintained by rollups.py"""
+    __tablename__ = "org_module_stats"
+
+    organization = db.Column(db.String(200), primary_key=True)
+    industry = db.Column(db.String(100), primary_key=True)
+    module_name = db.Column(db.String(200), primary_key=True)
+    sessions_started = db.Column(db.Integer, nullable=False, default=0)
+    sessions_completed = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    score_count = db.Column(db.Integer, nullable=False, default=0)
+
+class OrgDailyCompletions(db.Model):
+    """Completions per organization, industry and UTC day, maintained by rollups.py"""
+    __tablename__ = "org_daily_completions"
+    __table_args__ = (
+        db.Index("ix_org_daily_completions_industry_day", "industry", "day"),
+    )
+
+    organization = db.Column(db.String(200), primary_key=True)
+    industry = db.Column(db.String(100), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+
+class RollupVersion(db.Model):
+    """Single row counting rewrites of the rollup tables by rebuild_rollups(), for caches built on them"""
+    __tablename__ = "rollup_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class QuizQuestion(db.Model):
+    """A quiz question taken from stored module content, see question_bank.py"""
+    __tablename__ = "quiz_question"
+    __table_args__ = (
+        db.UniqueConstraint("topic", "text_hash", name="uq_quiz_question_topic_text"),
+        db.Index("ix_quiz_question_topic_role_industry", "topic", "role", "industry"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    topic = db.Column(db.String(200), nullable=False)
+    role = db.Column(db.String(100))  # Of the user the module was generated for; NULL for fallback content
+    industry = db.Column(db.String(100))
+    text_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of the normalized question text
+    question = db.Column(db.Text, nullable=False)
+    options = db.Column(db.Text, nullable=False)  # JSON list of option strings
+    correct = db.Column(db.Text, nullable=False)
+    document_id = db.Column(db.Integer, db.ForeignKey("module_document.id"))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
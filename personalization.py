@@ -0,0 +1,213 @@
+"""
+Local personalization of base training modules
+
+Instead of a full generation per (topic, role, industry), each topic is
+generated once for a generic profile and then tailored here: the
+introduction gets a role- and industry-specific sentence and the examples
+are rewritten from templates, using the curated tables below. Key concepts,
+best practices and the quiz are left as generated, so every profile gets
+the same answer key. This is a dict copy and a few string formats, so it
+costs microseconds.
+
+rewrite_prompt() / apply_rewrite() support the optional "llm" mode, where a
+small model rewrites only the introduction and examples.
+"""
+
+import copy
+import json
+
+# Profile the shared base module is generated for
+BASE_PROFILE = {"role": "Employee", "industry": "General", "tech_level": "beginner"}
+
+# What attackers are after and where people work, per industry
+INDUSTRIES = {
+    "Healthcare": {
+        "data": "patient records",
+        "system": "the electronic health record system",
+        "partner": "an insurance provider",
+        "regulation": "HIPAA",
+    },
+    "Retail": {
+        "data": "customer payment details",
+        "system": "the point-of-sale system",
+        "partner": "a supplier",
+        "regulation": "PCI DSS",
+    },
+    "Professional Services": {
+        "data": "client files",
+        "system": "the document management system",
+        "partner": "a client",
+        "regulation": "client confidentiality agreements",
+    },
+    "Non-Profit": {
+        "data": "donor information",
+        "system": "the donor database",
+        "partner": "a grant foundation",
+        "regulation": "donor privacy commitments",
+    },
+}
+DEFAULT_INDUSTRY = {
+    "data": "company data",
+    "system": "your work systems",
+    "partner": "a business partner",
+    "regulation": "company policy",
+}
+
+# Matched case-insensitively against words in User.role, like risk.ROLE_WEIGHTS;
+# the first matching group wins
+ROLE_GROUPS = (
+    ("leadership", ("owner", "ceo", "cfo", "executive", "director", "founder", "president")),
+    ("admin", ("admin", "administrator", "it", "engineer", "developer")),
+    ("manager", ("manager", "lead", "supervisor")),
+    ("finance", ("finance", "accountant", "accounting", "bookkeeper", "payroll")),
+    ("hr", ("hr", "recruiter", "people")),
+    ("clinical", ("nurse", "doctor", "physician", "clinician", "pharmacist", "therapist")),
+)
+
+ROLES = {
+    "leadership": {
+        "people": "business owners and executives",
+        "duty": "approving payments and signing off on decisions",
+        "why": "your authority makes your accounts the most valuable ones to impersonate",
+    },
+    "admin": {
+        "people": "administrators",
+        "duty": "managing accounts, devices and access",
+        "why": "one compromised admin account can expose every other account",
+    },
+    "manager": {
+        "people": "managers",
+        "duty": "approving requests and guiding your team",
+        "why": "your team follows your lead on how seriously to take security",
+    },
+    "finance": {
+        "people": "finance staff",
+        "duty": "processing invoices and payments",
+        "why": "attackers target anyone who can move money",
+    },
+    "hr": {
+        "people": "HR staff",
+        "duty": "handling personnel files and onboarding",
+        "why": "employee records are a prime target for identity theft",
+    },
+    "clinical": {
+        "people": "clinical staff",
+        "duty": "caring for patients",
+        "why": "attackers count on busy clinicians clicking without a second look",
+    },
+    "staff": {
+        "people": "employees",
+        "duty": "your day-to-day work",
+        "why": "most attacks start with an ordinary employee's inbox or login",
+    },
+}
+
+# Example templates per topic; fields come from INDUSTRIES and ROLES
+EXAMPLES = {
+    "Phishing Awareness": (
+        "An email that looks like it is from {partner} asks you to log in to {system} through a link",
+        "A message to {people} asks for {data} urgently, claiming a deadline today",
+    ),
+    "Password Security": (
+        "A password reused on a shopping site leaks, and attackers try it on {system}",
+        "A sticky note with the login for {system} is photographed during a visit",
+    ),
+    "Ransomware Prevention": (
+        "An attachment claiming to be from {partner} encrypts {data} when opened",
+        "An unpatched computer used for {duty} lets ransomware spread to {system}",
+    ),
+    "Data Protection Basics": (
+        "A spreadsheet of {data} is emailed to a personal address to work from home",
+        "A report containing {data} is left on a shared printer, breaching {regulation}",
+    ),
+}
+DEFAULT_EXAMPLES = (
+    "A request that involves {data} arrives from someone claiming to be {partner}",
+    "A shortcut taken during {duty} leaves {system} exposed",
+)
+
+
+def role_group(role):
+    words = (role or "").lower().replace("/", " ").replace("-", " ").split()
+    for group, names in ROLE_GROUPS:
+        if any(name in words for name in names):
+            return group
+    return "staff"
+
+
+def profile_fields(user_profile):
+    """Template fields for one profile"""
+    return {
+        "role": user_profile.get("role") or BASE_PROFILE["role"],
+        "industry": user_profile.get("industry") or BASE_PROFILE["industry"],
+        **INDUSTRIES.get(user_profile.get("industry"), DEFAULT_INDUSTRY),
+        **ROLES[role_group(user_profile.get("role"))],
+    }
+
+
+def personalize(base, topic, user_profile):
+    """
+    Return a copy of a base module tailored to user_profile from the tables
+
+    Args:
+        base: Module content generated for BASE_PROFILE
+        topic: Training topic the module covers
+        user_profile: Dict with 'role' and 'industry'
+    """
+    fields = profile_fields(user_profile)
+    content = copy.deepcopy(base)
+
+    industry = user_profile.get("industry")
+    setting = f"in {industry.lower()}" if industry in INDUSTRIES else "at work"
+    content["introduction"] = (
+        f"{base.get('introduction', '').strip()} For {fields['people']} {setting}, "
+        f"this matters because {fields['why']}."
+    ).strip()
+
+    examples = [template.format(**fields) for template in EXAMPLES.get(topic, DEFAULT_EXAMPLES)]
+    content["real_world_examples"] = examples + list(base.get("real_world_examples") or [])[:1]
+    return content
+
+
+def rewrite_prompt(base, topic, user_profile):
+    """Prompt asking a small model to rewrite only the introduction and examples"""
+    original = {
+        "introduction": base.get("introduction", ""),
+        "real_world_examples": base.get("real_world_examples", []),
+    }
+    return f"""
+Rewrite the introduction and real world examples of a cybersecurity training module for a specific audience.
+
+Topic: {topic}
+User Role: {user_profile['role']}
+Industry: {user_profile['industry']}
+
+Original:
+{json.dumps(original, indent=2)}
+
+Keep the same meaning and length. Make the examples realistic for their role and industry.
+Return ONLY a JSON object with "introduction" (string) and "real_world_examples" (list of 2-3 strings).
+"""
+
+
+def apply_rewrite(base, text):
+    """
+    Merge a rewrite answer into a copy of base
+
+    Raises ValueError when the answer is not the expected JSON.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.replace("```json", "").replace("```", "").strip()
+    rewrite = json.loads(text)
+    introduction = rewrite.get("introduction") if isinstance(rewrite, dict) else None
+    examples = rewrite.get("real_world_examples") if isinstance(rewrite, dict) else None
+    if not isinstance(introduction, str) or not introduction.strip():
+        raise ValueError("rewrite has no introduction")
+    if not isinstance(examples, list) or not examples or not all(isinstance(item, str) for item in examples):
+        raise ValueError("rewrite has no real_world_examples")
+
+    content = copy.deepcopy(base)
+    content["introduction"] = introduction.strip()
+    content["real_world_examples"] = examples
+    return content
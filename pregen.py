@@ -0,0 +1,124 @@
+import csv
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every worker thread
+
+    Args:
+        rate: Calls allowed per second (None or 0 = unlimited)
+        burst: Calls allowed back to back before throttling starts
+    """
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate or None
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate is None:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+def load_matrix(path):
+    """
+    Read role/industry pairs from a JSON list of objects or a CSV file
+    with 'role' and 'industry' columns
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+    return [(row.get("role"), row.get("industry")) for row in rows]
+
+
+def make_profile(role, industry):
+    return {
+        "role": role or "Employee",
+        "industry": industry or "General",
+        "tech_level": "beginner",
+    }
+
+
+def pregenerate(modules, pairs, generate, is_cached, parallelism=4, rate=None, progress=None):
+    """
+    Warm the content cache for every module x (role, industry) combination
+
+    Args:
+        modules: Training topics to generate
+        pairs: Iterable of (role, industry) tuples
+        generate: Callable(topic, profile) returning content or None on failure
+        is_cached: Callable(topic, profile) returning True if already cached
+        parallelism: Concurrent generations
+        rate: Max generations started per second (None = unlimited)
+        progress: Optional callable(result_dict) invoked as each combination finishes
+
+    Returns:
+        Report dict with counts, throughput, fallbacks and failures
+    """
+    profiles = {}
+    for role, industry in pairs:
+        profile = make_profile(role, industry)
+        profiles[(profile["role"], profile["industry"])] = profile
+
+    combinations = [(topic, profile) for topic in modules for profile in profiles.values()]
+    limiter = RateLimiter(rate)
+
+    def run(topic, profile):
+        result = {"module": topic, "role": profile["role"], "industry": profile["industry"]}
+        if is_cached(topic, profile):
+            result["outcome"] = "cached"
+            return result
+        limiter.acquire()
+        started = time.perf_counter()
+        try:
+            content = generate(topic, profile)
+            result["outcome"] = "generated" if content is not None else "fallback"
+        except Exception as e:
+            result["outcome"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    started = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=max(parallelism, 1)) as executor:
+        futures = [executor.submit(run, topic, profile) for topic, profile in combinations]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if progress:
+                progress(result)
+    elapsed = time.perf_counter() - started
+
+    counts = {"cached": 0, "generated": 0, "fallback": 0, "failed": 0}
+    for result in results:
+        counts[result["outcome"]] += 1
+    attempted = counts["generated"] + counts["fallback"] + counts["failed"]
+
+    return {
+        "combinations": len(combinations),
+        **counts,
+        "elapsed_seconds": round(elapsed, 2),
+        "combinations_per_second": round(len(combinations) / elapsed, 2) if elapsed else None,
+        "generations_per_second": round(attempted / elapsed, 2) if elapsed else None,
+        "fallbacks": [r for r in results if r["outcome"] == "fallback"],
+        "failures": [r for r in results if r["outcome"] == "failed"],
+    }
@@ -0,0 +1,183 @@
+"""
+Content providers: Gemini, or a local fake for testing
+
+A provider turns a prompt into module JSON text. generate() returns the
+whole text, stream() yields it in chunks; both give up after `timeout`
+seconds with DeadlineExceeded.
+
+CYBERBRIDGE_PROVIDER=fake selects FakeProvider, which never touches the
+network and can inject latency and failures:
+
+  FAKE_PROVIDER_LATENCY       seconds per call, or a "min-max" range (default 0.05)
+  FAKE_PROVIDER_FAILURE_RATE  share of calls that raise ProviderError (default 0)
+"""
+
+import os
+import re
+import json
+import time
+import random
+import threading
+from resilience import DeadlineExceeded
+
+
+class ProviderError(Exception):
+    """The provider failed in a way that may succeed on retry"""
+
+
+# google.api_core exception names worth retrying
+TRANSIENT_GOOGLE_ERRORS = (
+    "ServiceUnavailable",
+    "InternalServerError",
+    "BadGateway",
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServerError",
+)
+
+
+class GeminiProvider:
+    name = "gemini"
+
+    def __init__(self, get_model):
+        self._get_model = get_model
+
+    @property
+    def available(self):
+        return self._get_model() is not None
+
+    @staticmethod
+    def _translate(error, timeout):
+        """Map google.api_core errors onto DeadlineExceeded / ProviderError (retryable)"""
+        name = type(error).__name__
+        if name in ("DeadlineExceeded", "GatewayTimeout", "Timeout", "ReadTimeout"):
+            return DeadlineExceeded(f"Gemini did not answer within {timeout:.1f}s")
+        if name in TRANSIENT_GOOGLE_ERRORS:
+            return ProviderError(f"{name}: {error}")
+        return error
+
+    def _call(self, prompt, timeout, stream):
+        model = self._get_model()
+        if model is None:
+            raise ProviderError("Gemini is not configured")
+        try:
+            return model.generate_content(prompt, stream=stream, request_options={"timeout": timeout})
+        except Exception as e:
+            translated = self._translate(e, timeout)
+            if translated is e:
+                raise
+            raise translated from e
+
+    def generate(self, prompt, timeout):
+        return self._call(prompt, timeout, stream=False).text
+
+    def stream(self, prompt, timeout):
+        try:
+            for chunk in self._call(prompt, timeout, stream=True):
+                yield chunk.text
+        except (DeadlineExceeded, ProviderError):
+            raise
+        except Exception as e:
+            translated = self._translate(e, timeout)
+            if translated is e:
+                raise
+            raise translated from e
+
+
+def _parse_latency(value):
+    low, _, high = value.partition("-")
+    return float(low), float(high or low)
+
+
+class FakeProvider:
+    """Answers every prompt with a generic module after an injected delay"""
+
+    name = "fake"
+    available = True
+
+    def __init__(self, latency=(0.05, 0.05), failure_rate=0.0, seed=None, chunk_size=64):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.chunk_size = chunk_size
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=_parse_latency(os.getenv("FAKE_PROVIDER_LATENCY", "0.05")),
+            failure_rate=float(os.getenv("FAKE_PROVIDER_FAILURE_RATE", "0")),
+        )
+
+    def _roll(self):
+        with self._lock:
+            self.calls += 1
+            return self._random.uniform(*self.latency), self._random.random() < self.failure_rate
+
+    @staticmethod
+    def module_for(prompt):
+        match = re.search(r"^Topic: (.+)$", prompt, re.MULTILINE)
+        topic = match.group(1).strip() if match else "Security Basics"
+        return {
+            "title": topic,
+            "introduction": f"A short module on {topic}.",
+            "key_concepts": [
+                {"concept": f"{topic} basics", "explanation": "What it is and why it matters."},
+                {"concept": "Reporting", "explanation": "Tell IT as soon as something looks wrong."},
+            ],
+            "real_world_examples": [f"A colleague spotted a {topic.lower()} issue early."],
+            "best_practices": ["Stop and check before you click", "Report suspicious activity"],
+            "quiz": [
+                {
+                    "question": "What should you do when something looks suspicious?",
+                    "options": ["Ignore it", "Report it to IT", "Forward it to colleagues"],
+                    "correct": "Report it to IT",
+                }
+            ],
+        }
+
+    @classmethod
+    def answer_for(cls, prompt):
+        """Module JSON for a single-topic prompt, or {"modules": [...]} for a curriculum"""
+        match = re.search(r"^Topics:\n((?:- .+\n?)+)", prompt, re.MULTILINE)
+        if match is None:
+            return cls.module_for(prompt)
+        topics = [line[2:].strip() for line in match.group(1).splitlines()]
+        return {"modules": [{"topic": topic, **cls.module_for(f"Topic: {topic}")} for topic in topics]}
+
+    def _wait(self, delay, timeout):
+        # A stream can use up its timeout between chunks; never sleep a negative time
+        delay, timeout = max(0.0, delay), max(0.0, timeout)
+        if delay > timeout:
+            time.sleep(timeout)
+            raise DeadlineExceeded(f"fake provider did not answer within {timeout:.1f}s")
+        time.sleep(delay)
+
+    def generate(self, prompt, timeout):
+        delay, fail = self._roll()
+        self._wait(delay, timeout)
+        if fail:
+            raise ProviderError("injected failure")
+        return json.dumps(self.answer_for(prompt))
+
+    def stream(self, prompt, timeout):
+        delay, fail = self._roll()
+        text = json.dumps(self.answer_for(prompt))
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        started = time.monotonic()
+        for number, chunk in enumerate(chunks, 1):
+            self._wait(delay / len(chunks), timeout - (time.monotonic() - started))
+            if fail and number > len(chunks) // 2:
+                raise ProviderError("injected failure")
+            yield chunk
+
+
+def make_provider(get_model):
+    """Provider selected by CYBERBRIDGE_PROVIDER ("gemini" or "fake")"""
+    choice = os.getenv("CYBERBRIDGE_PROVIDER", "gemini").lower()
+    if choice == "fake":
+        return FakeProvider.from_env()
+    if choice != "gemini":
+        raise ValueError(f"Unknown CYBERBRIDGE_PROVIDER '{choice}' (expected 'gemini' or 'fake')")
+    return GeminiProvider(get_model)
@@ -0,0 +1,222 @@
+"""
+Quiz question bank
+
+Every quiz question that reaches a stored module (generated or fallback)
+is also kept as a QuizQuestion row, tagged with the topic and the role and
+industry it was written for. Questions are deduplicated per topic by a
+hash of their normalized text, so the same question generated for many
+users is stored once.
+
+assemble_quiz() builds a fresh quiz for a topic from the bank with two
+small queries and no provider call. It prefers questions written for the
+user's role and industry and falls back to the rest of the topic. Question
+order and option order are randomized. Pass a seed to get the same quiz
+again. Assembled questions carry no answers; grade_banked_answers() checks
+submissions against the bank on the server.
+"""
+
+import re
+import json
+import random
+import hashlib
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from documents import decode_document
+from models import db, User, TrainingSession, ModuleDocument, QuizQuestion
+from grading import extract_answer_key
+
+MAX_QUIZ_QUESTIONS = 20
+
+
+def normalize_question(text):
+    """Casefold and reduce punctuation and whitespace, so near-identical wording matches"""
+    return " ".join(re.sub(r"[\W_]+", " ", str(text).casefold()).split())
+
+
+def question_hash(text):
+    return hashlib.sha256(normalize_question(text).encode("utf-8")).hexdigest()
+
+
+def extract_questions(content):
+    """
+    Return the bankable questions in module content
+
+    Questions without text, with fewer than two options or whose correct
+    answer is not one of the options are skipped.
+    """
+    questions = []
+    quiz = (content or {}).get("quiz") or []
+    for question, index in zip(quiz, extract_answer_key(content)):
+        options = [str(option) for option in question.get("options") or []]
+        text = str(question.get("question") or "").strip()
+        if not text or len(options) < 2 or index is None:
+            continue
+        questions.append({"question": text, "options": options, "correct": options[index]})
+    return questions
+
+
+def add_questions(content, topic, role=None, industry=None, document_id=None):
+    """
+    Add the quiz questions of module content to the bank
+
+    Adds to the current transaction without committing. Questions already
+    banked for the topic are skipped. Returns the number of new rows.
+    """
+    rows = [
+        {
+            "topic": topic,
+            "role": role,
+            "industry": industry,
+            "text_hash": question_hash(item["question"]),
+            "question": item["question"],
+            "options": json.dumps(item["options"], ensure_ascii=False),
+            "correct": item["correct"],
+            "document_id": document_id,
+        }
+        for item in extract_questions(content)
+    ]
+    if not rows:
+        return 0
+    return db.session.execute(
+        sqlite_insert(QuizQuestion.__table__).on_conflict_do_nothing(index_elements=["topic", "text_hash"]),
+        rows,
+    ).rowcount
+
+
+def assemble_quiz(topic, count=5, role=None, industry=None, seed=None):
+    """
+    Build a randomized quiz for topic from the bank
+
+    Returns (questions, available): up to count questions in the module
+    quiz format without answers ({"id", "question", "options"}), and how
+    many questions the bank holds for the topic.
+    """
+    candidates = db.session.execute(
+        db.select(QuizQuestion.id, QuizQuestion.role, QuizQuestion.industry)
+        .where(QuizQuestion.topic == topic)
+    ).all()
+
+    # Both role and industry match, then either one, then the rest; random within each tier
+    rng = random.Random(seed)
+    tiers = [[], [], []]
+    for row in candidates:
+        matches = (role is not None and row.role == role) + (industry is not None and row.industry == industry)
+        tiers[2 - matches].append(row.id)
+    chosen = []
+    for tier in tiers:
+        rng.shuffle(tier)
+        chosen.extend(tier[:count - len(chosen)])
+
+    if not chosen:
+        return [], len(candidates)
+
+    rows = {
+        row.id: row
+        for row in db.session.execute(
+            db.select(QuizQuestion.id, QuizQuestion.question, QuizQuestion.options)
+            .where(QuizQuestion.id.in_(chosen))
+        )
+    }
+    questions = []
+    for question_id in rng.sample(chosen, len(chosen)):
+        row = rows[question_id]
+        options = json.loads(row.options)
+        rng.shuffle(options)
+        questions.append({"id": row.id, "question": row.question, "options": options})
+    return questions, len(candidates)
+
+
+def grade_banked_answers(topic, answers):
+    """
+    Score answers to an assembled quiz against the bank
+
+    Args:
+        topic: Module the questions were assembled for
+        answers: Dict of question id -> selected option text (options are
+            shuffled per quiz, so indexes would not identify them)
+
+    Returns:
+        Dict with correct, total, score (0-100) and results (question id ->
+        bool). Raises ValueError for malformed answers or ids that are not
+        banked for topic.
+    """
+    if not isinstance(answers, dict) or not answers:
+        raise ValueError("answers must be an object of question id -> selected option")
+    if len(answers) > MAX_QUIZ_QUESTIONS:
+        raise ValueError(f"At most {MAX_QUIZ_QUESTIONS} answers per quiz")
+    try:
+        selected = {int(question_id): option for question_id, option in answers.items()}
+    except (TypeError, ValueError):
+        raise ValueError("question ids must be integers")
+
+    correct_options = dict(db.session.execute(
+        db.select(QuizQuestion.id, QuizQuestion.correct)
+        .where(QuizQuestion.topic == topic, QuizQuestion.id.in_(selected))
+    ).all())
+    unknown = sorted(set(selected) - set(correct_options))
+    if unknown:
+        raise ValueError(f"Questions not banked for {topic}: {', '.join(map(str, unknown))}")
+
+    results = {
+        question_id: isinstance(option, str) and option == correct_options[question_id]
+        for question_id, option in selected.items()
+    }
+    correct = sum(results.values())
+    return {
+        "correct": correct,
+        "total": len(results),
+        "score": round(correct / len(results) * 100),
+        "results": results,
+    }
+
+
+def backfill_question_bank(batch_size=200, log=None):
+    """
+    Bank the quizzes of existing training sessions, batch_size sessions per commit
+
+    Each document is read once even when many sessions share it. Safe to run
+    again: questions already banked are skipped. Returns
+    {"sessions", "documents", "added"}.
+    """
+    seen = set()
+    sessions = documents = added = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(
+                TrainingSession.id,
+                TrainingSession.module_name,
+                TrainingSession.document_id,
+                User.role,
+                User.industry,
+            )
+            .join(User, User.id == TrainingSession.user_id)
+            .where(TrainingSession.id > last_id, TrainingSession.document_id.is_not(None))
+            .order_by(TrainingSession.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        pending = {}
+        for row in rows:
+            if row.module_name and row.document_id not in seen:
+                seen.add(row.document_id)
+                pending[row.document_id] = row
+
+        if pending:
+            for document in db.session.execute(
+                db.select(ModuleDocument.id, ModuleDocument.encoding, ModuleDocument.body)
+                .where(ModuleDocument.id.in_(pending))
+            ):
+                row = pending[document.id]
+                content = json.loads(decode_document(document.encoding, document.body))
+                added += add_questions(content, row.module_name, row.role, row.industry, document.id)
+            documents += len(pending)
+        db.session.commit()
+
+        sessions += len(rows)
+        last_id = rows[-1].id
+        if log:
+            log(f"  ... {sessions} sessions, {documents} documents, {added} questions banked")
+
+    return {"sessions": sessions, "documents": documents, "added": added}
@@ -0,0 +1,191 @@
+"""
+Circuit breaker and retry helpers for calls to the content provider
+
+The breaker watches the outcome of the last `window` calls. Once at least
+`min_calls` have been made and the failure ratio reaches
+`failure_threshold`, it opens: calls are refused immediately so requests
+fall back to cached or built-in content instead of waiting on a provider
+that is down. After `open_seconds` it lets `half_open_probes` calls through;
+if they succeed it closes again, otherwise it re-opens.
+"""
+
+import time
+import random
+import threading
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit breaker is refusing calls"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """A call, or the calls and retries for one request, ran out of time"""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=0.5, min_calls=5, window=20,
+                 open_seconds=30.0, half_open_probes=1, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self._counters = {"allowed": 0, "rejected": 0, "successes": 0, "failures": 0, "trips": 0}
+
+    def _refresh(self):
+        # Caller holds the lock
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+
+    def _trip(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._probes_in_flight = 0
+        self._counters["trips"] += 1
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def allow(self):
+        """Return True if a call may go ahead; the caller must then record its outcome"""
+        with self._lock:
+            self._refresh()
+            if self._state == OPEN or (
+                self._state == HALF_OPEN and self._probes_in_flight >= self.half_open_probes
+            ):
+                self._counters["rejected"] += 1
+                return False
+            if self._state == HALF_OPEN:
+                self._probes_in_flight += 1
+            self._counters["allowed"] += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._counters["successes"] += 1
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            self._counters["failures"] += 1
+            if self._state == HALF_OPEN:
+                self._trip()
+                return
+            self._outcomes.append(False)
+            if self._state == CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = self._outcomes.count(False)
+                if failures / len(self._outcomes) >= self.failure_threshold:
+                    self._trip()
+
+    def record_cancelled(self):
+        """The allowed call ended without an outcome (e.g. the client went away)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def force(self, state):
+        """Manually open or close (reset) the breaker"""
+        with self._lock:
+            if state == OPEN:
+                self._trip()
+            elif state == CLOSED:
+                self._state = CLOSED
+                self._outcomes.clear()
+                self._opened_at = None
+            else:
+                raise ValueError(f"can only force '{OPEN}' or '{CLOSED}'")
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            window_calls = len(self._outcomes)
+            failures = self._outcomes.count(False)
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = round(max(0.0, self.open_seconds - (self._clock() - self._opened_at)), 1)
+            return {
+                "name": self.name,
+                "state": self._state,
+                "window_calls": window_calls,
+                "window_failure_rate": round(failures / window_calls, 3) if window_calls else 0.0,
+                "failure_threshold": self.failure_threshold,
+                "min_calls": self.min_calls,
+                "open_seconds": self.open_seconds,
+                "half_open_in": retry_in,
+                **self._counters,
+            }
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Full-jitter exponential backoff before retry number attempt (1-based)"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+def call_with_retries(fn, breaker, attempt_timeout, deadline, retries=1,
+                      base_delay=0.5, max_delay=4.0, retry_on=(Exception,), on_attempt=None):
+    """
+    Call fn(timeout) through the breaker with bounded, jittered retries
+
+    Args:
+        fn: Callable taking the seconds this attempt may use
+        breaker: CircuitBreaker guarding the provider
+        attempt_timeout: Seconds allowed per attempt
+        deadline: Seconds allowed for all attempts and backoff together
+        retries: Extra attempts after the first failure
+        retry_on: Exception types that are worth retrying
+        on_attempt: Optional callback(outcome, seconds) per attempt
+
+    Raises:
+        CircuitOpenError if the breaker refuses the first attempt, otherwise
+        the last attempt's exception (DeadlineExceeded if time ran out)
+    """
+    give_up_at = time.monotonic() + deadline
+    last_error = None
+
+    for attempt in range(retries + 1):
+        remaining = give_up_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"gave up after {deadline}s") from last_error
+        if not breaker.allow():
+            if last_error is not None:
+                raise last_error
+            raise CircuitOpenError(f"{breaker.name} circuit is open")
+
+        started = time.monotonic()
+        try:
+            result = fn(min(attempt_timeout, remaining))
+        except Exception as e:
+            breaker.record_failure()
+            if on_attempt:
+                on_attempt("error", time.monotonic() - started)
+            last_error = e
+            if not isinstance(e, retry_on) or attempt == retries:
+                raise
+            delay = backoff_delay(attempt + 1, base_delay, max_delay)
+            if time.monotonic() + delay >= give_up_at:
+                raise
+            time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        if on_attempt:
+            on_attempt("ok", time.monotonic() - started)
+        return result
@@ -0,0 +1,196 @@
+"""
+Risk scores derived from training results
+
+A user's risk_score (0-100, higher is riskier) combines four signals:
+
+  knowledge  - 100 minus the average quiz score of completed modules
+  coverage   - share of the training catalogue not yet completed
+  recency    - days since the last completion, saturating at STALE_AFTER_DAYS
+  role       - a multiplier for roles with privileged access
+
+The inputs for every user are pulled with two bulk queries and scored with
+NumPy arrays, and only changed scores are written back in one executemany
+UPDATE. Scoring a single user after a completion runs the same code on
+arrays of length one.
+"""
+
+import time
+from datetime import datetime
+import numpy as np
+from sqlalchemy import bindparam, func
+from models import db, User, TrainingSession
+
+WEIGHTS = {"knowledge": 0.40, "coverage": 0.35, "recency": 0.25}
+STALE_AFTER_DAYS = 180.0
+
+# Matched case-insensitively against User.role; the highest matching weight wins
+ROLE_WEIGHTS = {
+    "admin": 1.3,
+    "it": 1.25,
+    "executive": 1.25,
+    "ceo": 1.25,
+    "cfo": 1.25,
+    "finance": 1.2,
+    "hr": 1.15,
+    "manager": 1.1,
+}
+DEFAULT_ROLE_WEIGHT = 1.0
+
+# Scores that moved less than this are not rewritten
+MIN_CHANGE = 0.05
+
+_UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+
+def role_weight(role):
+    words = (role or "").lower().replace("/", " ").replace("-", " ").split()
+    weights = [weight for name, weight in ROLE_WEIGHTS.items() if name in words]
+    return max(weights, default=DEFAULT_ROLE_WEIGHT)
+
+
+def _julian_day(moment):
+    return (moment - datetime(1970, 1, 1)).total_seconds() / 86400 + _UNIX_EPOCH_JULIAN_DAY
+
+
+def load_inputs(organization=None, user_ids=None):
+    """
+    Bulk-load the scoring inputs as NumPy arrays
+
+    Returns:
+        Dict of equally long arrays: id, role_weight, current, avg_score,
+        modules_completed and last_completed (Julian day, NaN if never)
+    """
+    filters = []
+    if organization is not None:
+        filters.append(User.organization == organization)
+    if user_ids is not None:
+        filters.append(User.id.in_(list(user_ids)))
+
+    users = db.session.execute(
+        db.select(User.id, User.role, User.risk_score).where(*filters).order_by(User.id)
+    ).all()
+
+    completed = TrainingSession.completion_status == "completed"
+    session_filters = [completed]
+    if user_ids is not None:
+        session_filters.append(TrainingSession.user_id.in_(list(user_ids)))
+    elif organization is not None:
+        session_filters.append(TrainingSession.user_id.in_(
+            db.select(User.id).where(User.organization == organization)
+        ))
+    results = db.session.execute(
+        db.select(
+            TrainingSession.user_id,
+            func.avg(TrainingSession.quiz_score),
+            func.count(func.distinct(TrainingSession.module_name)),
+            func.julianday(func.max(TrainingSession.completed_at)),
+        )
+        .where(*session_filters)
+        .group_by(TrainingSession.user_id)
+        .order_by(TrainingSession.user_id)
+    ).all()
+
+    count = len(users)
+    ids = np.fromiter((row[0] for row in users), dtype=np.int64, count=count)
+    current = np.fromiter(
+        (row[2] if row[2] is not None else np.nan for row in users), dtype=np.float64, count=count
+    )
+
+    # Role strings repeat a lot, so weigh each distinct role once
+    roles, inverse = np.unique(np.array([row[1] or "" for row in users], dtype=object), return_inverse=True)
+    weights = np.array([role_weight(role) for role in roles], dtype=np.float64)[inverse]
+
+    avg_score = np.full(count, np.nan)
+    modules_completed = np.zeros(count)
+    last_completed = np.full(count, np.nan)
+    if results:
+        result_ids = np.fromiter((row[0] for row in results), dtype=np.int64, count=len(results))
+        positions = np.searchsorted(ids, result_ids)
+        found = (positions < count) & (ids[np.minimum(positions, count - 1)] == result_ids)
+        positions = positions[found]
+        values = np.array(
+            [[np.nan if value is None else value for value in row[1:]] for row in results],
+            dtype=np.float64,
+        )[found]
+        avg_score[positions] = values[:, 0]
+        modules_completed[positions] = values[:, 1]
+        last_completed[positions] = values[:, 2]
+
+    return {
+        "id": ids,
+        "role_weight": weights,
+        "current": current,
+        "avg_score": avg_score,
+        "modules_completed": modules_completed,
+        "last_completed": last_completed,
+    }
+
+
+def score(inputs, module_count, now=None):
+    """Vectorized risk score for the arrays returned by load_inputs()"""
+    now_julian = _julian_day(now or datetime.utcnow())
+
+    knowledge = 1.0 - np.nan_to_num(inputs["avg_score"], nan=0.0).clip(0, 100) / 100
+    coverage = 1.0 - np.minimum(inputs["modules_completed"] / max(module_count, 1), 1.0)
+    days_since = np.nan_to_num(now_julian - inputs["last_completed"], nan=STALE_AFTER_DAYS)
+    recency = np.clip(days_since / STALE_AFTER_DAYS, 0.0, 1.0)
+
+    base = (
+        WEIGHTS["knowledge"] * knowledge
+        + WEIGHTS["coverage"] * coverage
+        + WEIGHTS["recency"] * recency
+    )
+    return np.round(np.minimum(base * inputs["role_weight"] * 100, 100.0), 1)
+
+
+def _write_back(ids, current, scores):
+    changed = np.isnan(current) | (np.abs(scores - current) >= MIN_CHANGE)
+    if changed.any():
+        table = User.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.id == bindparam("user_id"))
+            .values(risk_score=bindparam("score"), data_version=table.c.data_version + 1),
+            [
+                {"user_id": user_id, "score": value}
+                for user_id, value in zip(ids[changed].tolist(), scores[changed].tolist())
+            ],
+        )
+    return int(changed.sum())
+
+
+def recompute_risk_scores(module_count, organization=None, now=None):
+    """
+    Recompute risk_score for every user, or every user in one organization
+
+    Changes are added to the current transaction; the caller commits.
+
+    Returns:
+        Dict with the number of users scored and updated and the timings
+    """
+    started = time.perf_counter()
+    inputs = load_inputs(organization=organization)
+    loaded = time.perf_counter()
+    scores = score(inputs, module_count, now=now)
+    scored = time.perf_counter()
+    updated = _write_back(inputs["id"], inputs["current"], scores)
+    finished = time.perf_counter()
+
+    return {
+        "users": len(scores),
+        "updated": updated,
+        "mean_score": round(float(scores.mean()), 1) if len(scores) else None,
+        "load_seconds": round(loaded - started, 3),
+        "score_seconds": round(scored - loaded, 3),
+        "write_seconds": round(finished - scored, 3),
+    }
+
+
+def update_user_risk(user_id, module_count, now=None):
+    """Rescore one user, e.g. after a completion; returns the new score"""
+    inputs = load_inputs(user_ids=[user_id])
+    if not len(inputs["id"]):
+        return None
+    scores = score(inputs, module_count, now=now)
+    _write_back(inputs["id"], inputs["current"], scores)
+    return float(scores[0])
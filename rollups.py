@@ -0,0 +1,258 @@
+"""
+Incrementally maintained organization/industry rollups
+
+The record_* functions are called from the request that changes the base
+tables and only add to the current transaction, so a rollup update commits
+or rolls back together with the change it describes. rebuild_rollups()
+recomputes everything from User and TrainingSession to detect and repair
+drift. Every rebuild bumps rollup_version(), so caches derived from these
+tables (timeline.py) notice it in every process.
+"""
+
+from datetime import date
+from sqlalchemy import case, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, User, TrainingSession, OrgStats, OrgModuleStats, OrgDailyCompletions, RollupVersion
+
+
+def _key(organization, industry):
+    # Primary key columns can't be NULL, so missing values roll up under ""
+    return {"organization": organization or "", "industry": industry or ""}
+
+
+def _increment(model, key, **amounts):
+    """Atomically add amounts to the rollup row for key, creating it if needed"""
+    table = model.__table__
+    stmt = sqlite_insert(table).values(**key, **amounts)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={name: table.c[name] + stmt.excluded[name] for name in amounts},
+    )
+    db.session.execute(stmt)
+
+
+def rollup_version():
+    """Number of times the rollup tables have been rebuilt"""
+    return db.session.execute(
+        db.select(RollupVersion.version).where(RollupVersion.id == 1)
+    ).scalar_one_or_none() or 0
+
+
+def record_user_created(user):
+    _increment(OrgStats, _key(user.organization, user.industry), user_count=1)
+
+
+def record_users_created(counts):
+    """Bulk version of record_user_created: counts maps (organization, industry) to new users"""
+    for (organization, industry), count in counts.items():
+        _increment(OrgStats, _key(organization, industry), user_count=count)
+
+
+def record_session_started(user, module_name):
+    key = dict(_key(user.organization, user.industry), module_name=module_name or "")
+    _increment(OrgModuleStats, key, sessions_started=1)
+
+
+def record_session_completed(user, module_name, score, previous_status, previous_score, completed_at):
+    """Count a completion, or adjust the score sum when a completed session is re-scored"""
+    org_key = _key(user.organization, user.industry)
+    key = dict(org_key, module_name=module_name or "")
+    if previous_status != "completed":
+        _increment(
+            OrgModuleStats, key,
+            sessions_completed=1,
+            score_sum=score or 0.0,
+            score_count=1 if score is not None else 0,
+        )
+        _increment(OrgDailyCompletions, dict(org_key, day=completed_at.date()), completed=1)
+    else:
+        _increment(
+            OrgModuleStats, key,
+            score_sum=(score or 0.0) - (previous_score or 0.0),
+            score_count=(score is not None) - (previous_score is not None),
+        )
+
+
+# ===== READS =====
+
+def _filters(model, organization, industry):
+    filters = []
+    if organization is not None:
+        filters.append(model.organization == organization)
+    if industry is not None:
+        filters.append(model.industry == industry)
+    return filters
+
+
+def _kpis(started, completed, score_sum, score_count):
+    return {
+        "sessions_started": started,
+        "sessions_completed": completed,
+        "completion_rate": round(completed / started * 100, 1) if started else 0,
+        "average_quiz_score": round(score_sum / score_count, 1) if score_count else 0,
+    }
+
+
+def org_dashboard(organization=None, industry=None):
+    """KPIs for an organization and/or industry (everything when both are None)"""
+    user_count = db.session.execute(
+        db.select(func.coalesce(func.sum(OrgStats.user_count), 0))
+        .where(*_filters(OrgStats, organization, industry))
+    ).scalar_one()
+
+    module_filters = _filters(OrgModuleStats, organization, industry)
+    totals = (
+        func.sum(OrgModuleStats.sessions_started),
+        func.sum(OrgModuleStats.sessions_completed),
+        func.sum(OrgModuleStats.score_sum),
+        func.sum(OrgModuleStats.score_count),
+    )
+
+    overall = db.session.execute(db.select(*totals).where(*module_filters)).one()
+    modules = db.session.execute(
+        db.select(OrgModuleStats.module_name, *totals)
+        .where(*module_filters)
+        .group_by(OrgModuleStats.module_name)
+        .order_by(OrgModuleStats.module_name)
+    ).all()
+
+    # Break an organization down by industry, and anything else by organization
+    group = OrgModuleStats.industry if organization is not None else OrgModuleStats.organization
+    breakdown = db.session.execute(
+        db.select(group, *totals).where(*module_filters).group_by(group).order_by(group)
+    ).all()
+
+    return {
+        "organization": organization,
+        "industry": industry,
+        "users": user_count,
+        "kpis": _kpis(*(value or 0 for value in overall)),
+        "modules": [
+            {"name": row[0], **_kpis(*row[1:])}
+            for row in modules
+        ],
+        "breakdown": {
+            "by": "industry" if organization is not None else "organization",
+            "groups": [{"name": row[0], **_kpis(*row[1:])} for row in breakdown],
+        },
+    }
+
+
+# ===== REBUILD =====
+
+def compute_rollups():
+    """Recompute every rollup row from the base tables"""
+    org_rows = {
+        (org or "", industry or ""): count
+        for org, industry, count in db.session.execute(
+            db.select(User.organization, User.industry, func.count(User.id))
+            .group_by(User.organization, User.industry)
+        )
+    }
+
+    completed = TrainingSession.completion_status == "completed"
+    scored = completed & TrainingSession.quiz_score.is_not(None)
+    module_rows = {}
+    for org, industry, module_name, started, done, score_sum, score_count in db.session.execute(
+        db.select(
+            User.organization,
+            User.industry,
+            TrainingSession.module_name,
+            func.count(TrainingSession.id),
+            func.sum(case((completed, 1), else_=0)),
+            func.sum(case((scored, TrainingSession.quiz_score), else_=0.0)),
+            func.sum(case((scored, 1), else_=0)),
+        )
+        .join(User, User.id == TrainingSession.user_id)
+        .group_by(User.organization, User.industry, TrainingSession.module_name)
+    ):
+        key = (org or "", industry or "", module_name or "")
+        previous = module_rows.get(key, (0, 0, 0.0, 0))
+        module_rows[key] = (
+            previous[0] + started,
+            previous[1] + done,
+            previous[2] + score_sum,
+            previous[3] + score_count,
+        )
+
+    day = func.date(TrainingSession.completed_at)
+    daily_rows = {}
+    for org, industry, completed_on, count in db.session.execute(
+        db.select(User.organization, User.industry, day, func.count(TrainingSession.id))
+        .join(User, User.id == TrainingSession.user_id)
+        .where(completed, TrainingSession.completed_at.is_not(None))
+        .group_by(User.organization, User.industry, day)
+    ):
+        key = (org or "", industry or "", date.fromisoformat(completed_on))
+        daily_rows[key] = daily_rows.get(key, 0) + count
+
+    return org_rows, module_rows, daily_rows
+
+
+def rebuild_rollups(check_only=False):
+    """
+    Recompute the rollup tables and report drift from the stored values
+
+    Returns a list of human-readable drift descriptions. Unless check_only is
+    set, the tables are replaced with the recomputed rows (not committed).
+    """
+    org_rows, module_rows, daily_rows = compute_rollups()
+
+    stored_orgs = {
+        (row.organization, row.industry): row.user_count
+        for row in db.session.execute(db.select(OrgStats)).scalars()
+    }
+    stored_modules = {
+        (row.organization, row.industry, row.module_name):
+            (row.sessions_started, row.sessions_completed, row.score_sum, row.score_count)
+        for row in db.session.execute(db.select(OrgModuleStats)).scalars()
+    }
+    stored_daily = {
+        (row.organization, row.industry, row.day): row.completed
+        for row in db.session.execute(db.select(OrgDailyCompletions)).scalars()
+    }
+
+    drift = []
+    for key in sorted(set(org_rows) | set(stored_orgs)):
+        expected, actual = org_rows.get(key, 0), stored_orgs.get(key, 0)
+        if expected != actual:
+            drift.append(f"org_stats {key}: stored user_count={actual}, actual={expected}")
+    for key in sorted(set(module_rows) | set(stored_modules)):
+        expected = module_rows.get(key, (0, 0, 0.0, 0))
+        actual = stored_modules.get(key, (0, 0, 0.0, 0))
+        if expected[:2] != actual[:2] or expected[3] != actual[3] or abs(expected[2] - actual[2]) > 1e-6:
+            drift.append(f"org_module_stats {key}: stored={actual}, actual={expected}")
+    for key in sorted(set(daily_rows) | set(stored_daily)):
+        expected, actual = daily_rows.get(key, 0), stored_daily.get(key, 0)
+        if expected != actual:
+            drift.append(f"org_daily_completions {key}: stored completed={actual}, actual={expected}")
+
+    if not check_only:
+        _increment(RollupVersion, {"id": 1}, version=1)
+        db.session.execute(db.delete(OrgStats))
+        db.session.execute(db.delete(OrgModuleStats))
+        db.session.execute(db.delete(OrgDailyCompletions))
+        if org_rows:
+            db.session.execute(db.insert(OrgStats), [
+                {"organization": org, "industry": industry, "user_count": count}
+                for (org, industry), count in org_rows.items()
+            ])
+        if module_rows:
+            db.session.execute(db.insert(OrgModuleStats), [
+                {
+                    "organization": org,
+                    "industry": industry,
+                    "module_name": module_name,
+                    "sessions_started": values[0],
+                    "sessions_completed": values[1],
+                    "score_sum": values[2],
+                    "score_count": values[3],
+                }
+                for (org, industry, module_name), values in module_rows.items()
+            ])
+        if daily_rows:
+            db.session.execute(db.insert(OrgDailyCompletions), [
+                {"organization": org, "industry": industry, "day": day, "completed": count}
+                for (org, industry, day), count in daily_rows.items()
+            ])
+    return drift
@@ -0,0 +1,134 @@
+"""
+Keyset-paginated session listings
+
+Sessions are listed newest first (by id, descending). Each page ends with
+an opaque cursor holding the last id returned, and the next page starts
+with `id < cursor` instead of an OFFSET. Every page is therefore an index
+seek followed by at most `limit + 1` rows, however deep the page is.
+
+Only the lightweight columns are read, never the module content.
+Supporting indexes:
+
+  training_session (user_id, module_name) and (user_id, completion_status)
+      a user's history, optionally by module or status (SQLite appends the
+      row id to every index, so the id order comes free)
+  training_session (user_id, id)
+      a user's or an organization's history otherwise. SQLite reads each
+      user's ids newest first and stops once the page is full. The first
+      page is bounded by the largest possible id too: without an id range
+      the planner rates (user_id, completed_at) as just as good, and that
+      index needs every session of the scope sorted.
+  user (organization)
+      the organization's user ids
+"""
+
+import base64
+from datetime import date, datetime, time, timedelta
+from models import db, User, TrainingSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_SESSION_ID = 2 ** 63 - 1  # SQLite's largest rowid
+
+
+def encode_cursor(session_id):
+    return base64.urlsafe_b64encode(f"s{session_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Last session id of the previous page; raises ValueError for a cursor we did not issue"""
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        if text.startswith("s"):
+            return int(text[1:])
+    except (ValueError, UnicodeDecodeError):
+        pass
+    raise ValueError("Invalid cursor")
+
+
+def parse_filters(args):
+    """
+    Read module, status, start and end (YYYY-MM-DD, on started_at) from query args
+
+    Raises ValueError for malformed dates.
+    """
+    start = date.fromisoformat(args["start"]) if args.get("start") else None
+    end = date.fromisoformat(args["end"]) if args.get("end") else None
+    if start and end and start > end:
+        raise ValueError("start must not be after end")
+    return {
+        "module": args.get("module") or None,
+        "status": args.get("status") or None,
+        "start": start,
+        "end": end,
+    }
+
+
+def list_sessions(user_id=None, organization=None, module=None, status=None,
+                  start=None, end=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of sessions, newest first
+
+    Args:
+        user_id: Only this user's sessions
+        organization: Only sessions of users in this organization
+        module, status: Exact module_name / completion_status to match
+        start, end: Dates bounding started_at, both inclusive
+        cursor: next_cursor from the previous page
+        limit: Page size (1 to MAX_PAGE_SIZE)
+
+    Returns:
+        {"sessions": [...], "next_cursor": str or None}
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    filters = []
+    if user_id is not None:
+        filters.append(TrainingSession.user_id == user_id)
+    if organization is not None:
+        filters.append(TrainingSession.user_id.in_(
+            db.select(User.id).where(User.organization == organization).scalar_subquery()
+        ))
+    if module is not None:
+        filters.append(TrainingSession.module_name == module)
+    if status is not None:
+        filters.append(TrainingSession.completion_status == status)
+    if start is not None:
+        filters.append(TrainingSession.started_at >= datetime.combine(start, time.min))
+    if end is not None:
+        filters.append(TrainingSession.started_at < datetime.combine(end + timedelta(days=1), time.min))
+    filters.append(TrainingSession.id < (decode_cursor(cursor) if cursor else MAX_SESSION_ID))
+
+    query = (
+        db.select(
+            TrainingSession.id,
+            TrainingSession.user_id,
+            TrainingSession.module_name,
+            TrainingSession.completion_status,
+            TrainingSession.quiz_score,
+            TrainingSession.started_at,
+            TrainingSession.completed_at,
+        )
+        .where(*filters)
+        .order_by(TrainingSession.id.desc())
+        .limit(limit + 1)
+    )
+    rows = db.session.execute(query).all()
+
+    page = rows[:limit]
+    return {
+        "sessions": [
+            {
+                "id": row.id,
+                "user_id": row.user_id,
+                "module_name": row.module_name,
+                "status": row.completion_status,
+                "score": row.quiz_score,
+                "started_at": row.started_at.isoformat() if row.started_at else None,
+                "completed_at": row.completed_at.isoformat() if row.completed_at else None,
+            }
+            for row in page
+        ],
+        "next_cursor": encode_cursor(page[-1].id) if len(rows) > limit else None,
+    }
@@ -0,0 +1,148 @@
+"""
+Cache shared by every worker process through one SQLite file
+
+In-process caches (content_cache.LRUCache) are duplicated in each gunicorn
+worker, and each worker warms its own copy. SharedCache keeps entries in a
+SQLite file instead, so a result computed by one worker is served by all
+of them. Lookups are one primary-key read, answered from the OS page cache
+once the file is warm.
+
+The file is only a cache. It runs in WAL mode with synchronous=OFF: readers
+never wait for a writer, and a crash can at worst lose recent entries.
+Errors are logged and treated as misses, so a locked or unwritable file
+slows requests down but never fails them.
+
+Connections are opened per thread on first use and again in a forked
+child, so a process that imports the app (gunicorn --preload) holds no
+connection when it forks its workers.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from telemetry import get_logger
+
+log = get_logger("shared_cache")
+
+BUSY_TIMEOUT_MS = 2000
+
+
+class ForkSafeConnections:
+    """
+    One sqlite3 connection per thread and process for a file
+
+    Args:
+        path: SQLite file (its directory is created when missing)
+        setup: Called with each new connection, e.g. to create tables
+    """
+
+    def __init__(self, path, setup=None):
+        self.path = path
+        self.setup = setup
+        self._local = threading.local()
+
+    def get(self):
+        conn, pid = getattr(self._local, "conn", (None, None))
+        if conn is not None and pid == os.getpid():
+            return conn
+        # A connection inherited across fork() must not be used, or even closed
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        if self.setup:
+            self.setup(conn)
+        self._local.conn = (conn, os.getpid())
+        return conn
+
+
+class SharedCache:
+    """
+    Cross-process key/value cache with a per-entry TTL
+
+    Values are bytes (callers serialize). Keys should include whatever
+    versions the value depends on, so entries never need invalidating.
+
+    Args:
+        path: SQLite file shared by the workers
+        ttl: Default lifetime of an entry in seconds
+        prune_every: Writes between sweeps of expired entries
+    """
+
+    def __init__(self, path, ttl=3600, prune_every=1000):
+        self.path = path
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._connections = ForkSafeConnections(path, setup=self._create_table)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    @staticmethod
+    def _create_table(conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+            return getattr(self, name)
+
+    def get(self, key):
+        """Return the bytes stored under key, or None"""
+        try:
+            row = self._connections.get().execute(
+                "SELECT value FROM shared_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._count("errors")
+            log.warning("shared_cache_read_failed", extra={"error": str(e)})
+            row = None
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return bytes(row[0])
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            conn = self._connections.get()
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            if self._count("writes") % self.prune_every == 0:
+                conn.execute("DELETE FROM shared_cache WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            self._count("errors")
+            log.warning("shared_cache_write_failed", extra={"error": str(e)})
+
+    def clear(self):
+        self._connections.get().execute("DELETE FROM shared_cache")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = {
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "errors": self.errors,
+        }
+        try:
+            stats["entries"] = self._connections.get().execute("SELECT COUNT(*) FROM shared_cache").fetchone()[0]
+        except sqlite3.Error:
+            stats["entries"] = None
+        return stats
@@ -19,7 +19,8 @@ let modulesChartInstance = null;
 // ============ MAIN LOAD FUNCTION ============
 async function loadDashboard() {
   try {
-    const res = await fetch(`/api/dashboard/metrics/${USER_ID}`);
+    // KPIs, modules, timeline and alerts in one round-trip
+    const res = await fetch(`/api/dashboard/${USER_ID}`);
     if (!res.ok) throw new Error(`HTTP ${res.status}`);
     
     const data = await res.json();
@@ -62,8 +63,8 @@ async function loadDashboard() {
     // Populate module selector
     populateModuleSelector();
 
-    // Load alerts
-    await loadAlerts();
+    // Show alerts
+    displayAlerts(data.alerts || []);
 
   } catch (error) {
     console.error("❌ Error loading dashboard:", error);
@@ -71,21 +72,13 @@ async function loadDashboard() {
 }
 
 // ============ ALERTS ============
-async function loadAlerts() {
-  try {
-    const res = await fetch("/api/dashboard/alerts");
-    if (!res.ok) return;
-    
-    const data = await res.json();
-    const container = document.getElementById("alerts-section");
-    if (container && data.alerts) {
-      container.innerHTML = data.alerts
-        .map(a => `<div class="alert-item alert-${a.type}">${a.message}</div>`)
-        .join("");
-    }
-  } catch (error) {
-    console.error("Error loading alerts:", error);
-  }
+function displayAlerts(alerts) {
+  const container = document.getElementById("alerts-section");
+  if (!container) return;
+
+  container.innerHTML = alerts
+    .map(a => `<div class="alert-item alert-${a.type}">${a.message}</div>`)
+    .join("");
 }
 
 // ============ CHARTS ============
@@ -97,7 +90,7 @@ function drawProgressChart(timeline) {
   
   const ctx = canvas.getContext("2d");
   const labels = (timeline || []).map(p => p.date);
-  const values = (timeline || []).map(p => p.completed);
+  const values = (timeline || []).map(p => p.cumulative ?? p.completed);
 
   progressChartInstance = new Chart(ctx, {
     type: "line",
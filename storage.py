@@ -0,0 +1,132 @@
+"""
+SQLite settings for concurrent use
+
+STORAGE_MODE=production tunes the SQLAlchemy engine for several threads
+and worker processes sharing one SQLite file:
+
+  journal_mode=WAL      readers no longer block the writer, or the writer them
+  synchronous=NORMAL    in WAL mode, fsync at checkpoints instead of every
+                        commit; a power loss can drop the last commits but
+                        never corrupts the database
+  busy_timeout          wait SQLITE_BUSY_TIMEOUT_MS for a lock instead of
+                        failing with "database is locked"
+  cache_size / mmap     a larger page cache (SQLITE_CACHE_MB) and memory-mapped reads
+  temp_store=MEMORY     sorts and temporary indexes stay off disk
+
+Transactions are begun here rather than by the sqlite3 module, which
+otherwise skips BEGIN before SAVEPOINT and breaks nested transactions (see
+group_commit.py). In POST/PUT/DELETE requests, and inside
+immediate_transactions(), they begin with BEGIN IMMEDIATE, taking the
+write lock up front where busy_timeout applies: in WAL mode a deferred
+transaction that reads and then writes fails at once if another
+connection committed in between. Code that reads, does slow work (such as
+calling Gemini) and then writes should therefore end its read transaction
+first, so it does not hold the write lock while waiting. Everything else
+(GET requests, CLI commands, migrations) keeps the deferred BEGIN.
+
+STORAGE_MODE=default (the default) leaves the engine as SQLAlchemy creates it.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from flask import has_request_context, request
+from sqlalchemy import event
+
+READ_ONLY_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_local = threading.local()
+
+
+def storage_mode():
+    mode = os.getenv("STORAGE_MODE", "default").lower()
+    if mode not in ("default", "production"):
+        raise ValueError(f"Unknown STORAGE_MODE '{mode}' (expected 'default' or 'production')")
+    return mode
+
+
+def sqlite_pragmas():
+    """PRAGMA statements run on every new connection in production mode"""
+    busy_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    cache_mb = int(os.getenv("SQLITE_CACHE_MB", "64"))
+    return (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={busy_ms}",
+        f"PRAGMA cache_size=-{cache_mb * 1024}",
+        f"PRAGMA mmap_size={cache_mb * 4 * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    )
+
+
+def configure_storage(app):
+    """
+    Set engine options for production mode; call before db.init_app(app)
+
+    Returns True when production settings apply and install_sqlite_hooks()
+    should be called once the engine exists.
+    """
+    if storage_mode() != "production" or not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        return False
+
+    busy_seconds = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")) / 1000
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "connect_args": {"timeout": busy_seconds, "check_same_thread": False},
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_POOL_OVERFLOW", "20")),
+        "pool_timeout": busy_seconds,
+    }
+    return True
+
+
+@contextmanager
+def immediate_transactions():
+    """Begin this thread's transactions with BEGIN IMMEDIATE inside the block"""
+    previous = getattr(_local, "immediate", False)
+    _local.immediate = True
+    try:
+        yield
+    finally:
+        _local.immediate = previous
+
+
+def _begin_statement():
+    if getattr(_local, "immediate", False):
+        return "BEGIN IMMEDIATE"
+    if has_request_context() and request.method not in READ_ONLY_METHODS:
+        return "BEGIN IMMEDIATE"
+    return "BEGIN"
+
+
+def install_sqlite_hooks(engine):
+    """Apply the pragmas to each new connection and take over BEGIN"""
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Stop the sqlite3 module from issuing its own BEGIN, see on_begin
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def on_begin(connection):
+        connection.exec_driver_sql(_begin_statement())
+
+
+def storage_status(engine):
+    """Current journal mode, synchronous level and pool usage for the admin stats"""
+    with engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+        synchronous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+    status = {
+        "mode": storage_mode(),
+        "journal_mode": journal_mode,
+        "synchronous": {0: "off", 1: "normal", 2: "full", 3: "extra"}.get(synchronous, synchronous),
+    }
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        status["pool"] = {"size": pool.size(), "checked_out": pool.checkedout(), "overflow": pool.overflow()}
+    return status
@@ -0,0 +1,161 @@
+import json
+
+ARRAY_SECTIONS = ("key_concepts", "real_world_examples", "best_practices", "quiz")
+
+
+class ModuleStreamParser:
+    """
+    Incremental parser for a training module JSON document
+
+    Feed it text chunks as they arrive from the model. Every time a top-level
+    field (title, introduction) or one item of a top-level array (a key
+    concept, an example, a quiz question...) is complete, feed() returns it
+    as an event dict:
+
+        {"section": "title", "value": "..."}
+        {"section": "quiz", "index": 0, "value": {...}}
+
+    Anything before the opening brace (such as a markdown code fence) is
+    ignored. Once the closing brace arrives, result() returns the full
+    document parsed with json.loads.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._start = None
+        self._end = None
+        self._key = None
+        self._expect_key = False
+        self._value_start = None
+        self._index = 0
+
+    @property
+    def done(self):
+        return self._end is not None
+
+    def feed(self, chunk):
+        self._text += chunk
+        events = []
+        text = self._text
+        i = self._pos
+
+        while i < len(text) and not self.done:
+            ch = text[i]
+            depth = len(self._stack)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if depth == 1:
+                        self._end_top_level_string(i, events)
+                i += 1
+                continue
+
+            if depth == 0:
+                # Skip preamble until the document starts
+                if ch == "{":
+                    self._stack.append("{")
+                    self._start = i
+                    self._expect_key = True
+                i += 1
+                continue
+
+            in_array = depth == 2 and self._stack[-1] == "["
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if in_array and self._value_start is None:
+                    self._value_start = i
+            elif ch in "{[":
+                # Top-level arrays are reported item by item, not as a whole
+                if (depth == 1 and ch == "{" or in_array) and self._value_start is None:
+                    self._value_start = i
+                self._stack.append(ch)
+            elif ch in "}]":
+                self._stack.pop()
+                depth = len(self._stack)
+                if depth == 0:
+                    self._flush_scalar(i, events)
+                    self._end = i
+                elif depth == 1 and ch == "]":
+                    self._flush_item(i, events)
+                    self._value_start = None
+                elif depth == 1 and ch == "}":
+                    self._emit(events, json.loads(text[self._value_start:i + 1]))
+                    self._value_start = None
+            elif ch == ",":
+                if depth == 1:
+                    self._flush_scalar(i, events)
+                    self._expect_key = True
+                elif in_array:
+                    self._flush_item(i, events)
+            elif ch == ":" and depth == 1:
+                self._value_start = None
+            elif not ch.isspace():
+                if (depth == 1 and not self._expect_key or in_array) and self._value_start is None:
+                    self._value_start = i
+            i += 1
+
+        self._pos = i
+        return events
+
+    def result(self):
+        """Return the complete document, raising ValueError if it isn't finished"""
+        if not self.done:
+            raise ValueError("Module JSON is incomplete")
+        return json.loads(self._text[self._start:self._end + 1])
+
+    # ----- helpers -----
+
+    def _end_top_level_string(self, i, events):
+        value = json.loads(self._text[self._string_start:i + 1])
+        if self._expect_key:
+            self._key = value
+            self._expect_key = False
+            self._index = 0
+        else:
+            self._emit(events, value)
+            self._value_start = None
+
+    def _flush_scalar(self, i, events):
+        # Numbers and literals at the top level end at the next ',' or '}'
+        if self._value_start is not None and self._key is not None:
+            raw = self._text[self._value_start:i].strip()
+            if raw:
+                self._emit(events, json.loads(raw))
+        self._value_start = None
+
+    def _flush_item(self, i, events):
+        if self._value_start is not None:
+            raw = self._text[self._value_start:i].strip()
+            if raw:
+                events.append({
+                    "section": self._key,
+                    "index": self._index,
+                    "value": json.loads(raw),
+                })
+                self._index += 1
+        self._value_start = None
+
+    def _emit(self, events, value):
+        events.append({"section": self._key, "value": value})
+
+
+def iter_sections(content):
+    """Split a complete module into the same events ModuleStreamParser emits"""
+    for key, value in content.items():
+        if key in ARRAY_SECTIONS and isinstance(value, list):
+            for index, item in enumerate(value):
+                yield {"section": key, "index": index, "value": item}
+        else:
+            yield {"section": key, "value": value}
@@ -0,0 +1,355 @@
+"""
+In-process metrics, timing spans and structured logging
+
+Metrics: Counter and Histogram keep one series per label set, like their
+Prometheus counterparts; histograms keep cumulative bucket counts, so an
+observation costs a lock and a few additions. Values that already live
+elsewhere (cache statistics, queue depth) are read at scrape time by
+collectors registered with register_collector(). render_prometheus()
+produces the text exposition format for /metrics.
+
+Spans: `with span("db_commit"):` records the block's duration in the
+cyberbridge_span_seconds histogram and in the current request's trace,
+which is logged with the request.
+
+Logging: loggers from get_logger() write one line per event, as JSON
+(LOG_FORMAT=json, default) or key=value text, at LOG_LEVEL (default INFO).
+Records below WARNING are kept with probability LOG_SAMPLE_RATE (default
+1.0). Formatting and writing happen on a background thread, so request
+threads only enqueue records.
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import atexit
+import bisect
+import random
+import logging
+import threading
+import logging.handlers
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Seconds; suits calls that take from tens of milliseconds to a minute
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# Seconds; suits HTTP requests and the steps inside them
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_metrics = []
+_collectors = []
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing count, one series per label set"""
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+        self._values = {}
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {key: value for key, value in self._values.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Bucketed distribution of observed values, one series per label set"""
+
+    def __init__(self, name, description, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            series["counts"][index] += 1
+            series["sum"] += value
+
+    def _quantile(self, counts, total, q):
+        """Upper bound of the bucket holding the q-quantile (None past the last bucket)"""
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def _series_snapshot(self):
+        with self._lock:
+            return sorted((key, list(s["counts"]), s["sum"]) for key, s in self._series.items())
+
+    def snapshot(self):
+        """List of series with labels, count, sum, cumulative buckets and p50/p95/p99"""
+        result = []
+        for key, counts, total_sum in self._series_snapshot():
+            total = sum(counts)
+            cumulative, running = {}, 0
+            for bound, count in zip(self.buckets, counts):
+                running += count
+                cumulative[str(bound)] = running
+            cumulative["+Inf"] = total
+            result.append({
+                "labels": dict(key),
+                "count": total,
+                "sum": round(total_sum, 6),
+                "buckets": cumulative,
+                "p50": self._quantile(counts, total, 0.50),
+                "p95": self._quantile(counts, total, 0.95),
+                "p99": self._quantile(counts, total, 0.99),
+            })
+        return result
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, counts, total_sum in self._series_snapshot():
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                labels = _format_labels(key + (("le", _format_value(float(bound))),))
+                lines.append(f"{self.name}_bucket{labels} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {running}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def register_collector(collect):
+    """
+    Add metrics computed at scrape time
+
+    collect() returns a list of (name, type, description, samples), where
+    type is "counter" or "gauge" and samples is a list of (labels, value).
+    """
+    _collectors.append(collect)
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        for name, kind, description, samples in collect():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(_label_key(labels))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ===== SPANS =====
+
+span_seconds = Histogram(
+    "cyberbridge_span_seconds", "Duration of instrumented steps inside requests", REQUEST_BUCKETS
+)
+
+_trace = threading.local()
+
+
+def start_trace():
+    """Begin collecting spans for the current request"""
+    _trace.spans = []
+
+
+def finish_trace():
+    """Stop collecting and return {span name: milliseconds} for the current request"""
+    spans = getattr(_trace, "spans", None)
+    _trace.spans = None
+    if not spans:
+        return {}
+    totals = {}
+    for name, ms in spans:
+        totals[name] = round(totals.get(name, 0.0) + ms, 3)
+    return totals
+
+
+@contextmanager
+def span(name):
+    """Time a block into cyberbridge_span_seconds{span=name} and the request trace"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        span_seconds.observe(elapsed, span=name)
+        spans = getattr(_trace, "spans", None)
+        if spans is not None:
+            spans.append((name, elapsed * 1000))
+
+
+# ===== LOGGING =====
+
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event and any extra fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines: time level logger event key=value ..."""
+
+    def format(self, record):
+        stamp = datetime.fromtimestamp(record.created).strftime("%H:%M:%S.%f")[:-3]
+        fields = " ".join(f"{key}={json.dumps(value, default=str)}" for key, value in _fields(record).items())
+        line = f"{stamp} {record.levelname:<7} {record.name} {record.getMessage()} {fields}".rstrip()
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Keep records below WARNING with probability rate; always keep the rest"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a listener thread that formats and writes them
+
+    The thread starts with the first record, and again in a forked child,
+    so importing the app never starts threads.
+    """
+
+    def __init__(self, target):
+        super().__init__(queue.SimpleQueue())
+        self.target = target
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self.queue = queue.SimpleQueue()
+                self._listener = logging.handlers.QueueListener(self.queue, self.target)
+                self._listener.start()
+                self._pid = os.getpid()
+                atexit.register(self._listener.stop)
+
+    def prepare(self, record):
+        # Keep extra fields; render the message and traceback now, while
+        # the arguments are still valid
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        super().enqueue(record)
+
+
+_logging_configured = False
+_logging_lock = threading.Lock()
+
+
+def configure_logging(level=None, fmt=None, sample_rate=None, stream=None):
+    """Set up the "cyberbridge" logger (defaults come from LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE)"""
+    global _logging_configured
+
+    with _logging_lock:
+        logger = logging.getLogger("cyberbridge")
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+
+        target = logging.StreamHandler(stream or sys.stderr)
+        fmt = (fmt or os.getenv("LOG_FORMAT", "json")).lower()
+        target.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+
+        handler = BackgroundHandler(target)
+        handler.addFilter(SamplingFilter(
+            float(sample_rate if sample_rate is not None else os.getenv("LOG_SAMPLE_RATE", "1"))
+        ))
+        logger.addHandler(handler)
+        logger.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+        logger.propagate = False
+        _logging_configured = True
+    return logger
+
+
+def get_logger(name):
+    """Logger under "cyberbridge", configured from the environment on first use"""
+    if not _logging_configured:
+        configure_logging()
+    return logging.getLogger(f"cyberbridge.{name}")
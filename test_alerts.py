@@ -0,0 +1,47 @@
+"""Dashboard alerts come from the user's own sessions and follow them as they change"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from alerts import build_facts, evaluate
+
+CATALOG = ["Phishing Awareness", "Password Security"]
+
+
+def row(id, module_name, status, score=None, started_days_ago=0, now=datetime(2026, 1, 31)):
+    return SimpleNamespace(id=id, module_name=module_name, completion_status=status, quiz_score=score,
+                           started_at=now - timedelta(days=started_days_ago))
+
+
+def rules(sessions, registered_days_ago=1, now=datetime(2026, 1, 31)):
+    facts = build_facts(sessions, CATALOG, now - timedelta(days=registered_days_ago), now)
+    return [alert["rule"] for alert in evaluate(facts)]
+
+
+def test_rules_follow_session_state():
+    assert rules([]) == ["next_module"]
+    assert rules([row(1, "Phishing Awareness", "completed", 55)]) == ["low_scores", "next_module", "progress"]
+    assert rules([row(1, "Phishing Awareness", "in_progress", started_days_ago=9)]) == ["stale_sessions", "next_module"]
+    assert rules([], registered_days_ago=30) == ["overdue_modules"]
+
+
+def test_latest_session_of_a_module_wins():
+    sessions = [row(1, "Phishing Awareness", "completed", 40), row(2, "Phishing Awareness", "completed", 90),
+                row(3, "Password Security", "completed", 85)]
+    assert rules(sessions) == ["progress"]
+
+
+def test_dashboard_alerts_change_with_the_users_sessions(client, make_user, admin_headers):
+    user = make_user()
+    session_id = client.post(
+        "/api/training/start", json={"user_id": user.id, "module_name": "Phishing Awareness"}
+    ).get_json()["session_id"]
+
+    def dashboard_rules():
+        return [alert["rule"] for alert in client.get(f"/api/dashboard/{user.id}").get_json()["alerts"]]
+
+    client.post("/api/training/complete", json={"session_id": session_id, "quiz_score": 50}, headers=admin_headers)
+    assert "low_scores" in dashboard_rules()
+
+    client.post("/api/training/complete", json={"session_id": session_id, "quiz_score": 95}, headers=admin_headers)
+    assert "low_scores" not in dashboard_rules()
@@ -0,0 +1,106 @@
+"""Bulk user import: row validation, per-row error reports and duplicate handling"""
+
+import io
+import json
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import bulk_import
+from bulk_import import import_users, iter_rows, validate_row
+from models import db, User
+
+
+def post_csv(client, headers, text, **params):
+    return client.post("/api/users/bulk", query_string={"format": "csv", **params}, data=text, headers=headers)
+
+
+def emails():
+    return sorted(db.session.execute(db.select(User.email)).scalars())
+
+
+@pytest.mark.parametrize("row, error", [
+    ({"organization": "Acme"}, "email is required"),
+    ({"email": "   "}, "email is required"),
+    ({"email": "not-an-email"}, "email is not valid"),
+    ({"email": "a b@acme.com"}, "email is not valid"),
+    ({"email": "a@acme.com", "organization": "x" * 201}, "organization is longer than 200 characters"),
+])
+def test_invalid_rows(row, error):
+    assert validate_row(row) == (None, error)
+
+
+def test_valid_row_is_trimmed_normalized_and_defaulted():
+    clean, error = validate_row({"email": "  Alice@Acme.COM ", "organization": " Acme ", "role": ""})
+    assert error is None
+    assert clean == {"email": "alice@acme.com", "organization": "Acme", "industry": "General", "role": "Employee"}
+
+
+def test_csv_import_reports_bad_rows_and_keeps_going(client, admin_headers):
+    text = (
+        "email,organization,industry,role\n"
+        "alice@acme.com,Acme,Finance,Analyst\n"
+        "not-an-email,Acme,,\n"
+        "ALICE@acme.com,Acme,,\n"
+        ",Acme,,\n"
+        "bob@acme.com,,,\n"
+    )
+    report = post_csv(client, admin_headers, text, batch_size=2).get_json()
+
+    assert (report["processed"], report["inserted"], report["failed"]) == (5, 2, 3)
+    assert [(error["row"], error["error"]) for error in report["errors"]] == [
+        (3, "email is not valid"),
+        (4, "duplicate of row 2"),
+        (5, "email is required"),
+    ]
+    assert emails() == ["alice@acme.com", "bob@acme.com"]
+    bob = db.session.execute(db.select(User).where(User.email == "bob@acme.com")).scalar_one()
+    assert (bob.organization, bob.industry, bob.role) == ("Demo Org", "General", "Employee")
+
+
+def test_jsonl_import_reports_unparseable_lines(client, admin_headers):
+    lines = [json.dumps({"email": "carol@acme.com"}), "{not json", "[1, 2]", "", json.dumps({"email": "dan@acme.com"})]
+    response = client.post("/api/users/bulk", data="\n".join(lines), headers=admin_headers,
+                           content_type="application/x-ndjson")
+    report = response.get_json()
+
+    assert (report["inserted"], report["failed"]) == (2, 2)
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert report["errors"][1]["error"] == "expected a JSON object"
+
+
+def test_existing_users_are_skipped_or_updated(client, admin_headers):
+    client.post("/api/user/register", json={"email": "Erin@Acme.com", "organization": "Acme"})
+
+    skipped = post_csv(client, admin_headers, "email,organization\nerin@acme.com,Globex\n").get_json()
+    assert (skipped["inserted"], skipped["skipped"]) == (0, 1)
+
+    updated = post_csv(client, admin_headers, "email,organization\nERIN@acme.com,Globex\n",
+                       on_duplicate="update").get_json()
+    assert updated["updated"] == 1
+    assert emails() == ["erin@acme.com"]
+    assert db.session.execute(db.select(User.organization)).scalar_one() == "Globex"
+
+
+def test_conflicting_batch_falls_back_to_per_row_errors(app, monkeypatch):
+    record = bulk_import.record_users_created
+
+    def fail_for_bad_org(counts):
+        if any(organization == "Bad" for organization, _ in counts):
+            raise IntegrityError("INSERT INTO user", {}, Exception("constraint failed"))
+        record(counts)
+
+    monkeypatch.setattr(bulk_import, "record_users_created", fail_for_bad_org)
+    rows = iter_rows(io.StringIO("email,organization\na@x.com,A\nb@x.com,Bad\nc@x.com,C\n"), "csv")
+    report = import_users(rows)
+
+    assert (report["inserted"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["row"] == 3 and report["errors"][0]["email"] == "b@x.com"
+    assert emails() == ["a@x.com", "c@x.com"]
+
+
+def test_endpoint_checks_token_and_options(client, admin_headers):
+    assert post_csv(client, {}, "email\na@x.com\n").status_code == 403
+    assert client.post("/api/users/bulk?format=xml", data="", headers=admin_headers).status_code == 400
+    assert post_csv(client, admin_headers, "email\na@x.com\n", on_duplicate="merge").status_code == 400
+    assert emails() == []
@@ -1,14 +1,18 @@
 #!/usr/bin/env python
 """Test script for CyberBridge API endpoints"""
 
-from app import app, db, User, TrainingSession
+from app import create_app, db, User, TrainingSession
+from content_store import store_document
+from migrations import upgrade_database
 from datetime import datetime
 import json
 
+app = create_app()
+
 # Create app context
 with app.app_context():
     # Initialize database
-    db.create_all()
+    upgrade_database()
     
     # Seed demo data
     TrainingSession.query.delete()
@@ -36,7 +40,7 @@ with app.app_context():
         session = TrainingSession(
             user_id=user.id,
             module_name=module_name,
-            content=json.dumps({
+            document_id=store_document({
                 "title": module_name,
                 "introduction": f"Training module on {module_name}",
                 "key_concepts": [],
@@ -71,7 +75,7 @@ with app.app_context():
     print("\n" + "="*50)
     print("TEST 2: Dashboard Alerts")
     print("="*50)
-    response = client.get('/api/dashboard/alerts')
+    response = client.get(f'/api/dashboard/alerts?user_id={user.id}')
     alerts = response.get_json()
     print(json.dumps(alerts, indent=2, default=str))
     
@@ -0,0 +1,171 @@
+"""Quiz answers stay on the server: stripped from every response, graded from the answer key"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from content_store import store_document
+from grading import extract_answer_key, grade_answers, public_content
+from models import db, TrainingSession, QuizQuestion
+
+MODULE = {
+    "title": "Phishing Awareness",
+    "introduction": "Why phishing matters.",
+    "key_concepts": [{"concept": "Red flags", "explanation": "Urgency, odd senders, odd links."}],
+    "real_world_examples": ["A fake invoice from a known supplier"],
+    "best_practices": ["Report suspicious email"],
+    "quiz": [
+        {"question": "First?", "options": ["a", "b", "c"], "correct": "b"},
+        {"question": "Second?", "options": ["x", "y"], "correct": "x"},
+        {"question": "Third?", "options": ["yes", "no"], "correct": "no"},
+    ],
+}
+
+
+def assert_no_answers(quiz):
+    assert quiz
+    for question in quiz:
+        assert "correct" not in question
+        assert set(question) <= {"id", "question", "options"}
+
+
+def sse_events(response):
+    events = []
+    for message in response.get_data(as_text=True).strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def session_id(make_user):
+    user = make_user()
+    session = TrainingSession(
+        user_id=user.id,
+        module_name=MODULE["title"],
+        document_id=store_document(MODULE, topic=MODULE["title"]),
+        completion_status="in_progress",
+        started_at=datetime.utcnow(),
+    )
+    db.session.add(session)
+    db.session.commit()
+    return session.id
+
+
+# ===== ANSWER STRIPPING =====
+
+def test_public_content_drops_answers_without_touching_the_original():
+    public = public_content(MODULE)
+    assert_no_answers(public["quiz"])
+    assert public["key_concepts"] == MODULE["key_concepts"]
+    assert all("correct" in question for question in MODULE["quiz"])
+
+
+def test_started_and_fetched_sessions_have_no_answers(client, make_user):
+    user = make_user()
+    started = client.post("/api/training/start", json={"user_id": user.id, "module_name": "Phishing Awareness"})
+    assert started.status_code == 201
+    body = started.get_json()
+    assert_no_answers(body["content"]["quiz"])
+
+    fetched = client.get(f"/api/training/sessions/{body['session_id']}").get_json()
+    assert_no_answers(fetched["content"]["quiz"])
+
+
+def test_streamed_and_replayed_sections_have_no_answers(client, make_user):
+    user = make_user()
+    started = client.post("/api/training/stream", json={"user_id": user.id, "module_name": "Password Security"})
+    assert started.status_code == 201
+    stream_url = started.get_json()["stream_url"]
+
+    for source in ("fallback", "stored"):  # generated, then replayed
+        events = sse_events(client.get(stream_url))
+        assert events[-1] == ("done", {"session_id": started.get_json()["session_id"], "source": source})
+        quiz = [data["value"] for event, data in events if event == "section" and data["section"] == "quiz"]
+        assert_no_answers(quiz)
+
+
+def test_assembled_quiz_has_no_answers(client, session_id):
+    response = client.get("/api/quiz/assemble", query_string={"module_name": "Phishing Awareness", "count": 3})
+    assert response.status_code == 200
+    assert_no_answers(response.get_json()["quiz"])
+
+
+# ===== SESSION GRADING =====
+
+def test_answer_key_is_option_indexes():
+    assert extract_answer_key(MODULE) == [1, 0, 1]
+
+
+@pytest.mark.parametrize("answers, correct, results", [
+    ([1, 0, 1], 3, [True, True, True]),
+    ([0, 1, 0], 0, [False, False, False]),
+    ({"0": 1, "2": 1}, 2, [True, False, True]),  # question 1 unanswered
+    ([], 0, [False, False, False]),
+    ([1, 7, -1], 1, [True, False, False]),  # options out of range
+    ([True, 0, "1"], 1, [False, True, False]),  # only integers count
+])
+def test_grade_answers(answers, correct, results):
+    graded = grade_answers((1, 0, 1), answers)
+    assert graded["correct"] == correct
+    assert graded["total"] == 3
+    assert graded["score"] == round(correct / 3 * 100)
+    assert graded["results"] == results
+
+
+@pytest.mark.parametrize("answers", ["1,0,1", 3, None, {"first": 1}])
+def test_grade_answers_rejects_malformed_answers(answers):
+    with pytest.raises(ValueError):
+        grade_answers((1, 0, 1), answers)
+
+
+def test_grade_endpoint_scores_on_the_server(client, session_id):
+    response = client.post("/api/training/grade", json={"session_id": session_id, "answers": [1, 1, 1]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["correct"], body["total"], body["score"]) == (2, 3, 67)
+    assert body["results"] == [True, False, True]
+
+    session = db.session.get(TrainingSession, session_id)
+    assert (session.completion_status, session.quiz_score) == ("completed", 67)
+
+
+def test_grade_endpoint_rejects_bad_requests(client, session_id):
+    assert client.post("/api/training/grade", json={"session_id": session_id}).status_code == 400
+    assert client.post("/api/training/grade", json={"session_id": session_id, "answers": "b"}).status_code == 400
+    assert client.post("/api/training/grade", json={"session_id": 999, "answers": []}).status_code == 404
+    assert db.session.get(TrainingSession, session_id).completion_status == "in_progress"
+
+
+def test_complete_requires_admin_and_a_valid_score(client, session_id, admin_headers):
+    payload = {"session_id": session_id, "quiz_score": 90}
+    assert client.post("/api/training/complete", json=payload).status_code == 403
+    for score in (150, -5, None, "90", True):
+        response = client.post("/api/training/complete", json={**payload, "quiz_score": score}, headers=admin_headers)
+        assert response.status_code == 400
+    assert client.post("/api/training/complete", json=payload, headers=admin_headers).status_code == 200
+
+
+# ===== QUESTION BANK GRADING =====
+
+def test_banked_quiz_grading(client, session_id):
+    correct = dict(db.session.execute(db.select(QuizQuestion.question, QuizQuestion.correct)).all())
+    quiz = client.get("/api/quiz/assemble", query_string={"module_name": "Phishing Awareness", "count": 3})
+    quiz = quiz.get_json()["quiz"]
+
+    answers = {str(question["id"]): correct[question["question"]] for question in quiz}
+    wrong = next(question for question in quiz if question["question"] == "First?")
+    answers[str(wrong["id"])] = "a"
+
+    response = client.post("/api/quiz/grade", json={"module_name": "Phishing Awareness", "answers": answers})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["correct"], body["total"], body["score"]) == (2, 3, 67)
+    assert body["results"][str(wrong["id"])] is False
+
+
+@pytest.mark.parametrize("answers", [{}, [1, 2], {"abc": "a"}, {"9999": "a"}])
+def test_banked_quiz_grading_rejects_bad_answers(client, session_id, answers):
+    response = client.post("/api/quiz/grade", json={"module_name": "Phishing Awareness", "answers": answers})
+    assert response.status_code == 400
@@ -0,0 +1,214 @@
+"""Circuit breaker, retry deadline and single-flight tests against FakeProvider"""
+
+import threading
+import time
+
+import pytest
+
+from providers import FakeProvider, ProviderError
+from resilience import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, DeadlineExceeded, call_with_retries,
+)
+from singleflight import SingleFlight
+
+PROMPT = "Topic: Phishing\n"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def failing_provider():
+    return FakeProvider(latency=(0.0, 0.0), failure_rate=1.0, seed=1)
+
+
+def healthy_provider(latency=0.0):
+    return FakeProvider(latency=(latency, latency), failure_rate=0.0, seed=1)
+
+
+def make_breaker(clock, **overrides):
+    options = {"failure_threshold": 0.5, "min_calls": 3, "window": 10, "open_seconds": 30.0}
+    options.update(overrides)
+    return CircuitBreaker("test", clock=clock, **options)
+
+
+def call(provider, breaker, **overrides):
+    options = {"attempt_timeout": 1.0, "deadline": 2.0, "retries": 0, "base_delay": 0.0}
+    options.update(overrides)
+    return call_with_retries(lambda timeout: provider.generate(PROMPT, timeout), breaker, **options)
+
+
+def test_breaker_opens_after_min_calls_failures():
+    breaker = make_breaker(FakeClock())
+    provider = failing_provider()
+
+    for _ in range(2):
+        with pytest.raises(ProviderError):
+            call(provider, breaker)
+        assert breaker.state == CLOSED
+
+    with pytest.raises(ProviderError):
+        call(provider, breaker)
+    assert breaker.state == OPEN
+
+    # Refused without reaching the provider
+    with pytest.raises(CircuitOpenError):
+        call(provider, breaker)
+    assert provider.calls == 3
+    assert breaker.stats()["trips"] == 1
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_half_open_lets_one_probe_through():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker.force(OPEN)
+    assert not breaker.allow()
+
+    clock.now += 30.0
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    # A second caller is refused while the probe is in flight
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker.force(OPEN)
+    clock.now += 30.0
+    provider = failing_provider()
+
+    with pytest.raises(ProviderError):
+        call(provider, breaker)
+    assert breaker.state == OPEN
+    assert provider.calls == 1
+
+    clock.now += 29.0
+    with pytest.raises(CircuitOpenError):
+        call(provider, breaker)
+    assert provider.calls == 1
+
+
+def test_cancelled_probe_frees_its_slot():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker.force(OPEN)
+    clock.now += 30.0
+
+    assert breaker.allow()
+    breaker.record_cancelled()
+    assert breaker.allow()
+
+
+def test_half_open_probe_through_provider_closes_breaker():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker.force(OPEN)
+    clock.now += 30.0
+
+    assert '"title": "Phishing"' in call(healthy_provider(), breaker)
+    assert breaker.state == CLOSED
+
+
+def test_retries_stop_at_deadline():
+    # Every attempt times out; without the deadline five retries would take over a second
+    provider = healthy_provider(latency=0.5)
+    breaker = make_breaker(time.monotonic, min_calls=100)
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        call(provider, breaker, attempt_timeout=0.1, deadline=0.25, retries=5, base_delay=0.01, max_delay=0.01)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.4
+    assert 2 <= provider.calls <= 3
+
+
+def test_attempt_gets_only_the_remaining_time():
+    timeouts = []
+    provider = healthy_provider(latency=0.5)
+
+    def attempt(timeout):
+        timeouts.append(timeout)
+        return provider.generate(PROMPT, timeout)
+
+    breaker = make_breaker(time.monotonic, min_calls=100)
+    with pytest.raises(DeadlineExceeded):
+        call_with_retries(attempt, breaker, attempt_timeout=0.2, deadline=0.3, retries=3,
+                          base_delay=0.0, max_delay=0.0)
+
+    assert timeouts[0] == pytest.approx(0.2)
+    assert timeouts[1] < 0.11
+    assert sum(timeouts) <= 0.3 + 0.01
+
+
+def test_non_retryable_error_is_not_retried():
+    provider = failing_provider()
+    breaker = make_breaker(time.monotonic, min_calls=100)
+
+    with pytest.raises(ProviderError):
+        call(provider, breaker, retries=3, retry_on=(DeadlineExceeded,))
+    assert provider.calls == 1
+
+
+def test_stream_wait_never_sleeps_a_negative_time():
+    provider = healthy_provider()
+    provider._wait(-0.5, 1.0)
+    with pytest.raises(DeadlineExceeded):
+        provider._wait(0.1, -0.5)
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    provider = healthy_provider(latency=0.2)
+    breaker = make_breaker(time.monotonic)
+    flights = SingleFlight()
+    results = []
+    start = threading.Barrier(5)
+
+    def worker():
+        start.wait()
+        results.append(flights.do(("Phishing", "IT Manager"), call, provider, breaker))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert provider.calls == 1
+    assert len(results) == 5 and len(set(results)) == 1
+    assert flights.stats()["calls_saved"] == 4
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_single_flight_shares_the_leaders_error():
+    provider = FakeProvider(latency=(0.2, 0.2), failure_rate=1.0, seed=1)
+    breaker = make_breaker(time.monotonic, min_calls=100)
+    flights = SingleFlight()
+    errors = []
+    start = threading.Barrier(3)
+
+    def worker():
+        start.wait()
+        try:
+            flights.do("Phishing", call, provider, breaker)
+        except ProviderError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert provider.calls == 1
+    assert len(errors) == 3
@@ -0,0 +1,76 @@
+"""Organization rollups stay equal to a full recompute through every write path"""
+
+from models import db, OrgStats
+from rollups import org_dashboard, rebuild_rollups
+
+
+def register(client, email, organization, industry="Finance"):
+    response = client.post("/api/user/register", json={
+        "email": email, "organization": organization, "industry": industry, "role": "Employee",
+    })
+    assert response.status_code == 201
+    return response.get_json()["user_id"]
+
+
+def start(client, user_id, module_name):
+    response = client.post("/api/training/start", json={"user_id": user_id, "module_name": module_name})
+    assert response.status_code == 201
+    return response.get_json()["session_id"]
+
+
+def test_write_paths_leave_no_drift(client, admin_headers):
+    alice = register(client, "alice@acme.com", "Acme")
+    bob = register(client, "bob@acme.com", "Acme", industry="Retail")
+    imported = client.post(
+        "/api/users/bulk?format=csv",
+        data="email,organization,industry\ncarol@acme.com,Acme,Finance\ndan@globex.com,Globex,Energy\n",
+        headers=admin_headers,
+    )
+    assert imported.get_json()["inserted"] == 2
+
+    graded = start(client, alice, "Phishing Awareness")
+    assert client.post("/api/training/grade", json={"session_id": graded, "answers": [1, 1, 1]}).status_code == 200
+    # Re-submitting replaces the score instead of counting a second completion
+    assert client.post("/api/training/grade", json={"session_id": graded, "answers": [0, 0, 0]}).status_code == 200
+
+    completed = start(client, bob, "Password Security")
+    response = client.post("/api/training/complete", json={"session_id": completed, "quiz_score": 80},
+                           headers=admin_headers)
+    assert response.status_code == 200
+    start(client, bob, "Phishing Awareness")
+
+    assert rebuild_rollups(check_only=True) == []
+
+    acme = org_dashboard("Acme")
+    assert acme["users"] == 3
+    assert (acme["kpis"]["sessions_started"], acme["kpis"]["sessions_completed"]) == (3, 2)
+
+
+def test_import_that_moves_users_rebuilds_rollups(client, admin_headers):
+    user_id = register(client, "erin@acme.com", "Acme")
+    start(client, user_id, "Phishing Awareness")
+
+    moved = client.post(
+        "/api/users/bulk?format=csv&on_duplicate=update",
+        data="email,organization,industry\nERIN@acme.com,Globex,Energy\n",
+        headers=admin_headers,
+    )
+    assert moved.get_json()["updated"] == 1
+
+    assert rebuild_rollups(check_only=True) == []
+    assert org_dashboard("Acme")["kpis"]["sessions_started"] == 0
+    assert org_dashboard("Globex")["kpis"]["sessions_started"] == 1
+
+
+def test_rebuild_reports_and_repairs_drift(client):
+    register(client, "frank@acme.com", "Acme")
+    db.session.execute(db.update(OrgStats).values(user_count=OrgStats.user_count + 5))
+    db.session.commit()
+
+    drift = rebuild_rollups(check_only=True)
+    assert len(drift) == 1 and drift[0].startswith("org_stats ('Acme', 'Finance')")
+
+    assert rebuild_rollups() == drift
+    db.session.commit()
+    assert rebuild_rollups(check_only=True) == []
+    assert org_dashboard("Acme")["users"] == 1
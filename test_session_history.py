@@ -0,0 +1,109 @@
+"""Keyset-paginated session listings"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, TrainingSession
+from session_history import encode_cursor
+
+MODULES = ["Phishing Awareness", "Password Security", "Ransomware Prevention"]
+
+
+@pytest.fixture
+def users(make_user):
+    alice = make_user("alice@acme.com", organization="Acme")
+    bob = make_user("bob@acme.com", organization="Acme")
+    carol = make_user("carol@globex.com", organization="Globex")
+    first_day = datetime(2026, 3, 1, 9)
+    db.session.execute(db.insert(TrainingSession), [
+        {
+            "user_id": (alice.id, bob.id, carol.id)[i % 3],
+            "module_name": MODULES[i % len(MODULES)],
+            "completion_status": "completed" if i % 2 else "in_progress",
+            "quiz_score": 80 if i % 2 else None,
+            "started_at": first_day + timedelta(days=i),
+        }
+        for i in range(30)
+    ])
+    db.session.commit()
+    return alice, bob, carol
+
+
+def all_pages(client, url, headers=None, **params):
+    ids, cursor = [], None
+    while True:
+        response = client.get(url, query_string={**params, "cursor": cursor} if cursor else params, headers=headers)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page["sessions"]) <= params.get("limit", 50)
+        ids.extend(session["id"] for session in page["sessions"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, page
+
+
+def expected_ids(*where):
+    return list(db.session.execute(
+        db.select(TrainingSession.id).where(*where).order_by(TrainingSession.id.desc())
+    ).scalars())
+
+
+def test_user_history_pages_cover_every_session_once(client, users):
+    alice = users[0]
+    ids, last_page = all_pages(client, f"/api/users/{alice.id}/sessions", limit=3)
+    assert ids == expected_ids(TrainingSession.user_id == alice.id)
+    assert len(ids) == 10
+    assert set(last_page["sessions"][0]) == {
+        "id", "user_id", "module_name", "status", "score", "started_at", "completed_at",
+    }
+
+
+def test_filters_apply_on_every_page(client, users):
+    alice = users[0]
+    ids, _ = all_pages(client, f"/api/users/{alice.id}/sessions", limit=2,
+                       module="Phishing Awareness", status="in_progress", start="2026-03-05", end="2026-03-31")
+    assert ids == expected_ids(
+        TrainingSession.user_id == alice.id,
+        TrainingSession.module_name == "Phishing Awareness",
+        TrainingSession.completion_status == "in_progress",
+        TrainingSession.started_at >= datetime(2026, 3, 5),
+    )
+    assert ids
+
+
+def test_new_sessions_do_not_shift_later_pages(client, users):
+    alice = users[0]
+    url = f"/api/users/{alice.id}/sessions"
+    first = client.get(url, query_string={"limit": 4}).get_json()
+
+    db.session.add(TrainingSession(user_id=alice.id, module_name=MODULES[0], completion_status="in_progress"))
+    db.session.commit()
+
+    rest, _ = all_pages(client, url, limit=4, cursor=first["next_cursor"])
+    seen = [session["id"] for session in first["sessions"]] + rest
+    assert seen == expected_ids(TrainingSession.user_id == alice.id)[1:]
+
+
+def test_organization_listing_is_admin_only(client, users, admin_headers):
+    assert client.get("/api/admin/sessions", query_string={"organization": "Acme"}).status_code == 403
+
+    ids, _ = all_pages(client, "/api/admin/sessions", headers=admin_headers, organization="Acme", limit=7)
+    acme = [user.id for user in users[:2]]
+    assert ids == expected_ids(TrainingSession.user_id.in_(acme))
+
+
+@pytest.mark.parametrize("params", [
+    {"limit": 0},
+    {"limit": 201},
+    {"cursor": "not-a-cursor"},
+    {"cursor": encode_cursor(5)[:-1] + "!"},
+    {"start": "2026-13-01"},
+    {"start": "2026-03-10", "end": "2026-03-01"},
+])
+def test_bad_parameters_are_rejected(client, users, params):
+    assert client.get(f"/api/users/{users[0].id}/sessions", query_string=params).status_code == 400
+
+
+def test_unknown_user_is_404(client, users):
+    assert client.get("/api/users/999/sessions").status_code == 404
@@ -0,0 +1,188 @@
+"""
+Completion time series for a user or an organization
+
+User timelines are an indexed range query over training_session
+(user_id, completed_at); organization timelines read the per-day counters
+in org_daily_completions. Days are grouped into day/week/month buckets.
+Only the bucket containing today can still change, so every earlier bucket
+is cached after it has been computed once. The one exception is
+rebuild_rollups(), which can rewrite history (users moved between
+organizations by a bulk import, sessions replaced by the demo seeder), so
+cache keys include the rollup version it bumps.
+"""
+
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func
+from content_cache import LRUCache
+from models import db, TrainingSession, OrgDailyCompletions
+from rollups import rollup_version
+
+GRANULARITIES = ("day", "week", "month")
+DEFAULT_BUCKETS = {"day": 30, "week": 12, "month": 12}
+MAX_BUCKETS = {"day": 400, "week": 160, "month": 60}
+
+_bucket_cache = LRUCache(max_entries=50000)
+
+
+def bucket_start(day, granularity):
+    """First day of the bucket containing day (weeks start on Monday)"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, granularity):
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def previous_buckets(start, granularity, count):
+    """Bucket start count buckets before start"""
+    for _ in range(count):
+        start = bucket_start(start - timedelta(days=1), granularity)
+    return start
+
+
+def _scope_filters(scope):
+    if scope[0] == "user":
+        return [TrainingSession.user_id == scope[1]]
+    filters = []
+    if scope[1] is not None:
+        filters.append(OrgDailyCompletions.organization == scope[1])
+    if scope[2] is not None:
+        filters.append(OrgDailyCompletions.industry == scope[2])
+    return filters
+
+
+def _daily_counts(scope, first_day, last_day):
+    """{day: completions} for first_day <= day <= last_day"""
+    if scope[0] == "user":
+        day = func.date(TrainingSession.completed_at)
+        rows = db.session.execute(
+            db.select(day, func.count(TrainingSession.id))
+            .where(
+                *_scope_filters(scope),
+                TrainingSession.completed_at >= datetime.combine(first_day, time.min),
+                TrainingSession.completed_at < datetime.combine(last_day + timedelta(days=1), time.min),
+            )
+            .group_by(day)
+        )
+        return {date.fromisoformat(d): n for d, n in rows}
+
+    rows = db.session.execute(
+        db.select(OrgDailyCompletions.day, func.sum(OrgDailyCompletions.completed))
+        .where(
+            *_scope_filters(scope),
+            OrgDailyCompletions.day >= first_day,
+            OrgDailyCompletions.day <= last_day,
+        )
+        .group_by(OrgDailyCompletions.day)
+    )
+    return {d: n for d, n in rows}
+
+
+def _count_before(scope, first_day):
+    """Completions before first_day, the starting point for cumulative counts"""
+    if scope[0] == "user":
+        return db.session.execute(
+            db.select(func.count(TrainingSession.id)).where(
+                *_scope_filters(scope),
+                TrainingSession.completed_at < datetime.combine(first_day, time.min),
+            )
+        ).scalar_one()
+    return db.session.execute(
+        db.select(func.coalesce(func.sum(OrgDailyCompletions.completed), 0)).where(
+            *_scope_filters(scope),
+            OrgDailyCompletions.day < first_day,
+        )
+    ).scalar_one()
+
+
+def completion_timeline(scope, granularity="day", start=None, end=None, today=None):
+    """
+    Completions per bucket between start and end
+
+    Args:
+        scope: ("user", user_id) or ("org", organization, industry), where
+            either organization or industry may be None
+        granularity: "day", "week" or "month"
+        start, end: Dates; both are widened to whole buckets and end is
+            capped at today (default: the last DEFAULT_BUCKETS buckets)
+
+    Returns:
+        Dict with the resolved range and a list of buckets, each with its
+        completion count and the cumulative total
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    today = today or datetime.utcnow().date()
+    current = bucket_start(today, granularity)
+    last = bucket_start(min(end or today, today), granularity)
+    first = (
+        bucket_start(start, granularity) if start
+        else previous_buckets(last, granularity, DEFAULT_BUCKETS[granularity] - 1)
+    )
+    if first > last:
+        raise ValueError("start must not be after end")
+
+    starts = []
+    bucket = first
+    while bucket <= last:
+        starts.append(bucket)
+        if len(starts) > MAX_BUCKETS[granularity]:
+            raise ValueError(f"at most {MAX_BUCKETS[granularity]} {granularity} buckets per request")
+        bucket = next_bucket(bucket, granularity)
+
+    version = rollup_version()
+    counts = {}
+    missing = []
+    for bucket in starts:
+        cached = _bucket_cache.get((version, scope, granularity, bucket)) if bucket < current else None
+        if cached is None:
+            missing.append(bucket)
+        else:
+            counts[bucket] = cached
+
+    if missing:
+        last_day = min(next_bucket(last, granularity) - timedelta(days=1), today)
+        pending = set(missing)
+        for bucket in missing:
+            counts[bucket] = 0
+        for day, n in _daily_counts(scope, missing[0], last_day).items():
+            bucket = bucket_start(day, granularity)
+            if bucket in pending:
+                counts[bucket] += n
+        for bucket in missing:
+            if bucket < current:
+                _bucket_cache.set((version, scope, granularity, bucket), counts[bucket])
+
+    # New completions are always dated today, so the count before an
+    # existing bucket never changes either
+    before_key = (version, scope, "before", first)
+    cumulative = _bucket_cache.get(before_key)
+    if cumulative is None:
+        cumulative = _count_before(scope, first)
+        _bucket_cache.set(before_key, cumulative)
+
+    buckets = []
+    for bucket in starts:
+        cumulative += counts[bucket]
+        buckets.append({
+            "date": bucket.isoformat(),
+            "completed": counts[bucket],
+            "cumulative": cumulative,
+        })
+
+    return {
+        "granularity": granularity,
+        "start": first.isoformat(),
+        "end": last.isoformat(),
+        "closed": last < current,
+        "buckets": buckets,
+    }
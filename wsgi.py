@@ -0,0 +1,30 @@
+"""
+WSGI entry point for multi-process servers
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Building the app here, in the server's master process, brings the schema
+up to date once before any worker starts, instead of every worker racing
+to migrate the same database. Sessions whose generation died with the
+previous server, and is older than TRAINING_STALE_AFTER, are marked failed
+at the same point. With preload_app (see
+gunicorn.conf.py) the workers are then forked from this process and share
+its imported modules. The engine is disposed afterwards so no worker
+inherits the connection the migrations used.
+"""
+
+from app import create_app, fail_stale_generations
+from migrations import upgrade_database
+from models import db
+from telemetry import get_logger
+
+log = get_logger("wsgi")
+
+app = create_app()
+
+with app.app_context():
+    upgrade_database(log=lambda message: log.info("migration", extra={"step": message}))
+    # Sessions a previous server left generating. Another master (e.g. during
+    # a USR2 upgrade) may still be finishing younger ones, so leave those.
+    fail_stale_generations(app.config["TRAINING_STALE_AFTER"])
+    db.engine.dispose()